@@ -1,6 +1,16 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db import IntegrityError, transaction
 from django.utils.html import format_html
-from .models import Area, Table, Reservation
+from .models import Area, OpeningHours, SpecialDay, Table, Reservation, ReservationArchive
+from .services import (
+    ACTIVE_STATUSES,
+    TableTaken,
+    is_overlap_violation,
+    save_reservation,
+    table_is_free,
+)
+from .signals import schedule_changed
 
 
 @admin.register(Area)
@@ -19,6 +29,20 @@ class AreaAdmin(admin.ModelAdmin):
     thumb.short_description = "Photo"
 
 
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(admin.ModelAdmin):
+    list_display = ("weekday", "area", "open_time", "close_time")
+    list_filter = ("area", "weekday")
+    list_editable = ("open_time", "close_time")
+
+
+@admin.register(SpecialDay)
+class SpecialDayAdmin(admin.ModelAdmin):
+    list_display = ("date", "area", "is_closed", "open_time", "close_time", "note")
+    list_filter = ("area", "is_closed")
+    date_hierarchy = "date"
+
+
 @admin.register(Table)
 class TableAdmin(admin.ModelAdmin):
     list_display = (
@@ -57,8 +81,32 @@ class TableAdmin(admin.ModelAdmin):
     thumb_NA.short_description = "Photo NA"
 
 
+TABLE_TAKEN_MESSAGE = "Стол уже занят на это время"
+
+
+class ReservationAdminForm(forms.ModelForm):
+    class Meta:
+        model = Reservation
+        fields = "__all__"
+
+    def clean(self):
+        data = super().clean()
+        table = data.get("table")
+        start, end = data.get("datetime_start"), data.get("datetime_end")
+        if (
+            table
+            and start
+            and end
+            and data.get("status") in ACTIVE_STATUSES
+            and not table_is_free(table, start, end, exclude_pk=self.instance.pk)
+        ):
+            raise forms.ValidationError(TABLE_TAKEN_MESSAGE)
+        return data
+
+
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
+    form = ReservationAdminForm
     list_display = (
         "id",
         "table",
@@ -70,23 +118,82 @@ class ReservationAdmin(admin.ModelAdmin):
         "name",
         "phone",
     )
-    list_filter = ("status", "table__area", "table", "datetime_start")
+    list_filter = ("status", "area", "table", "service_date")
     search_fields = ("name", "email", "phone")
     autocomplete_fields = ("table", "user")
-    date_hierarchy = "datetime_start"
+    # по дате без cast datetime_start — идёт по индексу (service_date, area, ...)
+    date_hierarchy = "service_date"
     actions = ["confirm_reservations", "cancel_reservations", "mark_seated"]
 
+    def _set_status(self, queryset, new_status) -> int:
+        # меняем только брони, для которых переход разрешён графом статусов
+        queryset = queryset.filter(status__in=Reservation.transition_sources(new_status))
+        # update() не шлёт post_save — сбрасываем кэши расписаний сами
+        rows = list(
+            queryset.values_list("area_id", "datetime_start", "datetime_end")
+        )
+        updated = queryset.update(status=new_status)
+        schedule_changed(rows)
+        return updated
+
+    def save_model(self, request, obj, form, change):
+        # форма уже проверила стол; здесь закрываем гонку между clean() и записью
+        try:
+            save_reservation(obj)
+        except TableTaken:
+            self.message_user(
+                request, f"{TABLE_TAKEN_MESSAGE} — изменения не сохранены", level=messages.ERROR
+            )
+
     @admin.action(description="Подтвердить выбранные брони")
     def confirm_reservations(self, request, queryset):
-        updated = queryset.update(status=Reservation.Status.CONFIRMED)
+        try:
+            with transaction.atomic():
+                updated = self._set_status(queryset, Reservation.Status.CONFIRMED)
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            self.message_user(
+                request,
+                "Часть броней пересекается с другими на том же столе — ничего не изменено",
+                level=messages.ERROR,
+            )
+            return
         self.message_user(request, f"Подтверждено: {updated}")
 
     @admin.action(description="Отменить выбранные брони")
     def cancel_reservations(self, request, queryset):
-        updated = queryset.update(status=Reservation.Status.CANCELED)
+        updated = self._set_status(queryset, Reservation.Status.CANCELED)
         self.message_user(request, f"Отменено: {updated}")
 
     @admin.action(description="Отметить как 'Гость на месте'")
     def mark_seated(self, request, queryset):
-        updated = queryset.update(status=Reservation.Status.SEATED)
+        updated = self._set_status(queryset, Reservation.Status.SEATED)
         self.message_user(request, f"Отмечено seated: {updated}")
+
+
+@admin.register(ReservationArchive)
+class ReservationArchiveAdmin(admin.ModelAdmin):
+    """История броней из архива — только просмотр."""
+
+    list_display = (
+        "id",
+        "table",
+        "datetime_start",
+        "datetime_end",
+        "guests",
+        "status",
+        "user",
+        "name",
+        "archived_at",
+    )
+    list_filter = ("status", "area")
+    search_fields = ("name", "email", "phone")
+    date_hierarchy = "service_date"
+    list_select_related = ("table", "table__area", "user")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,135 @@
+"""Async-варианты горячих эндпоинтов для запуска под ASGI (uvicorn).
+
+Доступность и схема зала читают базу через async ORM и кэш через async
+API, так что один процесс держит много медленных клиентов одновременно.
+Ответы и заголовки кэширования совпадают с sync-версиями в ``views.py``.
+Запись (создание брони) остаётся sync: ей нужна транзакция, которой у
+async ORM нет.
+"""
+from functools import partial
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+
+from booking import holds
+from booking.cache import acached_availability
+from booking.models import Area, Table
+from booking.services import aavailability_for_tables, parse_hhmm
+from .serializers import AreaSerializer, TableSerializer
+from .views import (
+    _aprefetch_snapshot,
+    _availability_payload,
+    _parse_area,
+    _parse_date,
+    _parse_duration,
+    _snapshot_etag,
+    _snapshot_response,
+    _table_types_payload,
+    layout_cached,
+)
+
+
+@require_GET
+async def availability(request):
+    d = request.GET.get("date")
+    start = request.GET.get("start")
+    guests = request.GET.get("guests")
+    area = request.GET.get("area")
+    duration = request.GET.get("duration")
+    ttype = request.GET.get("type")
+    hold = request.GET.get("hold") or None
+
+    if not d or not start or not guests:
+        return JsonResponse({"detail": "date, start, guests обязательны"}, status=400)
+
+    try:
+        day = _parse_date(d)
+        start_t = parse_hhmm(start)
+        guests_i = int(guests)
+        visit_min = _parse_duration(duration)
+        area = _parse_area(area)
+    except Exception:
+        return JsonResponse(
+            {"detail": "Некорректные параметры (формат date=start=guests=duration=area)"},
+            status=400,
+        )
+
+    async def compute():
+        qs = Table.objects.filter(is_active=True, capacity__gte=guests_i)
+        if area:
+            qs = qs.filter(area_id=area)
+        if ttype:
+            qs = qs.filter(type=ttype)
+
+        info = await aavailability_for_tables(
+            day,
+            start_t,
+            guests_i,
+            [t async for t in qs],
+            visit_min=visit_min if visit_min else None,
+            hold_id=hold,
+        )
+        return _availability_payload(d, start, guests_i, area, visit_min, info)
+
+    params = {
+        "start": start,
+        "guests": guests_i,
+        "duration": visit_min,
+        "type": ttype,
+        "holds": await holds.afingerprint(day, exclude=hold),
+    }
+    return JsonResponse(
+        await acached_availability("point", day, area, params, compute)
+    )
+
+
+@layout_cached
+@require_GET
+async def tables_list(request):
+    qs = (
+        Table.objects.filter(is_active=True)
+        .select_related("area")
+        .order_by("area__name", "name")
+    )
+    try:
+        area = _parse_area(request.GET.get("area"))
+    except ValueError:
+        return JsonResponse({"detail": "Некорректный area"}, status=400)
+    if area:
+        qs = qs.filter(area_id=area)
+    tables = [t async for t in qs]
+    return JsonResponse(TableSerializer(tables, many=True).data, safe=False)
+
+
+@layout_cached
+@require_GET
+async def table_types(request):
+    types = (
+        Table.objects.filter(is_active=True)
+        .values_list("type", flat=True)
+        .distinct()
+        .order_by()
+    )
+    return JsonResponse(_table_types_payload([t async for t in types]), safe=False)
+
+
+@layout_cached
+@require_GET
+async def areas_list(request):
+    # та же страница, что у AreaListAPIView: залов мало, режем список в памяти
+    drf_request = Request(request)
+    areas = [a async for a in Area.objects.filter(is_active=True).order_by("order", "name")]
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(areas, drf_request)
+    data = AreaSerializer(page, many=True, context={"request": drf_request}).data
+    return JsonResponse(paginator.get_paginated_response(data).data)
+
+
+@partial(layout_cached, etag_func=_snapshot_etag, aprefetch=_aprefetch_snapshot)
+@require_GET
+async def layout_snapshot(request):
+    if not hasattr(request, "_snapshot"):
+        await _aprefetch_snapshot(request)
+    return _snapshot_response(request._snapshot, request._snapshot_encoding)
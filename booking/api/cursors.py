@@ -0,0 +1,71 @@
+"""Постраничная выдача броней по ключу (datetime_start, id).
+
+Курсор — позиция последней отданной строки. Следующая страница читается
+условием по ключу (keyset), а не OFFSET: стоит одинаково на любой глубине
+и не теряет строки, если между запросами добавились новые брони.
+"""
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+Cursor = Tuple[datetime, int]
+
+
+def position(row) -> Cursor:
+    """Ключ строки: модель или словарь из ``projections.build``."""
+    if isinstance(row, dict):
+        return row["datetime_start"], row["id"]
+    return row.datetime_start, row.pk
+
+
+def encode(row) -> str:
+    start, pk = position(row)
+    raw = f"{start.isoformat()}|{pk}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode(value: str) -> Cursor:
+    """Разобрать курсор; ValueError, если он испорчен."""
+    try:
+        start, pk = urlsafe_b64decode(value.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(start), int(pk)
+    except Exception as exc:
+        raise ValueError("bad cursor") from exc
+
+
+def ordered(qs: QuerySet, descending: bool = False) -> QuerySet:
+    if descending:
+        return qs.order_by("-datetime_start", "-id")
+    return qs.order_by("datetime_start", "id")
+
+
+def after(qs: QuerySet, cursor: Optional[Cursor], descending: bool = False) -> QuerySet:
+    """Строки строго после курсора в порядке выдачи."""
+    if cursor is None:
+        return qs
+    start, pk = cursor
+    if descending:
+        return qs.filter(Q(datetime_start__lt=start) | Q(datetime_start=start, id__lt=pk))
+    return qs.filter(Q(datetime_start__gt=start) | Q(datetime_start=start, id__gt=pk))
+
+
+def merge(sources: Iterable[Iterable], descending: bool = False) -> Iterable:
+    """Слить уже упорядоченные выборки (например, брони и архив) в одну."""
+    return heapq.merge(*sources, key=position, reverse=descending)
+
+
+def page(rows: Iterable, limit: int) -> Tuple[List, Optional[str]]:
+    """Первые ``limit`` строк и курсор следующей страницы (или None).
+
+    Из источника нужно прочитать ``limit + 1`` строк, чтобы узнать, есть ли
+    продолжение.
+    """
+    out = []
+    for row in rows:
+        if len(out) == limit:
+            return out, encode(out[-1])
+        out.append(row)
+    return out, None
@@ -0,0 +1,115 @@
+"""Заголовок Idempotency-Key для POST-запросов.
+
+Успешный ответ сохраняется в общем кэше на IDEMPOTENCY_TTL, и повтор с тем
+же ключом получает его без повторной обработки. Пока первый запрос ещё
+выполняется, дубликаты ждут его результата, а не создают вторую бронь.
+
+Ключ действует в пределах клиента: пользователя, а для гостя — сессии или,
+если её нет, адреса и User-Agent. Без общего кэша (CACHE_URL) записи живут
+в памяти воркера и повтор на другом воркере не распознаётся — об этом
+предупреждает проверка ``booking.W001``.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+RESPONSE_KEY = "rb:idem:{scope}:{digest}"
+LOCK_KEY = "rb:idem:lock:{scope}:{digest}"
+# столько живёт блокировка упавшего воркера и столько ждёт дубликат
+LOCK_TTL = 30
+WAIT_S = 10
+POLL_S = 0.05
+
+
+def _fingerprint(data) -> str:
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _client_scope(request) -> str:
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    # чужой гость с тем же ключом не должен получить ответ с нашими контактами
+    session_key = request.session.session_key
+    if session_key:
+        return f"session:{session_key}"
+    agent = hashlib.sha256(request.headers.get("User-Agent", "").encode()).hexdigest()
+    return f"client:{BaseThrottle().get_ident(request)}:{agent}"
+
+
+def cache_keys(request, scope: str, key: str):
+    """Ключи кэша (ответ, блокировка) для Idempotency-Key этого клиента."""
+    digest = hashlib.sha256(f"{_client_scope(request)}:{key}".encode()).hexdigest()
+    return (
+        RESPONSE_KEY.format(scope=scope, digest=digest),
+        LOCK_KEY.format(scope=scope, digest=digest),
+    )
+
+
+def _replay(stored: dict) -> Response:
+    response = Response(stored["data"], status=stored["status"])
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(request, scope: str, handle) -> Response:
+    """Выполнить ``handle()`` не больше одного раза на ключ из заголовка.
+
+    Без заголовка просто вызывает ``handle()``. Ключ действует в пределах
+    клиента (см. ``_client_scope``); повтор с тем же ключом, но другим
+    телом — 422.
+    """
+    key = request.headers.get(HEADER)
+    if not key:
+        return handle()
+    if len(key) > MAX_KEY_LENGTH:
+        return Response({"detail": f"{HEADER} слишком длинный"}, status=400)
+
+    response_key, lock_key = cache_keys(request, scope, key)
+    fingerprint = _fingerprint(request.data)
+
+    deadline = time.monotonic() + WAIT_S
+    while True:
+        stored = cache.get(response_key)
+        if stored is None and cache.add(lock_key, 1, timeout=LOCK_TTL):
+            # первый ответ мог сохраниться между get и add
+            stored = cache.get(response_key)
+            if stored is None:
+                break
+            cache.delete(lock_key)
+        if stored is not None:
+            if stored["fingerprint"] != fingerprint:
+                return Response(
+                    {"detail": f"{HEADER} уже использован с другим запросом"},
+                    status=422,
+                )
+            return _replay(stored)
+        if time.monotonic() >= deadline:
+            return Response(
+                {"detail": "Запрос с этим ключом ещё обрабатывается"}, status=409
+            )
+        time.sleep(POLL_S)
+
+    try:
+        response = handle()
+        # ошибки не сохраняем: повтор после исправления должен пройти заново
+        if 200 <= response.status_code < 300:
+            cache.set(
+                response_key,
+                {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": json.loads(json.dumps(response.data, default=str)),
+                },
+                timeout=settings.IDEMPOTENCY_TTL,
+            )
+        return response
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,64 @@
+"""Быстрая выдача списков броней без DRF-сериализаторов.
+
+Из базы читаются только колонки ответа (``values_list``), строки
+собираются в словари напрямую. Ключи и значения совпадают с
+``ReservationListSerializer`` и ``ManagerBookingListItem``: даты остаются
+``datetime`` в текущем часовом поясе и превращаются в ISO 8601 рендерером.
+"""
+from typing import Dict, Iterable, Iterator
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+# ключ ответа -> колонка; Reservation и ReservationArchive устроены одинаково
+RESERVATION_LIST: Dict[str, str] = {
+    "id": "id",
+    "status": "status",
+    "datetime_start": "datetime_start",
+    "datetime_end": "datetime_end",
+    "guests": "guests",
+    "table": "table_id",
+    "table_name": "table__name",
+    "area_id": "area_id",
+    "table_area": "area__name",
+    "name": "name",
+    "phone": "phone",
+    "email": "email",
+    "comment": "comment",
+    "created_at": "created_at",
+}
+
+MANAGER_LIST: Dict[str, str] = {
+    "id": "id",
+    "status": "status",
+    "datetime_start": "datetime_start",
+    "datetime_end": "datetime_end",
+    "guests": "guests",
+    "table": "table_id",
+    "table_name": "table__name",
+    "area": "area__name",
+    "name": "name",
+    "phone": "phone",
+    "email": "email",
+    "comment": "comment",
+}
+
+DATETIMES = ("datetime_start", "datetime_end", "created_at")
+
+
+def select(qs: QuerySet, fields: Dict[str, str]) -> QuerySet:
+    """Только колонки ответа, без загрузки моделей и select_related."""
+    return qs.values_list(*fields.values())
+
+
+def build(rows: Iterable[tuple], fields: Dict[str, str]) -> Iterator[dict]:
+    """Строки ``select()`` -> словари ответа (лениво, по одной)."""
+    keys = tuple(fields)
+    local = [k for k in keys if k in DATETIMES]
+    tz = timezone.get_current_timezone()
+    for values in rows:
+        row = dict(zip(keys, values))
+        for k in local:
+            if row[k] is not None:
+                row[k] = row[k].astimezone(tz)
+        yield row
@@ -0,0 +1,46 @@
+"""Рендереры для больших списков: orjson вместо json и, если установлен, msgpack.
+
+Типы, которые orjson не знает сам (Decimal, ленивые строки и т.п.), отдаются
+стандартному ``JSONEncoder`` DRF, поэтому ответ совпадает с ``JSONRenderer``.
+"""
+import orjson
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # msgpack необязателен: без него остаётся только JSON
+    msgpack = None
+
+_fallback = JSONEncoder().default
+
+
+def dumps(data) -> bytes:
+    # OPT_UTC_Z — как DRF: "...Z" вместо "+00:00"
+    return orjson.dumps(data, default=_fallback, option=orjson.OPT_UTC_Z)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"" if data is None else dumps(data)
+
+
+class MsgpackRenderer(BaseRenderer):
+    """``Accept: application/msgpack``; даты — строками ISO 8601, как в JSON."""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"" if data is None else msgpack.packb(data, default=_fallback)
+
+
+LIST_RENDERERS = [ORJSONRenderer, BrowsableAPIRenderer]
+if msgpack is not None:
+    LIST_RENDERERS.insert(1, MsgpackRenderer)
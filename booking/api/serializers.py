@@ -2,8 +2,21 @@ from datetime import date, timedelta, datetime
 from typing import Optional
 from rest_framework import serializers
 
+from booking import holds
 from booking.models import Reservation, Table, Area
-from booking.services import parse_hhmm, combine, table_is_free, pick_table, VISIT_MIN
+from booking.services import (
+    BULK_MODES,
+    BookingSpec,
+    TableTaken,
+    combine,
+    insert_reservation,
+    parse_hhmm,
+    pick_table,
+    VISIT_MIN,
+)
+
+# границы длительности визита, минуты (бронь, пачка броней, удержание)
+DURATION_MIN, DURATION_MAX = 30, 360
 
 
 class AreaSerializer(serializers.ModelSerializer):
@@ -62,7 +75,7 @@ class TableSerializer(serializers.ModelSerializer):
 
 class ReservationListSerializer(serializers.ModelSerializer):
     table_name = serializers.CharField(source="table.name", read_only=True)
-    area_id = serializers.IntegerField(source="table.area_id", read_only=True)
+    area_id = serializers.IntegerField(read_only=True)
     table_area = serializers.CharField(source="table.area.name", read_only=True)
 
     class Meta:
@@ -86,6 +99,9 @@ class ReservationListSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+PICK_RETRIES = 3
+
+
 class ReservationCreateSerializer(serializers.Serializer):
     date = serializers.DateField()
     start = serializers.CharField()  # HH:MM
@@ -95,7 +111,9 @@ class ReservationCreateSerializer(serializers.Serializer):
     phone = serializers.CharField(max_length=32, required=False, allow_blank=True)
     email = serializers.EmailField(required=False, allow_blank=True)
     comment = serializers.CharField(required=False, allow_blank=True)
-    duration_min = serializers.IntegerField(required=False, min_value=30, max_value=360)
+    duration_min = serializers.IntegerField(required=False, min_value=DURATION_MIN, max_value=DURATION_MAX)
+    # удержание, взятое гостем при выборе стола (POST /api/holds/)
+    hold_id = serializers.CharField(required=False, allow_blank=True)
 
     def validate(self, attrs):
         # Парсим время
@@ -109,6 +127,7 @@ class ReservationCreateSerializer(serializers.Serializer):
         req = self.context["request"]
         user = getattr(req, "user", None)
         table_id = attrs.get("table_id")
+        hold_id = attrs.get("hold_id") or None
 
         visit_min = attrs.get("duration_min") or VISIT_MIN
         start_dt = combine(day, start_t)
@@ -127,11 +146,15 @@ class ReservationCreateSerializer(serializers.Serializer):
                 raise serializers.ValidationError(
                     {"guests": "The number of guests is higher than table capacity"}
                 )
-
-            if not table_is_free(table, start_dt, end_dt):
-                raise serializers.ValidationError({"table_id": "The table is reserved"})
+            if holds.conflicts(table.pk, start_dt, end_dt, exclude=hold_id):
+                raise serializers.ValidationError(
+                    {"table_id": "The table is held by another guest"}
+                )
+            # занятость бронями проверяет insert_reservation в create()
         else:
-            pick = pick_table(day, start_t, guests, area_id=None, visit_min=visit_min)
+            pick = pick_table(
+                day, start_t, guests, area_id=None, visit_min=visit_min, hold_id=hold_id
+            )
             if not pick.table:
                 raise serializers.ValidationError(
                     {"non_field_errors": ["No available time slots for this table"]}
@@ -173,19 +196,100 @@ class ReservationCreateSerializer(serializers.Serializer):
         phone = validated_data.get("phone") or getattr(user, "phone", "")
         email = validated_data.get("email") or getattr(user, "email", "")
 
-        reservation = Reservation.objects.create(
-            user=user,
-            table=table,
-            datetime_start=start_dt,
-            datetime_end=end_dt,
-            guests=validated_data["guests"],
-            name=name,
-            phone=phone,
-            email=email,
-            comment=validated_data.get("comment", ""),
-            status=Reservation.Status.PENDING,
+        hold_id = validated_data.get("hold_id") or None
+        for _ in range(PICK_RETRIES):
+            try:
+                reservation = insert_reservation(
+                    user=user,
+                    table=table,
+                    datetime_start=start_dt,
+                    datetime_end=end_dt,
+                    guests=validated_data["guests"],
+                    name=name,
+                    phone=phone,
+                    email=email,
+                    comment=validated_data.get("comment", ""),
+                    status=Reservation.Status.PENDING,
+                )
+                if hold_id:
+                    holds.release(hold_id)
+                return reservation
+            except TableTaken:
+                if validated_data.get("table_id"):
+                    raise serializers.ValidationError(
+                        {"table_id": "The table is reserved"}
+                    )
+            # стол подобрали сами, а его заняли параллельно — подбираем заново
+            pick = pick_table(
+                validated_data["date"],
+                parse_hhmm(validated_data["start"]),
+                validated_data["guests"],
+                visit_min=validated_data["visit_min"],
+                hold_id=hold_id,
+            )
+            if not pick.table:
+                break
+            table = pick.table
+
+        raise serializers.ValidationError(
+            {"non_field_errors": ["No available time slots for this table"]}
+        )
+
+
+BULK_MAX = 200
+
+
+class ReservationBulkItemSerializer(serializers.Serializer):
+    """Одна бронь пачки: гость без аккаунта, стол — конкретный или подбором."""
+
+    date = serializers.DateField()
+    start = serializers.CharField()  # HH:MM
+    guests = serializers.IntegerField(min_value=1)
+    table_id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=128)
+    phone = serializers.CharField(max_length=32, required=False, allow_blank=True)
+    email = serializers.EmailField(required=False, allow_blank=True)
+    comment = serializers.CharField(required=False, allow_blank=True)
+    duration_min = serializers.IntegerField(required=False, min_value=DURATION_MIN, max_value=DURATION_MAX)
+
+    def validate_start(self, value):
+        try:
+            return parse_hhmm(value)
+        except Exception:
+            raise serializers.ValidationError("Формат времени HH:MM")
+
+    def validate(self, attrs):
+        if not (attrs.get("phone", "").strip() or attrs.get("email", "").strip()):
+            raise serializers.ValidationError(
+                {
+                    "phone": "Email or phone is needed",
+                    "email": "Email or phone is needed",
+                }
+            )
+        return attrs
+
+    def to_spec(self) -> BookingSpec:
+        data = self.validated_data
+        return BookingSpec(
+            day=data["date"],
+            start_time=data["start"],
+            guests=data["guests"],
+            visit_min=data.get("duration_min") or VISIT_MIN,
+            table_id=data.get("table_id"),
+            name=data["name"].strip(),
+            phone=data.get("phone", "").strip(),
+            email=data.get("email", "").strip(),
+            comment=data.get("comment", ""),
         )
-        return reservation
+
+
+class ReservationBulkSerializer(serializers.Serializer):
+    # all — всё или ничего, partial — создать то, что прошло проверку
+    mode = serializers.ChoiceField(choices=BULK_MODES, default="all")
+    # элементы проверяются по одному, чтобы вернуть ошибки с индексами
+    bookings = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=BULK_MAX
+    )
 
 
 class ManagerBookingListItem(serializers.ModelSerializer):
@@ -208,3 +312,20 @@ class ManagerBookingListItem(serializers.ModelSerializer):
             "email",
             "comment",
         )
+
+
+class HoldCreateSerializer(serializers.Serializer):
+    """Параметры удержания стола; длительность в тех же границах, что у брони."""
+
+    date = serializers.DateField()
+    start = serializers.CharField()  # HH:MM
+    table_id = serializers.IntegerField()
+    guests = serializers.IntegerField(min_value=1)
+    duration = serializers.IntegerField(required=False, min_value=DURATION_MIN, max_value=DURATION_MAX)
+    replace = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_start(self, value):
+        try:
+            return parse_hhmm(value)
+        except Exception:
+            raise serializers.ValidationError("Формат времени HH:MM")
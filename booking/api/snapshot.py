@@ -0,0 +1,108 @@
+"""Снимок схемы зала одним ответом: залы, столы и подписи типов столов.
+
+Снимок рендерится один раз на версию схемы (сразу после изменения Area/Table
+и заново, если ключ вытеснен из кэша) и хранится в общем кэше уже готовыми
+байтами: без сжатия, gzip и, если установлен пакет ``brotli``, br. Запрос
+только выбирает нужный вариант — без запросов к БД и сериализации.
+Без общего кэша версия схемы своя у каждого воркера, поэтому снимок живёт
+не дольше LAYOUT_MAX_AGE и перерисовывается.
+"""
+import gzip
+import hashlib
+from typing import Dict, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from booking.cache import LAYOUT_VERSION_KEY, get_version
+from booking.models import Area, Table
+from .renderers import dumps
+from .serializers import AreaSerializer, TableSerializer
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+SNAPSHOT_KEY = "rb:layout:snapshot:{version}"
+# старые версии больше не читаются и просто истекают
+SNAPSHOT_TTL = 24 * 60 * 60
+IDENTITY = "identity"
+# порядок — предпочтение сервера, если клиент принимает несколько
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def payload() -> dict:
+    # без request в контексте ссылки на фото относительные: снимок один для всех хостов
+    areas = Area.objects.filter(is_active=True).order_by("order", "name")
+    tables = (
+        Table.objects.filter(is_active=True)
+        .select_related("area")
+        .order_by("area__name", "name")
+    )
+    tables = TableSerializer(tables, many=True).data
+    labels = dict(Table.IconType.choices)
+    types = sorted({t["type"] for t in tables})
+    return {
+        "areas": AreaSerializer(areas, many=True).data,
+        "tables": tables,
+        "types": [{"code": t, "name": labels.get(t, t)} for t in types],
+    }
+
+
+Snapshot = Dict[str, Union[bytes, str]]
+
+
+def render(version: int) -> Snapshot:
+    """Тело снимка во всех вариантах сжатия и его ETag."""
+    raw = dumps({"version": version, **payload()})
+    out: Snapshot = {
+        IDENTITY: raw,
+        "gzip": gzip.compress(raw, compresslevel=9, mtime=0),
+        "etag": hashlib.md5(raw).hexdigest(),
+    }
+    if brotli is not None:
+        out["br"] = brotli.compress(raw, quality=11)
+    return out
+
+
+def _store(version: int) -> Snapshot:
+    snap = render(version)
+    ttl = SNAPSHOT_TTL if settings.CACHE_URL else settings.LAYOUT_MAX_AGE
+    cache.set(SNAPSHOT_KEY.format(version=version), snap, timeout=ttl)
+    return snap
+
+
+def rebuild() -> Snapshot:
+    """Отрендерить снимок текущей версии заранее (после изменения схемы)."""
+    return _store(get_version(LAYOUT_VERSION_KEY))
+
+
+def get(version: int) -> Snapshot:
+    """Готовый снимок версии ``version``; рендерится, если его нет в кэше."""
+    snap = cache.get(SNAPSHOT_KEY.format(version=version))
+    return snap if snap is not None else _store(version)
+
+
+async def aget(version: int) -> Snapshot:
+    """Асинхронный ``get``: рендер (ORM и сериализаторы) — в потоке."""
+    snap = await cache.aget(SNAPSHOT_KEY.format(version=version))
+    return snap if snap is not None else await sync_to_async(_store)(version)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Лучшее из ``ENCODINGS``, что принимает клиент (``q=0`` — отказ)."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        q = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            if float(q) > 0:
+                accepted.add(name.lower())
+        except ValueError:
+            continue
+    for enc in ENCODINGS:
+        if enc in accepted or "*" in accepted:
+            return enc
+    return IDENTITY
@@ -1,13 +1,34 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("availability/", views.availability, name="api_availability"),
+    path(
+        "availability/grid/",
+        views.availability_grid,
+        name="api_availability_grid",
+    ),
+    path(
+        "availability/gaps/",
+        views.availability_gaps,
+        name="api_availability_gaps",
+    ),
+    path(
+        "availability/alternatives/",
+        views.availability_alternatives,
+        name="api_availability_alternatives",
+    ),
     path("layout/tables/", views.tables_list, name="api_tables"),
     path("layout/table-types/", views.table_types, name="api_table_types"),
     path("layout/areas/", views.AreaListAPIView.as_view(), name="api_areas"),
+    path("layout/snapshot/", views.layout_snapshot, name="api_layout_snapshot"),
     # bookings
+    path("holds/", views.place_hold, name="api_place_hold"),
+    path("holds/<str:hold_id>/", views.release_hold, name="api_release_hold"),
     path("bookings/", views.create_booking, name="api_create_booking"),
+    path(
+        "bookings/bulk/", views.create_bookings_bulk, name="api_create_bookings_bulk"
+    ),
     path(
         "me/bookings-by-status/",
         views.my_bookings_by_status,
@@ -34,6 +55,16 @@ urlpatterns = [
         views.manager_bookings_list,
         name="api_manager_bookings_list",
     ),
+    path(
+        "manager/calendar/",
+        views.manager_calendar,
+        name="api_manager_calendar",
+    ),
+    path(
+        "manager/bookings/status/",
+        views.manager_set_status_batch,
+        name="api_manager_set_status_batch",
+    ),
     path(
         "manager/bookings/<int:pk>/status",
         views.manager_set_status,
@@ -44,8 +75,39 @@ urlpatterns = [
         views.manager_status_choices,
         name="api_manager_status_choices",
     ),
+    path(
+        "manager/availability-cache/",
+        views.manager_availability_cache_stats,
+        name="api_manager_availability_cache_stats",
+    ),
     path(
         "me/bookings/<int:pk>/ical", views.my_booking_ical, name="api_my_booking_ical"
     ),
     path("ical", views.booking_ical_by_token, name="api_booking_ical_by_token"),
+    # async-варианты для ASGI
+    path(
+        "async/availability/",
+        async_views.availability,
+        name="api_async_availability",
+    ),
+    path(
+        "async/layout/tables/",
+        async_views.tables_list,
+        name="api_async_tables",
+    ),
+    path(
+        "async/layout/table-types/",
+        async_views.table_types,
+        name="api_async_table_types",
+    ),
+    path(
+        "async/layout/areas/",
+        async_views.areas_list,
+        name="api_async_areas",
+    ),
+    path(
+        "async/layout/snapshot/",
+        async_views.layout_snapshot,
+        name="api_async_layout_snapshot",
+    ),
 ]
@@ -1,36 +1,198 @@
-from datetime import date
+import hashlib
+import time
+from collections import defaultdict
+from functools import partial, wraps
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 from typing import Optional
 
-from django.http import HttpResponse
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.models import Count, F, QuerySet, Value, Window
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.dateparse import parse_date
-from django.utils.timezone import localdate
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.timezone import localdate, localtime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
 from rest_framework.generics import ListAPIView
 
-from booking.models import Area, Table, Reservation
+from booking import archive, holds, hours
+from booking.models import Area, Table, Reservation, ReservationArchive
 from .serializers import (
     AreaSerializer,
     TableSerializer,
     ReservationListSerializer,
     ReservationCreateSerializer,
-    ManagerBookingListItem,
+    ReservationBulkItemSerializer,
+    ReservationBulkSerializer,
+    HoldCreateSerializer,
+    DURATION_MAX,
+    DURATION_MIN,
 )
-from booking.services import availability_for_tables, parse_hhmm
+from booking.services import (
+    TRANSITION_CONFLICT,
+    TRANSITION_FORBIDDEN,
+    TRANSITION_NOT_FOUND,
+    TRANSITION_OK,
+    TRANSITION_TABLE_TAKEN,
+    TRANSITION_UNCHANGED,
+    TableTaken,
+    VISIT_MIN,
+    availability_for_tables,
+    bulk_create_reservations,
+    calendar_summary,
+    combine,
+    day_grid,
+    find_alternatives,
+    free_gaps_for_tables,
+    parse_hhmm,
+    set_status_batch,
+    table_is_free,
+    transition_status,
+)
+from booking.cache import alayout_state, availability_stats, cached_availability, layout_state
 from booking.tasks import (
     send_booking_created,
+    send_bookings_created,
     send_booking_confirmed,
     schedule_reminder,
+    notify_confirmed,
 )
 from booking.utils import verify_ics_token, build_reservation_ics
+from . import cursors, projections, renderers, snapshot
+from .projections import MANAGER_LIST, RESERVATION_LIST
+from .renderers import LIST_RENDERERS
+from .idempotency import idempotent
+
+
+STATUS_CONFLICT_DETAIL = "Статус брони успели изменить — обновите страницу"
+TABLE_TAKEN_DETAIL = "Стол уже занят на это время"
 
 
 def _parse_date(s: str) -> date:
     return date.fromisoformat(s)
 
 
+def _parse_area(s: Optional[str]) -> Optional[int]:
+    """id зала из параметра ``area``; пусто — все залы (None).
+
+    Ключи кэша доступности строятся по числу, так что ``01`` и ``1`` — один зал.
+    """
+    if not s:
+        return None
+    value = int(s)
+    if value <= 0:
+        raise ValueError(f"area: {s}")
+    return value
+
+
+def _parse_duration(s: Optional[str]) -> Optional[int]:
+    """Длительность визита в минутах в границах брони; пусто — по умолчанию (None)."""
+    if not s:
+        return None
+    value = int(s)
+    if not DURATION_MIN <= value <= DURATION_MAX:
+        raise ValueError(f"duration вне {DURATION_MIN}–{DURATION_MAX}")
+    return value
+
+
+def _layout_state(request):
+    # etag_func и last_modified_func зовутся по очереди — кэш читаем один раз
+    if not hasattr(request, "_layout_state"):
+        request._layout_state = layout_state()
+    return request._layout_state
+
+
+def _layout_etag(request, *args, **kwargs) -> str:
+    version, _ = _layout_state(request)
+    # JSON и HTML-страница DRF по одному адресу — разные представления
+    accept = request.META.get("HTTP_ACCEPT", "")
+    return hashlib.md5(f"{version}|{accept}".encode()).hexdigest()
+
+
+def _layout_modified(request, *args, **kwargs) -> datetime:
+    return datetime.fromtimestamp(_layout_state(request)[1], tz=dt_timezone.utc)
+
+
+async def _aprefetch_layout(request) -> None:
+    request._layout_state = await alayout_state()
+
+
+def layout_cached(view, etag_func=_layout_etag, aprefetch=_aprefetch_layout):
+    """ETag/Last-Modified по версии схемы зала и 304 на повторный запрос.
+
+    Оборачивает вьюху снаружи DRF: 304 отдаётся до аутентификации, без
+    единого запроса к БД. Версию поднимают сигналы сохранения Area/Table.
+    Без общего кэша версия своя у каждого воркера и не увидит чужих правок,
+    поэтому валидаторы не отдаются — остаётся только max-age.
+
+    Async-вьюхе ``aprefetch`` заранее читает из кэша всё, что нужно
+    ``etag_func``, через async API — сами валидаторы считаются из request.
+    """
+    conditional = condition(etag_func=etag_func, last_modified_func=_layout_modified)(view)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not settings.CACHE_URL:
+                return await view(request, *args, **kwargs)
+            await aprefetch(request)
+            return await conditional(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return (conditional if settings.CACHE_URL else view)(request, *args, **kwargs)
+
+    return cache_control(public=True, max_age=settings.LAYOUT_MAX_AGE)(wrapper)
+
+
+def _snapshot_request(request):
+    if not hasattr(request, "_snapshot"):
+        version, _ = _layout_state(request)
+        request._snapshot = snapshot.get(version)
+        request._snapshot_encoding = snapshot.choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+    return request._snapshot, request._snapshot_encoding
+
+
+async def _aprefetch_snapshot(request) -> None:
+    await _aprefetch_layout(request)
+    request._snapshot = await snapshot.aget(request._layout_state[0])
+    request._snapshot_encoding = snapshot.choose_encoding(
+        request.META.get("HTTP_ACCEPT_ENCODING", "")
+    )
+
+
+def _snapshot_etag(request, *args, **kwargs) -> str:
+    # у каждого варианта сжатия свой ETag
+    snap, encoding = _snapshot_request(request)
+    return f"{snap['etag']}-{encoding}"
+
+
+def _snapshot_response(snap, encoding) -> HttpResponse:
+    response = HttpResponse(snap[encoding], content_type="application/json")
+    if encoding != snapshot.IDENTITY:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+@partial(layout_cached, etag_func=_snapshot_etag)
+@require_GET
+def layout_snapshot(request):
+    """Залы, столы и типы столов одним ответом — готовые байты из кэша."""
+    return _snapshot_response(*_snapshot_request(request))
+
+
+@method_decorator(layout_cached, name="dispatch")
 class AreaListAPIView(ListAPIView):
     permission_classes = [AllowAny]
     serializer_class = AreaSerializer
@@ -40,16 +202,25 @@ class AreaListAPIView(ListAPIView):
         return qs
 
 
+@layout_cached
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def tables_list(request):
-    qs = Table.objects.filter(is_active=True).order_by("area__name", "name")
-    area = request.query_params.get("area")
+    qs = (
+        Table.objects.filter(is_active=True)
+        .select_related("area")
+        .order_by("area__name", "name")
+    )
+    try:
+        area = _parse_area(request.query_params.get("area"))
+    except ValueError:
+        return Response({"detail": "Некорректный area"}, status=status.HTTP_400_BAD_REQUEST)
     if area:
         qs = qs.filter(area_id=area)
     return Response(TableSerializer(qs, many=True).data)
 
 
+@layout_cached
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def table_types(request):
@@ -59,8 +230,43 @@ def table_types(request):
         .distinct()
         .order_by()
     )
-    labels = dict(Table.TableType.choices)
-    return Response([{"code": t, "name": labels.get(t, t)} for t in types])
+    return Response(_table_types_payload(types))
+
+
+def _table_types_payload(types) -> list:
+    labels = dict(Table.IconType.choices)
+    return [{"code": t, "name": labels.get(t, t)} for t in types]
+
+
+def _availability_payload(d, start, guests_i, area, visit_min, info) -> dict:
+    out = []
+    for it in info:
+        au: Optional[str] = (
+            it.available_until.strftime("%H:%M")
+            if (it.available and it.available_until)
+            else None
+        )
+        out.append(
+            {
+                "id": it.table.pk,
+                "name": it.table.name,
+                "capacity": it.table.capacity,
+                "type": it.table.type,
+                "x": float(it.table.x),
+                "y": float(it.table.y),
+                "available": it.available,
+                "available_until": au,
+            }
+        )
+
+    return {
+        "date": d,
+        "start": start,
+        "guests": guests_i,
+        "area": area,
+        "duration": visit_min if visit_min else None,
+        "tables": out,
+    }
 
 
 @api_view(["GET"])
@@ -72,6 +278,7 @@ def availability(request):
     area = request.query_params.get("area")
     duration = request.query_params.get("duration")
     ttype = request.query_params.get("type")
+    hold = request.query_params.get("hold") or None
 
     if not d or not start or not guests:
         return Response(
@@ -83,50 +290,243 @@ def availability(request):
         day = _parse_date(d)
         start_t = parse_hhmm(start)
         guests_i = int(guests)
+        visit_min = _parse_duration(duration)
+        area = _parse_area(area)
     except Exception:
         return Response(
-            {"detail": "Некорректные параметры (формат date=start=guests)"},
+            {"detail": "Некорректные параметры (формат date=start=guests=duration=area)"},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    qs = Table.objects.filter(is_active=True, capacity__gte=guests_i)
-    if area:
-        qs = qs.filter(area_id=area)
-    if ttype:
-        qs = qs.filter(type=ttype)
+    def compute():
+        qs = Table.objects.filter(is_active=True, capacity__gte=guests_i)
+        if area:
+            qs = qs.filter(area_id=area)
+        if ttype:
+            qs = qs.filter(type=ttype)
 
-    visit_min = int(duration) if duration else None
-    info = availability_for_tables(
-        day, start_t, guests_i, qs, visit_min=visit_min if visit_min else None
-    )
-    out = []
-    for it in info:
-        au: Optional[str] = (
-            it.available_until.strftime("%H:%M")
-            if (it.available and it.available_until)
-            else None
+        info = availability_for_tables(
+            day,
+            start_t,
+            guests_i,
+            qs,
+            visit_min=visit_min if visit_min else None,
+            hold_id=hold,
         )
-        out.append(
-            {
-                "id": it.table.pk,
-                "name": it.table.name,
-                "capacity": it.table.capacity,
-                "type": it.table.type,
-                "x": float(it.table.x),
-                "y": float(it.table.y),
-                "available": it.available,
-                "available_until": au,
-            }
+        return _availability_payload(d, start, guests_i, area, visit_min, info)
+
+    params = {
+        "start": start,
+        "guests": guests_i,
+        "duration": visit_min,
+        "type": ttype,
+        "holds": holds.fingerprint(day, exclude=hold),
+    }
+    return Response(cached_availability("point", day, area, params, compute))
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def availability_grid(request):
+    """Доступность столов на весь день: все слоты × все столы.
+
+    Занятость и свободные слоты отдаются hex-строками битовых карт
+    (младший бит — первый интервал), чтобы клиент переключал время без
+    запросов к серверу.
+    """
+    d = request.query_params.get("date")
+    guests = request.query_params.get("guests")
+    area = request.query_params.get("area")
+    duration = request.query_params.get("duration")
+    ttype = request.query_params.get("type")
+    hold = request.query_params.get("hold") or None
+
+    if not d:
+        return Response(
+            {"detail": "date обязателен"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        day = _parse_date(d)
+        guests_i = int(guests) if guests else None
+        visit_min = _parse_duration(duration)
+        area = _parse_area(area)
+    except Exception:
+        return Response(
+            {"detail": "Некорректные параметры (формат date=guests=duration=area)"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def compute():
+        qs = Table.objects.filter(is_active=True).order_by("area__name", "name")
+        if guests_i:
+            qs = qs.filter(capacity__gte=guests_i)
+        if area:
+            qs = qs.filter(area_id=area)
+        if ttype:
+            qs = qs.filter(type=ttype)
+
+        tables = list(qs)
+        grid = day_grid(
+            day,
+            tables,
+            visit_min=visit_min,
+            area_id=area,
+            hold_id=hold,
+        )
+        return {
+            "date": d,
+            "area": area,
+            "guests": guests_i,
+            "duration": visit_min,
+            "open": localtime(grid.open_dt).strftime("%H:%M") if grid.open_dt else None,
+            "bucket_min": grid.bucket_min,
+            "buckets": grid.n_buckets,
+            "slots": [localtime(s).strftime("%H:%M") for s, _ in grid.slots],
+            "tables": [
+                {
+                    "id": t.pk,
+                    "capacity": t.capacity,
+                    "busy": format(grid.busy[t.pk], "x"),
+                    "free_slots": format(grid.free_slots[t.pk], "x"),
+                }
+                for t in tables
+            ],
+        }
+
+    params = {
+        "guests": guests_i,
+        "duration": visit_min,
+        "type": ttype,
+        "holds": holds.fingerprint(day, exclude=hold),
+    }
+    return Response(cached_availability("grid", day, area, params, compute))
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def availability_gaps(request):
+    """Свободные промежутки каждого стола на день, без привязки к длительности."""
+    d = request.query_params.get("date")
+    guests = request.query_params.get("guests")
+    area = request.query_params.get("area")
+    min_minutes = request.query_params.get("min")
+
+    if not d:
+        return Response(
+            {"detail": "date обязателен"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        day = _parse_date(d)
+        guests_i = int(guests) if guests else None
+        min_i = int(min_minutes) if min_minutes else 0
+        area = _parse_area(area)
+    except Exception:
+        return Response(
+            {"detail": "Некорректные параметры (формат date=guests=min=area)"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def compute():
+        qs = Table.objects.filter(is_active=True).order_by("area__name", "name")
+        if guests_i:
+            qs = qs.filter(capacity__gte=guests_i)
+        if area:
+            qs = qs.filter(area_id=area)
+
+        tables = list(qs)
+        gaps = free_gaps_for_tables(day, tables, min_minutes=min_i)
+        return {
+            "date": d,
+            "area": area,
+            "guests": guests_i,
+            "min": min_i,
+            "tables": [
+                {
+                    "id": t.pk,
+                    "name": t.name,
+                    "capacity": t.capacity,
+                    "area_id": t.area_id,
+                    "gaps": [
+                        [localtime(s).strftime("%H:%M"), localtime(e).strftime("%H:%M")]
+                        for s, e in gaps[t.pk]
+                    ],
+                }
+                for t in tables
+            ],
+        }
+
+    params = {"guests": guests_i, "min": min_i}
+    return Response(cached_availability("gaps", day, area, params, compute))
+
+
+def _alternative_item(alt) -> dict:
+    return {
+        "date": localdate(alt.start_dt).isoformat(),
+        "start": localtime(alt.start_dt).strftime("%H:%M"),
+        "end": localtime(alt.end_dt).strftime("%H:%M"),
+        "table_id": alt.table.pk,
+        "table_name": alt.table.name,
+        "capacity": alt.table.capacity,
+        "area_id": alt.table.area_id,
+    }
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def availability_alternatives(request):
+    """Ближайшие свободные слоты, если запрошенное время занято.
+
+    ``hold`` — удержание самого гостя: его стол не считается занятым.
+    """
+    d = request.query_params.get("date")
+    start = request.query_params.get("start")
+    guests = request.query_params.get("guests")
+    area = request.query_params.get("area")
+
+    if not d or not start or not guests:
+        return Response(
+            {"detail": "date, start, guests обязательны"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
+    try:
+        day = _parse_date(d)
+        start_t = parse_hhmm(start)
+        guests_i = int(guests)
+        visit_min = _parse_duration(request.query_params.get("duration"))
+        area_id = _parse_area(area)
+        # отрицательные и слишком большие значения прижимаются к допустимым
+        window = max(0, min(int(request.query_params.get("window", 2)), 12))
+        days = max(0, min(int(request.query_params.get("days", 3)), 14))
+        limit = max(1, min(int(request.query_params.get("limit", 5)), 20))
+    except Exception:
+        return Response(
+            {"detail": "Некорректные параметры (формат date=start=guests)"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    same_day, next_days = find_alternatives(
+        day,
+        start_t,
+        guests_i,
+        area_id=area_id,
+        visit_min=visit_min,
+        window_hours=window,
+        days_ahead=days,
+        limit=limit,
+        hold_id=request.query_params.get("hold") or None,
+    )
     return Response(
         {
             "date": d,
             "start": start,
             "guests": guests_i,
-            "area": int(area) if area else None,
-            "duration": visit_min if visit_min else None,
-            "tables": out,
+            "area": area_id,
+            "duration": visit_min,
+            "same_day": [_alternative_item(a) for a in same_day],
+            "next_days": [_alternative_item(a) for a in next_days],
         }
     )
 
@@ -134,80 +534,281 @@ def availability(request):
 @api_view(["DELETE"])
 @permission_classes([IsAuthenticated])
 def my_booking_cancel(request, pk: int):
-    r = Reservation.objects.filter(pk=pk, user=request.user).first()
-    if not r:
+    result = transition_status(pk, Reservation.Status.CANCELED, user=request.user)
+    if result == TRANSITION_NOT_FOUND:
         return Response(
             {"detail": "Бронь не найдена"}, status=status.HTTP_404_NOT_FOUND
         )
-
-    if r.status == Reservation.Status.CANCELED:
+    if result == TRANSITION_UNCHANGED:
         return Response({"detail": "Уже отменена"}, status=status.HTTP_400_BAD_REQUEST)
-
-    if r.status not in [Reservation.Status.PENDING, Reservation.Status.CONFIRMED]:
+    if result == TRANSITION_FORBIDDEN:
         return Response(
             {"detail": "Эту бронь нельзя отменить"}, status=status.HTTP_400_BAD_REQUEST
         )
-
-    r.status = Reservation.Status.CANCELED
-    r.save(update_fields=["status"])
+    if result == TRANSITION_CONFLICT:
+        return Response({"detail": STATUS_CONFLICT_DETAIL}, status=409)
     return Response({"ok": True})
 
 
+MY_BOOKINGS_PAGE = 20
+MY_BOOKINGS_PAGE_MAX = 100
+
+
+def _first_pages(qs: QuerySet, limit: int) -> dict:
+    """Первые ``limit + 1`` броней каждого статуса одним запросом."""
+    ranked = (
+        qs.annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("status")],
+                order_by=[F("datetime_start").desc(), F("id").desc()],
+            )
+        )
+        .filter(rank__lte=limit + 1)
+        .order_by("status", "-datetime_start", "-id")
+    )
+    by_status = defaultdict(list)
+    for row in projections.build(projections.select(ranked, RESERVATION_LIST), RESERVATION_LIST):
+        by_status[row["status"]].append(row)
+    return by_status
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERERS)
 def my_bookings_by_status(request):
-    qs = Reservation.objects.filter(user=request.user).order_by("-datetime_start")
+    """Брони гостя по вкладкам статусов, новые сверху.
 
-    counts = {}
-    by_status = {}
-    for code, _ in Reservation.Status.choices:
-        sub = qs.filter(status=code)
-        counts[code] = sub.count()
-        by_status[code] = ReservationListSerializer(sub, many=True).data
+    Без параметров — счётчики всех статусов и первая страница каждой
+    вкладки. ``?status=...&cursor=...`` — следующая страница одной вкладки.
+    Старая история (completed, canceled, no_show) подмешивается из архива.
+    """
+    try:
+        limit = min(int(request.query_params.get("limit", MY_BOOKINGS_PAGE)), MY_BOOKINGS_PAGE_MAX)
+        cursor = request.query_params.get("cursor")
+        cursor = cursors.decode(cursor) if cursor else None
+    except ValueError:
+        return Response({"detail": "Некорректные limit или cursor"}, status=400)
+    if limit < 1:
+        return Response({"detail": "Некорректные limit или cursor"}, status=400)
 
-    return Response(
-        {
-            "counts": counts,
-            "by_status": by_status,
-        }
+    hot = Reservation.objects.filter(user=request.user)
+    old = ReservationArchive.objects.filter(user=request.user)
+
+    code = request.query_params.get("status")
+    if code:
+        if code not in Reservation.Status.values:
+            return Response({"detail": "Недопустимый статус"}, status=400)
+        sources = [hot.filter(status=code)]
+        if code in archive.ARCHIVED_STATUSES:
+            sources.append(old.filter(status=code))
+        pages = [
+            projections.build(
+                projections.select(
+                    cursors.after(cursors.ordered(qs, descending=True), cursor, descending=True),
+                    RESERVATION_LIST,
+                )[: limit + 1],
+                RESERVATION_LIST,
+            )
+            for qs in sources
+        ]
+        rows, next_cursor = cursors.page(cursors.merge(pages, descending=True), limit)
+        return Response({"status": code, "results": rows, "next": next_cursor})
+
+    # счётчики броней и архива — один GROUP BY по двум таблицам
+    counts = dict.fromkeys(Reservation.Status.values, 0)
+    in_archive = set()
+    grouped = (
+        Reservation.objects.filter(user=request.user)
+        .values("status")
+        .annotate(n=Count("id"), archived=Value(False))
+        .order_by()
+        .union(
+            ReservationArchive.objects.filter(user=request.user)
+            .values("status")
+            .annotate(n=Count("id"), archived=Value(True))
+            .order_by(),
+            all=True,
+        )
     )
+    for row in grouped:
+        counts[row["status"]] += row["n"]
+        if row["archived"]:
+            in_archive.add(row["status"])
+
+    first = _first_pages(hot, limit)
+    first_old = _first_pages(old.filter(status__in=in_archive), limit) if in_archive else {}
+
+    by_status, next_cursors = {}, {}
+    for code in Reservation.Status.values:
+        merged = cursors.merge([first[code], first_old.get(code, [])], descending=True)
+        by_status[code], next_cursors[code] = cursors.page(merged, limit)
+
+    return Response({"counts": counts, "by_status": by_status, "next": next_cursors})
+
+
+def _hold_item(hold: holds.Hold) -> dict:
+    return {
+        "hold_id": hold.id,
+        "table_id": hold.table_id,
+        "start": localtime(hold.start_dt).strftime("%H:%M"),
+        "end": localtime(hold.end_dt).strftime("%H:%M"),
+        "expires_in": max(0, int(hold.expires_at - time.time())),
+    }
+
+
+class HoldRateThrottle(SimpleRateThrottle):
+    """Частота удержаний с одного адреса (DEFAULT_THROTTLE_RATES["holds"])."""
+
+    scope = "holds"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@throttle_classes([HoldRateThrottle])
+def place_hold(request):
+    """Удержать стол на время оформления брони (HOLD_TTL секунд).
+    Тело: ``date``, ``start``, ``table_id``, ``guests``, опционально ``duration``
+    и ``replace`` — прежнее удержание гостя, которое надо снять.
+    Один клиент держит не больше HOLD_MAX_PER_CLIENT удержаний сразу.
+    """
+    ser = HoldCreateSerializer(data=request.data)
+    ser.is_valid(raise_exception=True)
+    data = ser.validated_data
+
+    table = Table.objects.filter(pk=data["table_id"], is_active=True).first()
+    if not table:
+        return Response({"detail": "Стол не найден"}, status=404)
+    if table.capacity < data["guests"]:
+        return Response({"detail": "Стол не вмещает столько гостей"}, status=status.HTTP_400_BAD_REQUEST)
+    start_dt = combine(data["date"], data["start"])
+    end_dt = start_dt + timedelta(minutes=data.get("duration") or VISIT_MIN)
+    day_hours = hours.day_hours(data["date"], table.area_id)
+    if not day_hours or start_dt < day_hours.open_dt or end_dt > day_hours.close_dt:
+        return Response({"detail": "Вне часов работы зала"}, status=status.HTTP_400_BAD_REQUEST)
+    if not table_is_free(table, start_dt, end_dt):
+        return Response({"detail": TABLE_TAKEN_DETAIL}, status=409)
+
+    try:
+        hold = holds.place(
+            table.pk,
+            start_dt,
+            end_dt,
+            replace=data.get("replace") or None,
+            owner=HoldRateThrottle().get_ident(request),
+        )
+    except holds.TooManyHolds:
+        return Response({"detail": "Слишком много удержаний"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    except TimeoutError:
+        hold = None
+    if not hold:
+        return Response({"detail": "Стол сейчас оформляет другой гость"}, status=409)
+    return Response(_hold_item(hold), status=status.HTTP_201_CREATED)
+
+
+@api_view(["DELETE"])
+@permission_classes([AllowAny])
+def release_hold(request, hold_id: str):
+    holds.release(hold_id)
+    return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def create_booking(request):
-    serializer = ReservationCreateSerializer(
-        data=request.data, context={"request": request}
+    def handle():
+        serializer = ReservationCreateSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        obj = serializer.save()
+        send_booking_created.delay(obj.id)
+        return Response(
+            ReservationListSerializer(obj).data, status=status.HTTP_201_CREATED
+        )
+
+    # повтор с тем же Idempotency-Key получает первый ответ, без новой брони
+    return idempotent(request, "bookings", handle)
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def create_bookings_bulk(request):
+    """Пачка броней для групп и мероприятий.
+
+    Тело: ``{"mode": "all" | "partial", "bookings": [...]}``, элементы — как
+    у ``POST /api/bookings/``. Ошибки возвращаются с индексом элемента.
+    """
+    payload = ReservationBulkSerializer(data=request.data)
+    payload.is_valid(raise_exception=True)
+    partial = payload.validated_data["mode"] == "partial"
+
+    errors = {}
+    specs, indices = [], []
+    for i, item in enumerate(payload.validated_data["bookings"]):
+        s = ReservationBulkItemSerializer(data=item)
+        if s.is_valid():
+            specs.append(s.to_spec())
+            indices.append(i)
+        else:
+            errors[i] = s.errors
+
+    created = []
+    if partial or not errors:
+        try:
+            result = bulk_create_reservations(specs, partial=partial)
+        except TableTaken:
+            return Response({"detail": TABLE_TAKEN_DETAIL}, status=409)
+        errors.update({indices[i]: e for i, e in result.errors.items()})
+        created = [(indices[i], r) for i, r in result.created]
+
+    if created:
+        send_bookings_created.delay([r.id for _, r in created])
+    return Response(
+        {
+            "created": [
+                {"index": i, **ReservationListSerializer(r).data} for i, r in created
+            ],
+            "errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)],
+        },
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
     )
-    serializer.is_valid(raise_exception=True)
-    obj = serializer.save()
-    send_booking_created.delay(obj.id)
-    return Response(ReservationListSerializer(obj).data, status=status.HTTP_201_CREATED)
+
+
+def _transition_error(result: str) -> Optional[Response]:
+    if result == TRANSITION_NOT_FOUND:
+        return Response({"detail": "Бронь не найдена"}, status=404)
+    if result == TRANSITION_FORBIDDEN:
+        return Response({"detail": "Недопустимый переход статуса"}, status=400)
+    if result == TRANSITION_CONFLICT:
+        return Response({"detail": STATUS_CONFLICT_DETAIL}, status=409)
+    if result == TRANSITION_TABLE_TAKEN:
+        return Response({"detail": TABLE_TAKEN_DETAIL}, status=409)
+    return None
 
 
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
 def manager_confirm(request, pk: int):
-    r = Reservation.objects.filter(pk=pk).first()
-    if not r:
-        return Response({"detail": "Не найдено"}, status=404)
-    if r.status == Reservation.Status.CANCELED:
-        return Response({"detail": "Бронь отменена"}, status=400)
-    r.status = Reservation.Status.CONFIRMED
-    r.save(update_fields=["status"])
-    send_booking_confirmed.delay(r.id)
-    schedule_reminder.delay(r.id, hours_before=2)
+    result = transition_status(pk, Reservation.Status.CONFIRMED)
+    error = _transition_error(result)
+    if error:
+        return error
+    if result == TRANSITION_OK:
+        send_booking_confirmed.delay(pk)
+        schedule_reminder.delay(pk, hours_before=2)
     return Response({"ok": True})
 
 
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
 def manager_cancel(request, pk: int):
-    r = Reservation.objects.filter(pk=pk).first()
-    if not r:
-        return Response({"detail": "Не найдено"}, status=404)
-    r.status = Reservation.Status.CANCELED
-    r.save(update_fields=["status"])
+    error = _transition_error(transition_status(pk, Reservation.Status.CANCELED))
+    if error:
+        return error
     return Response({"ok": True})
 
 
@@ -220,66 +821,195 @@ def manager_status_choices(request):
 
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+def manager_availability_cache_stats(request):
+    return Response(availability_stats())
+
+
+MANAGER_PAGE_MAX = 500
+MANAGER_STREAM_CHUNK = 500
+
+
+def _stream_list(rows):
+    """Тело ``{"results": [...], "count": N}`` по частям, строка за строкой.
+
+    Строки читаются из базы порциями через ``iterator()``, поэтому память не
+    растёт с длиной списка, а первые байты уходят сразу.
+    """
+    yield b'{"results":['
+    n = 0
+    for row in rows:
+        yield (b"," if n else b"") + renderers.dumps(row)
+        n += 1
+    yield b'],"count":%d}' % n
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@renderer_classes(LIST_RENDERERS)
 def manager_bookings_list(request):
+    """Брони для панели менеджера в порядке начала.
+
+    Фильтры: ``date_from``, ``date_to``, ``status`` (можно несколько),
+    ``table``, ``area``, ``user``. ``limit`` включает постраничную выдачу
+    (``next`` — курсор следующей страницы), ``stream=1`` отдаёт весь список
+    потоком без сборки ответа в памяти.
+    """
     date_from = request.query_params.get("date_from")
     date_to = request.query_params.get("date_to")
     statuses = request.query_params.getlist("status")
 
-    qs = Reservation.objects.select_related("table", "table__area", "user").order_by(
-        "datetime_start"
-    )
-
+    filters = {}
     if date_from:
         try:
-            qs = qs.filter(datetime_start__date__gte=date.fromisoformat(date_from))
+            date_from = date.fromisoformat(date_from)
         except Exception:
             return Response({"detail": "Некорректный date_from"}, status=400)
+        filters["service_date__gte"] = date_from
     if date_to:
         try:
-            qs = qs.filter(datetime_start__date__lte=date.fromisoformat(date_to))
+            filters["service_date__lte"] = date.fromisoformat(date_to)
         except Exception:
             return Response({"detail": "Некорректный date_to"}, status=400)
     if statuses:
-        qs = qs.filter(status__in=statuses)
+        filters["status__in"] = statuses
 
     table = request.query_params.get("table")
     if table:
-        qs = qs.filter(table_id=table)
+        filters["table_id"] = table
     area = request.query_params.get("area")
     if area:
-        qs = qs.filter(table__area_id=area)
+        filters["area_id"] = area
     user = request.query_params.get("user")
     if user:
-        qs = qs.filter(user_id=user)
+        filters["user_id"] = user
+
+    try:
+        limit = request.query_params.get("limit")
+        limit = min(int(limit), MANAGER_PAGE_MAX) if limit else None
+        cursor = request.query_params.get("cursor")
+        cursor = cursors.decode(cursor) if cursor else None
+    except ValueError:
+        return Response({"detail": "Некорректные limit или cursor"}, status=400)
+    if (limit is not None and limit < 1) or (cursor and not limit):
+        return Response({"detail": "Некорректные limit или cursor"}, status=400)
+
+    sources = [Reservation.objects.filter(**filters)]
+    # свежие дни, которых нет в архиве, его не читают
+    if archive.reaches(date_from):
+        sources.append(ReservationArchive.objects.filter(**filters))
+    sources = [
+        projections.select(cursors.after(cursors.ordered(qs), cursor), MANAGER_LIST)
+        for qs in sources
+    ]
+
+    if limit:
+        pages = (projections.build(qs[: limit + 1], MANAGER_LIST) for qs in sources)
+        rows, next_cursor = cursors.page(cursors.merge(pages), limit)
+        return Response({"count": len(rows), "results": rows, "next": next_cursor})
+
+    if request.query_params.get("stream") == "1":
+        rows = cursors.merge(
+            projections.build(qs.iterator(chunk_size=MANAGER_STREAM_CHUNK), MANAGER_LIST)
+            for qs in sources
+        )
+        return StreamingHttpResponse(_stream_list(rows), content_type="application/json")
+
+    rows = list(cursors.merge(projections.build(qs, MANAGER_LIST) for qs in sources))
+    return Response({"count": len(rows), "results": rows})
 
-    data = [ManagerBookingListItem(r).data for r in qs]
-    return Response({"count": len(data), "results": data})
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def manager_calendar(request):
+    """Сводка месяца для календаря: ``?month=YYYY-MM``, фильтры как у списка броней.
+
+    Полные строки броней календарю не нужны — их панель берёт только за
+    выбранный день.
+    """
+    try:
+        year, month = (int(x) for x in request.query_params.get("month", "").split("-"))
+        first = date(year, month, 1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    except (ValueError, OverflowError):  # 9999-12: следующего месяца уже нет
+        return Response({"detail": "month в формате YYYY-MM обязателен"}, status=400)
+
+    filters = {}
+    statuses = request.query_params.getlist("status")
+    if statuses:
+        filters["status__in"] = statuses
+    for param, field in (("area", "area_id"), ("table", "table_id")):
+        value = request.query_params.get(param)
+        if value:
+            if not value.isdigit():
+                return Response({"detail": f"Некорректный {param}"}, status=400)
+            filters[field] = int(value)
+
+    return Response(
+        {
+            "date_from": first.isoformat(),
+            "date_to": last.isoformat(),
+            "days": calendar_summary(first, last, **filters),
+        }
+    )
+
+
+BATCH_STATUS_MAX = 500
 
 
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
-def manager_set_status(request, pk: int):
-    r = Reservation.objects.filter(pk=pk).first()
-    if not r:
-        return Response({"detail": "Бронь не найдена"}, status=404)
+def manager_set_status_batch(request):
+    """Сменить статус сразу многим броням: ``{"ids": [...], "status": "..."}``.
 
+    Для каждой брони возвращается результат: ok, unchanged, not_found,
+    forbidden, conflict или table_taken.
+    """
+    new_status = request.data.get("status")
+    if new_status not in Reservation.Status.values:
+        return Response({"detail": "Недопустимый статус"}, status=400)
+    try:
+        ids = [int(i) for i in request.data.get("ids") or []]
+    except (TypeError, ValueError):
+        return Response({"detail": "ids — список id броней"}, status=400)
+    if not ids or len(ids) > BATCH_STATUS_MAX:
+        return Response(
+            {"detail": f"Нужно от 1 до {BATCH_STATUS_MAX} id"}, status=400
+        )
+
+    results = set_status_batch(ids, new_status)
+    changed = [pk for pk, result in results.items() if result == TRANSITION_OK]
+    if new_status == Reservation.Status.CONFIRMED:
+        notify_confirmed(changed, hours_before=2)
+
+    return Response(
+        {
+            "status": new_status,
+            "updated": len(changed),
+            "results": [{"id": pk, "result": r} for pk, r in results.items()],
+        }
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def manager_set_status(request, pk: int):
     new_status = request.data.get("status")
-    allowed = {code for code, _ in Reservation.Status.choices}
-    if new_status not in allowed:
+    # expected — статус, который видел менеджер; если его успели сменить — 409
+    expected = request.data.get("expected") or None
+    allowed = Reservation.Status.values
+    if new_status not in allowed or (expected and expected not in allowed):
         return Response({"detail": "Недопустимый статус"}, status=400)
 
-    prev = r.status
-    r.status = new_status
-    r.save(update_fields=["status"])
+    result = transition_status(pk, new_status, expected=expected)
+    error = _transition_error(result)
+    if error:
+        return error
 
-    if (
-        new_status == Reservation.Status.CONFIRMED
-        and prev != Reservation.Status.CONFIRMED
-    ):
-        send_booking_confirmed.delay(r.id)  # <- письмо с QR
-        schedule_reminder.delay(r.id, hours_before=2)
+    if result == TRANSITION_OK and new_status == Reservation.Status.CONFIRMED:
+        send_booking_confirmed.delay(pk)  # <- письмо с QR
+        schedule_reminder.delay(pk, hours_before=2)
 
-    return Response({"ok": True, "id": r.id, "status": r.status})
+    return Response({"ok": True, "id": pk, "status": new_status})
 
 
 def _get_day(param: Optional[str]):
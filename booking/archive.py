@@ -0,0 +1,122 @@
+"""Архив завершённых броней.
+
+Брони в финальных статусах, закончившиеся раньше горизонта
+``ARCHIVE_AFTER_DAYS``, переносятся порциями в ``ReservationArchive``
+(``manage.py archive_reservations``). Доступность, подбор стола и список
+менеджера за день читают только основную таблицу и её индексы, которые
+больше не растут вместе с историей; отчёты и кабинет гостя читают архив.
+Список и календарь менеджера добавляют архив, только если запрошенные дни
+не позже ``last_day()``.
+"""
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+
+from booking.models import Reservation, ReservationArchive
+
+ARCHIVED_STATUSES = (
+    Reservation.Status.COMPLETED,
+    Reservation.Status.CANCELED,
+    Reservation.Status.NO_SHOW,
+)
+CHUNK = 1000
+LAST_DAY_KEY = "rb:archive:last_day"
+FIELDS = (
+    "id",
+    "user_id",
+    "table_id",
+    "area_id",
+    "service_date",
+    "datetime_start",
+    "datetime_end",
+    "guests",
+    "name",
+    "phone",
+    "email",
+    "status",
+    "comment",
+    "created_at",
+)
+
+
+def horizon(today: Optional[date] = None) -> date:
+    """Первый день, брони которого ещё не архивируются."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+
+def candidates(before: datetime) -> QuerySet:
+    return Reservation.objects.filter(
+        status__in=ARCHIVED_STATUSES, datetime_end__lt=before
+    )
+
+
+def _delete(ids) -> None:
+    # QuerySet.delete() поднимает каждую строку ради post_delete; архивируются
+    # только неактивные брони, кэши доступности от них не зависят
+    table = connection.ops.quote_name(Reservation._meta.db_table)
+    marks = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {table} WHERE id IN ({marks})", ids)
+
+
+def archive_chunk(before: datetime, chunk: int = CHUNK) -> int:
+    """Перенести в архив одну порцию; 0 — переносить больше нечего."""
+    with transaction.atomic():
+        rows = list(
+            candidates(before)
+            .select_for_update()
+            .order_by("pk")
+            .values(*FIELDS)[:chunk]
+        )
+        if not rows:
+            return 0
+        ReservationArchive.objects.bulk_create(
+            [ReservationArchive(**row) for row in rows]
+        )
+        _delete([row["id"] for row in rows])
+        transaction.on_commit(forget_last_day)
+    return len(rows)
+
+
+def archive_before(before: datetime, chunk: int = CHUNK) -> Iterator[int]:
+    """Архивировать всё до ``before`` порциями; отдаёт размер каждой порции.
+
+    Каждая порция — своя короткая транзакция, так что брони не блокируются
+    надолго, а прерванный прогон можно просто запустить снова.
+    """
+    while True:
+        moved = archive_chunk(before, chunk)
+        if not moved:
+            return
+        yield moved
+
+
+def last_day() -> Optional[date]:
+    """Последний день, за который в архиве есть брони; None — архив пуст.
+
+    Читателям архива нужен именно он, а не ``horizon()``: горизонт считается
+    от текущего ARCHIVE_AFTER_DAYS, а архив мог наполниться при другом.
+    Значение держим в кэше до следующего переноса.
+    """
+    found = cache.get(LAST_DAY_KEY)
+    if found is None:
+        last = ReservationArchive.objects.aggregate(last=Max("service_date"))["last"]
+        found = last.isoformat() if last else ""
+        cache.set(LAST_DAY_KEY, found, timeout=None)
+    return date.fromisoformat(found) if found else None
+
+
+def forget_last_day() -> None:
+    cache.delete(LAST_DAY_KEY)
+
+
+def reaches(first: Optional[date]) -> bool:
+    """Нужно ли читать архив для отрезка, начинающегося с ``first`` (None — без начала)."""
+    last = last_day()
+    return last is not None and (first is None or first <= last)
@@ -0,0 +1,353 @@
+"""Синтетические рестораны и замеры горячих путей бронирования.
+
+Используется командами ``manage.py bench``, ``manage.py bench_http`` и
+``manage.py replay_pick_table``.
+"""
+import asyncio
+import random
+import time as pytime
+from datetime import date, time, timedelta
+from typing import Callable, Dict, List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from booking.models import Area, Reservation, Table
+from booking.services import availability_for_tables, combine, pick_table
+
+# areas, tables per area, months of reservations
+SCALES: Dict[str, Sequence[int]] = {
+    "small": (2, 10, 1),
+    "medium": (3, 30, 3),
+    "large": (5, 60, 6),
+}
+BOOKINGS_PER_TABLE_DAY = 4
+# строк в сценариях list_rows_*: p50 в мс на LIST_ROWS строк = мкс на строку
+LIST_ROWS = 1000
+CAPACITIES = (1, 2, 2, 4, 4, 4, 6)
+STATUSES = (
+    [Reservation.Status.COMPLETED] * 5
+    + [Reservation.Status.CONFIRMED] * 3
+    + [Reservation.Status.PENDING] * 2
+    + [Reservation.Status.CANCELED, Reservation.Status.NO_SHOW]
+)
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+class Restaurant:
+    """Созданные для замера данные: залы, столы, дни, менеджер."""
+
+    def __init__(self, areas, tables, days, admin):
+        self.areas = areas
+        self.tables = tables
+        self.days = days
+        self.admin = admin
+
+
+def build_restaurant(
+    n_areas: int, tables_per_area: int, months: int, rnd: random.Random
+) -> Restaurant:
+    areas = [
+        Area.objects.create(name=f"Bench area {i}", order=i) for i in range(n_areas)
+    ]
+    tables = Table.objects.bulk_create(
+        [
+            Table(
+                area=area,
+                name=f"B-{a}-{i}",
+                capacity=rnd.choice(CAPACITIES),
+                x=rnd.randint(5, 95),
+                y=rnd.randint(5, 95),
+            )
+            for a, area in enumerate(areas)
+            for i in range(tables_per_area)
+        ]
+    )
+
+    # последний месяц — будущие брони, остальное — история
+    first = timezone.localdate() - timedelta(days=30 * (months - 1))
+    days = [first + timedelta(days=i) for i in range(30 * months)]
+
+    batch: List[Reservation] = []
+    for day in days:
+        for table in tables:
+            minute = 12 * 60
+            for _ in range(BOOKINGS_PER_TABLE_DAY):
+                minute += rnd.choice((0, 15, 30, 45))
+                length = rnd.choice((60, 90, 120))
+                if minute + length > 22 * 60:
+                    break
+                start = combine(day, time(minute // 60, minute % 60))
+                r = Reservation(
+                    table=table,
+                    datetime_start=start,
+                    datetime_end=start + timedelta(minutes=length),
+                    guests=rnd.randint(1, table.capacity),
+                    name="Bench guest",
+                    email="bench@example.com",
+                    comment="synthetic",
+                    status=rnd.choice(STATUSES),
+                )
+                r.fill_denormalized()  # bulk_create не вызывает save()
+                batch.append(r)
+                minute += length + 15
+        if len(batch) >= 5000:
+            Reservation.objects.bulk_create(batch)
+            batch = []
+    Reservation.objects.bulk_create(batch)
+
+    admin = get_user_model().objects.create_superuser(
+        email="bench-admin@example.com",
+        password="bench",
+        first_name="Bench",
+        phone="+70000000000",
+    )
+    return Restaurant(areas, tables, days, admin)
+
+
+def measure(calls: Sequence[Callable[[], object]]) -> Dict[str, float]:
+    """Время и число запросов к БД на каждый вызов."""
+    timings, queries = [], []
+    wall0 = pytime.perf_counter()
+    for call in calls:
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = pytime.perf_counter()
+            call()
+            timings.append((pytime.perf_counter() - t0) * 1000)
+        queries.append(len(ctx.captured_queries))
+    return {
+        "calls": len(calls),
+        "wall_s": round(pytime.perf_counter() - wall0, 4),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "queries_avg": round(sum(queries) / len(queries), 2) if queries else 0,
+        "queries_max": max(queries, default=0),
+    }
+
+
+def _future_day(r: Restaurant, rnd: random.Random) -> date:
+    return rnd.choice(r.days[-30:])
+
+
+def _start(rnd: random.Random) -> time:
+    return time(rnd.randint(12, 19), rnd.choice((0, 15, 30, 45)))
+
+
+def scenarios(
+    r: Restaurant, rnd: random.Random, n: int
+) -> Dict[str, List[Callable[[], object]]]:
+    """Вызовы горячих путей со случайными параметрами, по n на сценарий."""
+    from rest_framework.renderers import JSONRenderer
+
+    from booking.api import projections, renderers
+    from booking.api.serializers import ManagerBookingListItem, ReservationCreateSerializer
+    from booking.api.views import manager_bookings_list, manager_calendar
+
+    factory = APIRequestFactory()
+    guest = factory.post("/api/bookings/")
+    guest.user = AnonymousUser()
+
+    def availability():
+        day, start = _future_day(r, rnd), _start(rnd)
+        guests = rnd.randint(1, 6)
+        area = rnd.choice(r.areas)
+        qs = Table.objects.filter(is_active=True, capacity__gte=guests, area=area)
+        return lambda: availability_for_tables(day, start, guests, qs, visit_min=90)
+
+    def pick():
+        day, start, guests = _future_day(r, rnd), _start(rnd), rnd.randint(1, 6)
+        return lambda: pick_table(day, start, guests, visit_min=90)
+
+    def create():
+        payload = {
+            "date": _future_day(r, rnd).isoformat(),
+            "start": _start(rnd).strftime("%H:%M"),
+            "guests": rnd.randint(1, 4),
+            "name": "Bench guest",
+            "email": "bench@example.com",
+            "duration_min": 90,
+        }
+
+        def call():
+            s = ReservationCreateSerializer(data=payload, context={"request": guest})
+            if s.is_valid():
+                s.save()
+
+        return call
+
+    def manager_list():
+        day = _future_day(r, rnd)
+
+        def call():
+            req = factory.get(
+                "/api/manager/bookings/",
+                {"date_from": day.isoformat(), "date_to": day.isoformat()},
+            )
+            force_authenticate(req, user=r.admin)
+            return manager_bookings_list(req).render()
+
+        return call
+
+    def manager_month():
+        day = _future_day(r, rnd).replace(day=1)
+
+        def call():
+            req = factory.get(
+                "/api/manager/bookings/",
+                {
+                    "date_from": day.isoformat(),
+                    "date_to": (day + timedelta(days=30)).isoformat(),
+                },
+            )
+            force_authenticate(req, user=r.admin)
+            return manager_bookings_list(req).render()
+
+        return call
+
+    def calendar_month():
+        day = _future_day(r, rnd)
+
+        def call():
+            req = factory.get("/api/manager/calendar/", {"month": day.strftime("%Y-%m")})
+            force_authenticate(req, user=r.admin)
+            return manager_calendar(req).render()
+
+        return call
+
+    def list_rows(fast: bool):
+        # одни и те же LIST_ROWS строк: ModelSerializer + json против values_list + orjson
+        def build():
+            day = rnd.choice(r.days[: -30] or r.days)
+            qs = Reservation.objects.filter(service_date__gte=day).order_by("datetime_start", "id")
+            if fast:
+                fields = projections.MANAGER_LIST
+                rows = projections.select(qs, fields)[:LIST_ROWS]
+                return lambda: renderers.dumps(list(projections.build(rows, fields)))
+            rows = qs.select_related("table", "table__area", "user")[:LIST_ROWS]
+            return lambda: JSONRenderer().render(ManagerBookingListItem(rows, many=True).data)
+
+        return build
+
+    builders = {
+        "availability_for_tables": availability,
+        "pick_table": pick,
+        "reservation_create": create,
+        "manager_bookings_day": manager_list,
+        "manager_bookings_month": manager_month,
+        "manager_calendar_month": calendar_month,
+        "list_rows_serializer": list_rows(fast=False),
+        "list_rows_projection": list_rows(fast=True),
+    }
+    return {
+        name: [build() for _ in range(max(1, n // 10 if "month" in name or "rows" in name else n))]
+        for name, build in builders.items()
+    }
+
+
+async def _http_get(host: str, port: int, path: str) -> Tuple[int, float]:
+    t0 = pytime.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        head = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    status = int(head.split()[1]) if head else 0
+    return status, (pytime.perf_counter() - t0) * 1000
+
+
+async def _slow_client(host: str, port: int, path: str, stop: asyncio.Event):
+    """Клиент на плохой сети: шлёт заголовки по строке в секунду до конца замера."""
+    try:
+        _, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n".encode())
+        while not stop.is_set():
+            await writer.drain()
+            try:
+                await asyncio.wait_for(stop.wait(), 1.0)
+            except asyncio.TimeoutError:
+                writer.write(b"X-Slow: 1\r\n")
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def http_load(
+    url: str,
+    concurrency: int,
+    total: int,
+    slow_clients: int = 0,
+    timeout: float = 30.0,
+) -> Dict[str, float]:
+    """Нагрузить URL ``total`` GET-запросами по ``concurrency`` одновременно.
+
+    ``slow_clients`` соединений всё это время медленно досылают запрос —
+    так sync-воркеры WSGI оказываются заняты, а ASGI-сервер нет.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+    stop = asyncio.Event()
+    slow = [
+        asyncio.create_task(_slow_client(host, port, path, stop))
+        for _ in range(slow_clients)
+    ]
+    if slow:
+        await asyncio.sleep(0.5)
+
+    timings: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            try:
+                status, ms = await asyncio.wait_for(
+                    _http_get(host, port, path), timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            if status != 200:
+                errors += 1
+            timings.append(ms)
+
+    wall0 = pytime.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = pytime.perf_counter() - wall0
+    stop.set()
+    await asyncio.gather(*slow)
+
+    return {
+        "concurrency": concurrency,
+        "slow_clients": slow_clients,
+        "requests": total,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "rps": round(len(timings) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+    }
@@ -0,0 +1,227 @@
+"""Общий кэш: версии дней, схемы зала и часов работы и кэш ответов доступности.
+
+Ответы хранятся под ключом с текущими версиями (день, зал), схемы зала и
+часов работы. Любая запись брони, стола, зала или расписания после
+коммита увеличивает свою версию, и
+старые ответы больше не читаются — они просто истекают по TTL.
+"""
+import hashlib
+import time
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LAYOUT_VERSION_KEY = "rb:layout:v"
+LAYOUT_CHANGED_KEY = "rb:layout:at"
+HOURS_VERSION_KEY = "rb:hours:v"
+AVAILABILITY_VERSION_KEY = "rb:avail:v:{day}:{area}"
+AVAILABILITY_KEY = "rb:avail:{kind}:{day}:{area}:{version}:{params}"
+STATS_KEY = "rb:avail:stats:{name}"
+
+
+def get_version(key: str) -> int:
+    v = cache.get(key)
+    if v is None:
+        # время, а не 0: после вытеснения ключа версия не повторится
+        cache.add(key, time.time_ns(), timeout=None)
+        v = cache.get(key)
+    return v
+
+
+def get_versions(*keys: str) -> Tuple[int, ...]:
+    found = cache.get_many(keys)
+    return tuple(found[k] if k in found else get_version(k) for k in keys)
+
+
+async def aget_version(key: str) -> int:
+    v = await cache.aget(key)
+    if v is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        v = await cache.aget(key)
+    return v
+
+
+async def aget_versions(*keys: str) -> Tuple[int, ...]:
+    found = await cache.aget_many(keys)
+    return tuple(
+        [found[k] if k in found else await aget_version(k) for k in keys]
+    )
+
+
+def bump_versions(keys: Iterable[str]) -> None:
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(keys: Iterable[str]) -> None:
+    keys = list(keys)
+    transaction.on_commit(lambda: bump_versions(keys))
+
+
+def bump_layout() -> None:
+    bump_versions([LAYOUT_VERSION_KEY])
+    cache.set(LAYOUT_CHANGED_KEY, time.time(), timeout=None)
+
+
+def bump_layout_on_commit() -> None:
+    transaction.on_commit(bump_layout)
+
+
+def layout_state() -> Tuple[int, float]:
+    """Версия схемы зала и время её изменения (unix) — для ETag и Last-Modified.
+
+    Только кэш, без запросов к БД. Если ключи вытеснены, версия начинается
+    заново, а временем изменения считается «сейчас»: клиенты перезапросят схему.
+    """
+    found = cache.get_many([LAYOUT_VERSION_KEY, LAYOUT_CHANGED_KEY])
+    version = found.get(LAYOUT_VERSION_KEY) or get_version(LAYOUT_VERSION_KEY)
+    changed = found.get(LAYOUT_CHANGED_KEY)
+    if changed is None:
+        cache.add(LAYOUT_CHANGED_KEY, time.time(), timeout=None)
+        changed = cache.get(LAYOUT_CHANGED_KEY)
+    return version, changed
+
+
+async def alayout_state() -> Tuple[int, float]:
+    """Асинхронный ``layout_state``."""
+    found = await cache.aget_many([LAYOUT_VERSION_KEY, LAYOUT_CHANGED_KEY])
+    version = found.get(LAYOUT_VERSION_KEY) or await aget_version(LAYOUT_VERSION_KEY)
+    changed = found.get(LAYOUT_CHANGED_KEY)
+    if changed is None:
+        await cache.aadd(LAYOUT_CHANGED_KEY, time.time(), timeout=None)
+        changed = await cache.aget(LAYOUT_CHANGED_KEY)
+    return version, changed
+
+
+def _area_part(area_id: Optional[int]) -> str:
+    return str(area_id) if area_id else "all"
+
+
+def availability_version_keys(
+    day_areas: Iterable[Tuple[date, Optional[int]]]
+) -> set:
+    """Ключи версий, которые надо поднять: зал брони и «все залы»."""
+    keys = set()
+    for day, area_id in day_areas:
+        keys.add(AVAILABILITY_VERSION_KEY.format(day=day.isoformat(), area="all"))
+        if area_id:
+            keys.add(
+                AVAILABILITY_VERSION_KEY.format(
+                    day=day.isoformat(), area=_area_part(area_id)
+                )
+            )
+    return keys
+
+
+def _count(name: str) -> None:
+    key = STATS_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(name: str) -> None:
+    key = STATS_KEY.format(name=name)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def _availability_key(
+    kind: str,
+    day: date,
+    area_id: Optional[int],
+    params: Dict[str, object],
+    versions: Tuple[int, ...],
+) -> str:
+    raw = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    return AVAILABILITY_KEY.format(
+        kind=kind,
+        day=day.isoformat(),
+        area=_area_part(area_id),
+        version="-".join(str(v) for v in versions),
+        params=hashlib.md5(raw.encode()).hexdigest(),
+    )
+
+
+def _availability_version_keys(day: date, area_id: Optional[int]) -> Tuple[str, ...]:
+    return (
+        AVAILABILITY_VERSION_KEY.format(day=day.isoformat(), area=_area_part(area_id)),
+        LAYOUT_VERSION_KEY,
+        HOURS_VERSION_KEY,
+    )
+
+
+def cached_availability(
+    kind: str,
+    day: date,
+    area_id: Optional[int],
+    params: Dict[str, object],
+    compute: Callable[[], dict],
+) -> dict:
+    """Ответ эндпоинта доступности из кэша или ``compute()``."""
+    if not settings.AVAILABILITY_CACHE_TTL:
+        return compute()
+
+    # версии читаем до расчёта: если бронь появится во время расчёта,
+    # ответ ляжет под старую версию и читать его уже не будут
+    versions = get_versions(*_availability_version_keys(day, area_id))
+    key = _availability_key(kind, day, area_id, params, versions)
+    data = cache.get(key)
+    if data is not None:
+        _count("hit")
+        return data
+
+    _count("miss")
+    data = compute()
+    cache.set(key, data, timeout=settings.AVAILABILITY_CACHE_TTL)
+    return data
+
+
+async def acached_availability(
+    kind: str,
+    day: date,
+    area_id: Optional[int],
+    params: Dict[str, object],
+    compute: Callable[[], Awaitable[dict]],
+) -> dict:
+    """Асинхронный ``cached_availability``: ключи те же, ``compute`` — корутина."""
+    if not settings.AVAILABILITY_CACHE_TTL:
+        return await compute()
+
+    versions = await aget_versions(*_availability_version_keys(day, area_id))
+    key = _availability_key(kind, day, area_id, params, versions)
+    data = await cache.aget(key)
+    if data is not None:
+        await _acount("hit")
+        return data
+
+    await _acount("miss")
+    data = await compute()
+    await cache.aset(key, data, timeout=settings.AVAILABILITY_CACHE_TTL)
+    return data
+
+
+def availability_stats() -> Dict[str, object]:
+    hits = cache.get(STATS_KEY.format(name="hit"), 0)
+    misses = cache.get(STATS_KEY.format(name="miss"), 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def reset_availability_stats() -> None:
+    cache.delete_many([STATS_KEY.format(name=n) for n in ("hit", "miss")])
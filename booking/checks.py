@@ -0,0 +1,20 @@
+"""Проверки настроек для продакшена (``manage.py check --deploy``)."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    if settings.CACHE_URL:
+        return []
+    return [
+        Warning(
+            "CACHE_URL не задан: кэш у каждого воркера свой.",
+            hint=(
+                "Idempotency-Key не защитит от дубля, если повтор придёт на другой "
+                "воркер; кэш доступности и часов работы по умолчанию выключен, схема зала "
+                "отдаётся без ETag. Задайте CACHE_URL (Redis)."
+            ),
+            id="booking.W001",
+        )
+    ]
@@ -0,0 +1,222 @@
+"""Короткие удержания (стол, интервал) на время оформления брони.
+
+Удержания дня лежат одним словарем в общем кэше (Redis или локальный кэш
+процесса) и истекают сами: просроченные отбрасываются при чтении.
+Доступность, подбор стола и создание брони считают чужие удержания
+занятым временем, поэтому спор за стол решается до записи в базу.
+Удержания одного клиента (``owner``) учитываются отдельно, чтобы один клиент
+не мог занять удержаниями весь зал.
+"""
+import hashlib
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+HOLDS_KEY = "rb:holds:{day}"
+HOLD_DAY_KEY = "rb:hold:{hold_id}"
+OWNER_KEY = "rb:holds:owner:{owner}"
+LOCK_KEY = "rb:holds:lock:{day}"
+OWNER_LOCK_KEY = "rb:holds:owner-lock:{owner}"
+LOCK_TTL = 5
+LOCK_WAIT_S = 2
+
+
+@dataclass(frozen=True)
+class Hold:
+    id: str
+    table_id: int
+    start_dt: datetime
+    end_dt: datetime
+    expires_at: float  # time.time()
+    owner: str = ""
+
+
+@contextmanager
+def _locked(key: str):
+    deadline = time.monotonic() + LOCK_WAIT_S
+    while not cache.add(key, 1, timeout=LOCK_TTL):
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Удержания заняты другим запросом")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def _alive(stored: Optional[Dict[str, Hold]]) -> Dict[str, Hold]:
+    now = time.time()
+    return {k: h for k, h in (stored or {}).items() if h.expires_at > now}
+
+
+def active(day: date) -> Dict[str, Hold]:
+    return _alive(cache.get(HOLDS_KEY.format(day=day.isoformat())))
+
+
+async def aactive(day: date) -> Dict[str, Hold]:
+    return _alive(await cache.aget(HOLDS_KEY.format(day=day.isoformat())))
+
+
+def _by_table(
+    day_holds: Dict[str, Hold], exclude: Optional[str]
+) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    out: Dict[int, List[Tuple[datetime, datetime]]] = {}
+    for h in day_holds.values():
+        if h.id != exclude:
+            out.setdefault(h.table_id, []).append((h.start_dt, h.end_dt))
+    return out
+
+
+def held_intervals(
+    day: date, exclude: Optional[str] = None
+) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """Чужие удержания дня по столам; ``exclude`` — своё удержание гостя."""
+    return _by_table(active(day), exclude)
+
+
+def _ids_digest(day_holds: Dict[str, Hold], exclude: Optional[str]) -> str:
+    ids = sorted(k for k in day_holds if k != exclude)
+    return hashlib.md5(",".join(ids).encode()).hexdigest() if ids else ""
+
+
+def fingerprint(day: date, exclude: Optional[str] = None) -> str:
+    """Отпечаток действующих удержаний дня — часть ключа кэша доступности."""
+    return _ids_digest(active(day), exclude)
+
+
+async def afingerprint(day: date, exclude: Optional[str] = None) -> str:
+    return _ids_digest(await aactive(day), exclude)
+
+
+def conflicts(
+    table_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    exclude: Optional[str] = None,
+) -> bool:
+    day = timezone.localdate(start_dt)
+    return any(
+        s < end_dt and start_dt < e
+        for s, e in held_intervals(day, exclude).get(table_id, ())
+    )
+
+
+class TooManyHolds(Exception):
+    """У клиента уже HOLD_MAX_PER_CLIENT действующих удержаний."""
+
+
+def _owner_holds(owner: str) -> Dict[str, float]:
+    now = time.time()
+    stored = cache.get(OWNER_KEY.format(owner=owner)) or {}
+    return {k: exp for k, exp in stored.items() if exp > now}
+
+
+def _owner_locked(owner: str):
+    # лимит проверяется и пополняется под одной блокировкой клиента
+    return _locked(OWNER_LOCK_KEY.format(owner=owner)) if owner else nullcontext()
+
+
+def _set_owner_holds(owner: str, owned: Dict[str, float]) -> None:
+    key = OWNER_KEY.format(owner=owner)
+    if owned:
+        cache.set(key, owned, timeout=int(max(owned.values()) - time.time()) + 1)
+    else:
+        cache.delete(key)
+
+
+def place(
+    table_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    ttl: Optional[int] = None,
+    replace: Optional[str] = None,
+    owner: str = "",
+) -> Optional[Hold]:
+    """Удержать стол; None, если интервал пересекается с чужим удержанием.
+
+    ``replace`` — прежнее удержание того же гостя, оно снимается.
+    ``owner`` — клиент (адрес); больше HOLD_MAX_PER_CLIENT действующих
+    удержаний у него быть не может — ``TooManyHolds``.
+    """
+    ttl = ttl or settings.HOLD_TTL
+    day = timezone.localdate(start_dt)
+    if replace:
+        release(replace)
+    key = HOLDS_KEY.format(day=day.isoformat())
+    with _owner_locked(owner):
+        owned = _owner_holds(owner) if owner else {}
+        if owner and len(owned) >= settings.HOLD_MAX_PER_CLIENT:
+            raise TooManyHolds(owner)
+        with _locked(LOCK_KEY.format(day=day.isoformat())):
+            holds = active(day)
+            for h in holds.values():
+                if h.table_id == table_id and h.start_dt < end_dt and start_dt < h.end_dt:
+                    return None
+            hold = Hold(uuid.uuid4().hex, table_id, start_dt, end_dt, time.time() + ttl, owner)
+            holds[hold.id] = hold
+            timeout = max(h.expires_at for h in holds.values()) - time.time()
+            cache.set(key, holds, timeout=int(timeout) + 1)
+        cache.set(HOLD_DAY_KEY.format(hold_id=hold.id), day, timeout=ttl)
+        if owner:
+            _set_owner_holds(owner, {**owned, hold.id: hold.expires_at})
+    return hold
+
+
+def get(hold_id: str) -> Optional[Hold]:
+    day = cache.get(HOLD_DAY_KEY.format(hold_id=hold_id))
+    return active(day).get(hold_id) if day else None
+
+
+def release(hold_id: str) -> bool:
+    day = cache.get(HOLD_DAY_KEY.format(hold_id=hold_id))
+    if not day:
+        return False
+    key = HOLDS_KEY.format(day=day.isoformat())
+    with _locked(LOCK_KEY.format(day=day.isoformat())):
+        holds = active(day)
+        hold = holds.pop(hold_id, None)
+        found = hold is not None
+        if holds:
+            timeout = max(h.expires_at for h in holds.values()) - time.time()
+            cache.set(key, holds, timeout=int(timeout) + 1)
+        else:
+            cache.delete(key)
+    cache.delete(HOLD_DAY_KEY.format(hold_id=hold_id))
+    if hold and hold.owner:
+        with _owner_locked(hold.owner):
+            owned = _owner_holds(hold.owner)
+            owned.pop(hold_id, None)
+            _set_owner_holds(hold.owner, owned)
+    return found
+
+
+def _merge_into(schedule, held) -> None:
+    for table_id, intervals in held.items():
+        if table_id in schedule:
+            schedule[table_id] = sorted(schedule[table_id] + intervals)
+
+
+def merge(
+    schedule: Dict[int, List[Tuple[datetime, datetime]]],
+    days: Iterable[date],
+    exclude: Optional[str] = None,
+) -> None:
+    """Добавить чужие удержания в загруженное расписание столов (на месте)."""
+    for day in set(days):
+        _merge_into(schedule, held_intervals(day, exclude))
+
+
+async def amerge(
+    schedule: Dict[int, List[Tuple[datetime, datetime]]],
+    days: Iterable[date],
+    exclude: Optional[str] = None,
+) -> None:
+    for day in set(days):
+        _merge_into(schedule, _by_table(await aactive(day), exclude))
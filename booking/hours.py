@@ -0,0 +1,222 @@
+"""Часы работы: правила из базы, скомпилированные в готовые datetime по дням.
+
+Приоритет правил для (зал, день): особый день зала, особый день всего
+ресторана, расписание зала по дню недели, расписание ресторана, и в конце
+OPEN_TIME/CLOSE_TIME из настроек. Скомпилированные дни и сетки слотов
+хранятся в памяти процесса и сверяются с версией в общем кэше, поэтому
+правки в админке применяются без перезапуска. Без общего кэша версия своя у
+каждого воркера, и кэш дней выключен (HOURS_CACHE_ENABLED).
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from booking.cache import HOURS_VERSION_KEY, aget_version, get_version
+from booking.models import OpeningHours, SpecialDay
+
+CACHE_SIZE = 512
+
+
+@dataclass(frozen=True)
+class DayHours:
+    open_dt: datetime
+    close_dt: datetime
+
+    def covers(self, start_dt: datetime, end_dt: datetime) -> bool:
+        """Визит целиком внутри часов работы."""
+        return self.open_dt <= start_dt and end_dt <= self.close_dt
+
+
+def _hhmm(value: str) -> time:
+    hh, mm = value.split(":", 1)
+    return time(int(hh), int(mm))
+
+
+def aware(day: date, t: time) -> datetime:
+    return timezone.make_aware(datetime.combine(day, t))
+
+
+def add_abs(dt: datetime, minutes: int) -> datetime:
+    """Прибавить минуты по реальному времени (через UTC), а не по настенным часам."""
+    return (dt.astimezone(dt_timezone.utc) + timedelta(minutes=minutes)).astimezone(
+        dt.tzinfo
+    )
+
+
+class DayRules:
+    """Часы всех залов на один день."""
+
+    __slots__ = ("day", "by_area", "default")
+
+    def __init__(self, day: date, weekly_rows=None, special_rows=None):
+        self.day = day
+        self.by_area: Dict[Optional[int], Optional[DayHours]] = {}
+
+        if weekly_rows is None:
+            weekly_rows = OpeningHours.objects.filter(weekday=day.weekday())
+        if special_rows is None:
+            special_rows = SpecialDay.objects.filter(date=day)
+        weekly = {r.area_id: (r.open_time, r.close_time) for r in weekly_rows}
+        special = {
+            r.area_id: None if r.is_closed else (r.open_time, r.close_time)
+            for r in special_rows
+        }
+
+        fallback = (_hhmm(settings.OPEN_TIME), _hhmm(settings.CLOSE_TIME))
+        if None in special:
+            base = special[None]
+        else:
+            base = weekly.get(None, fallback)
+        self.default = self._compile(base)
+
+        for area_id in set(weekly) | set(special):
+            if area_id is None:
+                continue
+            if area_id in special:
+                rule = special[area_id]
+            elif None in special:
+                # особый день ресторана важнее обычного расписания зала
+                rule = base
+            else:
+                rule = weekly[area_id]
+            self.by_area[area_id] = self._compile(rule)
+
+    def _compile(self, rule) -> Optional[DayHours]:
+        if rule is None or rule[0] is None or rule[1] is None:
+            return None
+        open_dt = aware(self.day, rule[0])
+        close_dt = aware(self.day, rule[1])
+        if close_dt <= open_dt:
+            # работа после полуночи
+            close_dt = aware(self.day + timedelta(days=1), rule[1])
+        return DayHours(open_dt, close_dt)
+
+    def get(self, area_id: Optional[int] = None) -> Optional[DayHours]:
+        """Часы зала (None — весь ресторан); None, если в этот день закрыто."""
+        return self.by_area.get(area_id, self.default)
+
+
+_lock = threading.Lock()
+_days: "OrderedDict[date, Tuple[int, DayRules]]" = OrderedDict()
+_slots: "OrderedDict[tuple, Tuple[DayRules, tuple]]" = OrderedDict()
+
+
+def enabled() -> bool:
+    return settings.HOURS_CACHE_ENABLED
+
+
+def _put(store: OrderedDict, key, value) -> None:
+    if not enabled():
+        return
+    with _lock:
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > CACHE_SIZE:
+            store.popitem(last=False)
+
+
+def for_day(day: date) -> DayRules:
+    if not enabled():
+        return DayRules(day)
+    version = get_version(HOURS_VERSION_KEY)
+    with _lock:
+        hit = _days.get(day)
+        if hit and hit[0] == version:
+            return hit[1]
+    rules = DayRules(day)
+    _put(_days, day, (version, rules))
+    return rules
+
+
+def for_range(first: date, last: date) -> Dict[date, DayRules]:
+    """Правила всех дней отрезка; недостающие дни грузятся двумя запросами на всех."""
+    version = get_version(HOURS_VERSION_KEY) if enabled() else None
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    out: Dict[date, DayRules] = {}
+    missing: List[date] = []
+    with _lock:
+        for day in days:
+            hit = _days.get(day)
+            if hit and version is not None and hit[0] == version:
+                out[day] = hit[1]
+            else:
+                missing.append(day)
+    if missing:
+        weekly = defaultdict(list)
+        for r in OpeningHours.objects.filter(weekday__in={d.weekday() for d in missing}):
+            weekly[r.weekday].append(r)
+        special = defaultdict(list)
+        for r in SpecialDay.objects.filter(date__range=(missing[0], missing[-1])):
+            special[r.date].append(r)
+        for day in missing:
+            rules = DayRules(day, weekly[day.weekday()], special[day])
+            _put(_days, day, (version, rules))
+            out[day] = rules
+    return out
+
+
+async def afor_day(day: date) -> DayRules:
+    """Асинхронный ``for_day``: правила читаются async ORM."""
+    version = await aget_version(HOURS_VERSION_KEY) if enabled() else None
+    with _lock:
+        hit = _days.get(day)
+        if hit and version is not None and hit[0] == version:
+            return hit[1]
+    weekly = [r async for r in OpeningHours.objects.filter(weekday=day.weekday())]
+    special = [r async for r in SpecialDay.objects.filter(date=day)]
+    rules = DayRules(day, weekly, special)
+    _put(_days, day, (version, rules))
+    return rules
+
+
+def day_hours(day: date, area_id: Optional[int] = None) -> Optional[DayHours]:
+    return for_day(day).get(area_id)
+
+
+def day_slots(
+    day: date,
+    area_id: Optional[int] = None,
+    visit_min: Optional[int] = None,
+    rules: Optional[DayRules] = None,
+) -> Tuple[Tuple[datetime, datetime], ...]:
+    """Сетка слотов дня: (начало, конец) с шагом визит + буфер, как generate_slots.
+
+    ``rules`` — уже прочитанные правила этого дня, чтобы не читать их второй раз.
+    """
+    visit_min = visit_min or settings.VISIT_LENGTH_MIN
+    rules = rules or for_day(day)
+    key = (day, area_id, visit_min)
+    with _lock:
+        hit = _slots.get(key)
+        if hit and hit[0] is rules:
+            return hit[1]
+
+    hours = rules.get(area_id)
+    slots = []
+    if hours:
+        step = visit_min + settings.BUFFER_MIN
+        if visit_min <= 0 or step <= 0:
+            # иначе цикл ниже никогда не дойдёт до закрытия
+            raise ValueError(f"visit_min должен быть положительным: {visit_min}")
+        wall = timezone.localtime(hours.open_dt).replace(tzinfo=None)
+        while True:
+            start = timezone.make_aware(wall)
+            end = add_abs(start, visit_min)
+            if end > hours.close_dt:
+                break
+            slots.append((start, end))
+            wall += timedelta(minutes=step)
+    slots = tuple(slots)
+    _put(_slots, key, (rules, slots))
+    return slots
+
+
+def clear() -> None:
+    with _lock:
+        _days.clear()
+        _slots.clear()
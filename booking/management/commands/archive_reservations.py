@@ -0,0 +1,57 @@
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import archive
+from booking.services import combine
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed, canceled and no-show reservations that ended before the "
+        "archive horizon into the archive table, in small transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            help="Archive reservations that ended before this day YYYY-MM-DD, "
+            "not later than the horizon (default: today minus ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            "--chunk",
+            type=int,
+            default=archive.CHUNK,
+            help=f"Rows per transaction (default {archive.CHUNK}).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the reservations that would be archived.",
+        )
+
+    def handle(self, *args, **opts):
+        try:
+            day = date.fromisoformat(opts["before"]) if opts["before"] else archive.horizon()
+        except ValueError:
+            raise CommandError("--before must be YYYY-MM-DD")
+        # списки читают архив только до горизонта, так что позже архивировать нельзя
+        if day > archive.horizon():
+            raise CommandError(
+                f"--before must not be later than {archive.horizon()} (ARCHIVE_AFTER_DAYS)"
+            )
+        if opts["chunk"] < 1:
+            raise CommandError("--chunk must be positive")
+        before = combine(day, time.min)
+
+        if opts["dry_run"]:
+            n = archive.candidates(before).count()
+            self.stdout.write(f"{n} reservations before {day} would be archived")
+            return
+
+        total = 0
+        for moved in archive.archive_before(before, opts["chunk"]):
+            total += moved
+            self.stdout.write(f"archived {total}", ending="\r")
+            self.stdout.flush()
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} reservations before {day}"))
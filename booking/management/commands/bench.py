@@ -0,0 +1,72 @@
+import json
+import random
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from booking import hours
+from booking.benchmarks import SCALES, build_restaurant, measure, scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark booking hot paths on synthetic restaurants. Each scale runs in a "
+        "fresh test database (SQLite or Postgres from settings); the real data is "
+        "not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            action="append",
+            choices=list(SCALES),
+            help="Scale to run (repeatable). Default: small, medium.",
+        )
+        parser.add_argument(
+            "--calls", type=int, default=200, help="Calls per scenario."
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--only", action="append", help="Run only these scenarios (repeatable)."
+        )
+        parser.add_argument("--json", dest="json_path", help="Save results as JSON.")
+
+    def handle(self, *args, **opts):
+        results = []
+        for scale in opts.get("scale") or ["small", "medium"]:
+            n_areas, per_area, months = SCALES[scale]
+            rnd = random.Random(opts["seed"])
+            old_name = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                hours.clear()
+                restaurant = build_restaurant(n_areas, per_area, months, rnd)
+                self.stdout.write(
+                    f"📦 {scale}: {n_areas} areas × {per_area} tables × "
+                    f"{months} months"
+                )
+                for name, calls in scenarios(restaurant, rnd, opts["calls"]).items():
+                    if opts.get("only") and name not in opts["only"]:
+                        continue
+                    row = {"scale": scale, "scenario": name, **measure(calls)}
+                    results.append(row)
+                    self.stdout.write(
+                        f"  {name:<26} p50 {row['p50_ms']:>8.2f} ms  "
+                        f"p99 {row['p99_ms']:>8.2f} ms  "
+                        f"queries {row['queries_avg']:>6} (max {row['queries_max']})"
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if opts.get("json_path"):
+            payload = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "database": connection.vendor,
+                "calls": opts["calls"],
+                "seed": opts["seed"],
+                "results": results,
+            }
+            with open(opts["json_path"], "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved: {opts['json_path']}"))
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.benchmarks import http_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrency of running servers over HTTP, e.g. gunicorn (WSGI) "
+        "against uvicorn (ASGI). Start both first:\n"
+        "  gunicorn config.wsgi:application -w 3 -b 127.0.0.1:8000\n"
+        "  uvicorn config.asgi:application --port 8001\n"
+        "then pass one --target per server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            action="append",
+            required=True,
+            help="name=URL, e.g. "
+            "asgi=http://127.0.0.1:8001/api/async/availability/?date=...&start=19:00&guests=2 "
+            "(repeatable).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            action="append",
+            help="Concurrent clients (repeatable). Default: 1, 10, 50, 200.",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=500, help="Requests per run."
+        )
+        parser.add_argument(
+            "--slow-clients",
+            type=int,
+            default=0,
+            help="Extra connections that trickle their request headers during the run.",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--json", dest="json_path", help="Save results as JSON.")
+
+    def handle(self, *args, **opts):
+        targets = []
+        for raw in opts["target"]:
+            name, sep, url = raw.partition("=")
+            if not sep or not url.startswith("http://"):
+                raise CommandError(f"Expected name=http://host:port/path, got {raw!r}")
+            targets.append((name, url))
+
+        results = []
+        for name, url in targets:
+            self.stdout.write(f"🌐 {name}: {url}")
+            for concurrency in opts.get("concurrency") or [1, 10, 50, 200]:
+                row = asyncio.run(
+                    http_load(
+                        url,
+                        concurrency,
+                        opts["requests"],
+                        slow_clients=opts["slow_clients"],
+                        timeout=opts["timeout"],
+                    )
+                )
+                results.append({"target": name, **row})
+                self.stdout.write(
+                    f"  c={concurrency:<4} {row['rps']:>8.1f} req/s  "
+                    f"p50 {row['p50_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms  "
+                    f"errors {row['errors']}"
+                )
+
+        if opts.get("json_path"):
+            payload = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "requests": opts["requests"],
+                "slow_clients": opts["slow_clients"],
+                "targets": dict(targets),
+                "results": results,
+            }
+            with open(opts["json_path"], "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved: {opts['json_path']}"))
@@ -0,0 +1,137 @@
+import json
+import time as pytime
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from booking.benchmarks import percentile
+from booking.models import Reservation
+from booking.services import (
+    ACTIVE_STATUSES,
+    PICK_STRATEGIES,
+    day_bounds,
+    parse_hhmm,
+    pick_table,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a recorded day of booking requests through pick_table and report "
+        "seating yield and latency per strategy. Changes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            required=True,
+            help="Service day YYYY-MM-DD. Without --file its reservations are replayed.",
+        )
+        parser.add_argument(
+            "--file",
+            help='JSON list of requests: [{"start": "19:00", "guests": 2, "duration": 90}]',
+        )
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            choices=PICK_STRATEGIES,
+            help="Strategy to replay (repeatable). Default: all.",
+        )
+        parser.add_argument("--area", type=int, help="Limit tables to one area.")
+
+    def _recorded_requests(self, day: date):
+        qs = (
+            Reservation.objects.filter(
+                datetime_start__gte=day_bounds(day)[0],
+                datetime_start__lt=day_bounds(day)[1],
+            )
+            .order_by("created_at", "id")
+            .values_list("datetime_start", "datetime_end", "guests")
+        )
+        return [
+            {
+                "start": timezone.localtime(s).time(),
+                "guests": guests,
+                "duration": int((e - s).total_seconds() // 60),
+            }
+            for s, e, guests in qs
+        ]
+
+    def _file_requests(self, path: str):
+        with open(path, encoding="utf-8") as fh:
+            raw = json.load(fh)
+        return [
+            {
+                "start": parse_hhmm(it["start"]),
+                "guests": int(it["guests"]),
+                "duration": int(it.get("duration") or 0) or None,
+            }
+            for it in raw
+        ]
+
+    def _replay(self, day: date, requests, strategy: str, area_id):
+        seated, guests_seated, latencies = 0, 0, []
+        with transaction.atomic():
+            # день начинается пустым: записанные брони и есть поток заявок
+            start_day, end_day = day_bounds(day)
+            Reservation.objects.filter(
+                datetime_start__lt=end_day,
+                datetime_end__gt=start_day,
+                status__in=ACTIVE_STATUSES,
+            ).update(status=Reservation.Status.CANCELED)
+
+            for req in requests:
+                t0 = pytime.perf_counter()
+                pick = pick_table(
+                    day,
+                    req["start"],
+                    req["guests"],
+                    area_id=area_id,
+                    visit_min=req["duration"],
+                    strategy=strategy,
+                )
+                latencies.append((pytime.perf_counter() - t0) * 1000)
+                if not pick.table:
+                    continue
+                Reservation.objects.create(
+                    table=pick.table,
+                    datetime_start=pick.start_dt,
+                    datetime_end=pick.end_dt,
+                    guests=req["guests"],
+                    name="replay",
+                    status=Reservation.Status.CONFIRMED,
+                )
+                seated += 1
+                guests_seated += req["guests"]
+            transaction.set_rollback(True)
+        return seated, guests_seated, latencies
+
+    def handle(self, *args, **opts):
+        try:
+            day = date.fromisoformat(opts["date"])
+        except ValueError:
+            raise CommandError("Некорректная дата, нужен YYYY-MM-DD")
+
+        requests = (
+            self._file_requests(opts["file"])
+            if opts.get("file")
+            else self._recorded_requests(day)
+        )
+        if not requests:
+            raise CommandError(f"Нет заявок для {day}")
+
+        total_guests = sum(r["guests"] for r in requests)
+        self.stdout.write(
+            f"📅 {day}: {len(requests)} requests, {total_guests} guests"
+        )
+        for strategy in opts.get("strategy") or PICK_STRATEGIES:
+            seated, guests_seated, lat = self._replay(
+                day, requests, strategy, opts.get("area")
+            )
+            self.stdout.write(
+                f"{strategy:>9}: seated {seated}/{len(requests)} "
+                f"({seated / len(requests):.1%}), guests {guests_seated}/{total_guests}, "
+                f"p50 {percentile(lat, 50):.2f} ms, p99 {percentile(lat, 99):.2f} ms"
+            )
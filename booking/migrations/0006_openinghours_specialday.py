@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0005_rename_pos_x_table_x_rename_pos_y_table_y_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OpeningHours",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "weekday",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Понедельник"),
+                            (1, "Вторник"),
+                            (2, "Среда"),
+                            (3, "Четверг"),
+                            (4, "Пятница"),
+                            (5, "Суббота"),
+                            (6, "Воскресенье"),
+                        ]
+                    ),
+                ),
+                ("open_time", models.TimeField()),
+                (
+                    "close_time",
+                    models.TimeField(
+                        help_text="Раньше открытия — работа после полуночи."
+                    ),
+                ),
+                (
+                    "area",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="opening_hours",
+                        to="booking.area",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["area__order", "weekday"],
+                "unique_together": {("area", "weekday")},
+            },
+        ),
+        migrations.CreateModel(
+            name="SpecialDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("is_closed", models.BooleanField(default=False)),
+                ("open_time", models.TimeField(blank=True, null=True)),
+                ("close_time", models.TimeField(blank=True, null=True)),
+                ("note", models.CharField(blank=True, max_length=128)),
+                (
+                    "area",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="special_days",
+                        to="booking.area",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date"],
+                "unique_together": {("area", "date")},
+            },
+        ),
+    ]
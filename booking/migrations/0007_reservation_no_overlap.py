@@ -0,0 +1,74 @@
+from django.db import migrations
+
+CONSTRAINT = "reservation_no_overlap"
+ACTIVE = ("pending", "confirmed")
+# сколько пересечений показать в сообщении об ошибке
+REPORT_LIMIT = 50
+
+OVERLAPS_SQL = """
+    SELECT a.table_id, a.id, b.id, a.datetime_start, a.datetime_end, b.datetime_start, b.datetime_end
+    FROM booking_reservation a
+    JOIN booking_reservation b
+      ON b.table_id = a.table_id
+     AND b.id > a.id
+     AND b.datetime_start < a.datetime_end
+     AND a.datetime_start < b.datetime_end
+    WHERE a.status IN (%s, %s) AND b.status IN (%s, %s)
+    ORDER BY a.table_id, a.datetime_start, a.id, b.id
+"""
+
+
+def find_overlaps(connection, limit=REPORT_LIMIT):
+    """Пары активных броней одного стола, пересекающиеся по времени."""
+    with connection.cursor() as cur:
+        cur.execute(f"{OVERLAPS_SQL} LIMIT {int(limit)}", ACTIVE + ACTIVE)
+        return cur.fetchall()
+
+
+def add_constraint(apps, schema_editor):
+    # только PostgreSQL; на SQLite пересечения проверяются в транзакции записи
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # с уже пересекающимися бронями ограничение не создастся — называем их сразу
+    overlaps = find_overlaps(schema_editor.connection)
+    if overlaps:
+        lines = "\n".join(
+            f"  стол {table_id}: #{a_id} {a_start:%Y-%m-%d %H:%M}–{a_end:%H:%M} "
+            f"и #{b_id} {b_start:%Y-%m-%d %H:%M}–{b_end:%H:%M}"
+            for table_id, a_id, b_id, a_start, a_end, b_start, b_end in overlaps
+        )
+        raise RuntimeError(
+            f"{CONSTRAINT}: пересекающиеся активные брони (не больше {REPORT_LIMIT}):\n{lines}\n"
+            "Отмените или перенесите лишние брони и повторите migrate."
+        )
+    # btree_gist нужен для равенства по table_id внутри GiST-индекса
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        f"""
+        ALTER TABLE booking_reservation
+        ADD CONSTRAINT {CONSTRAINT}
+        EXCLUDE USING gist (
+            table_id WITH =,
+            tstzrange(datetime_start, datetime_end, '[)') WITH &&
+        ) WHERE (status IN ('pending', 'confirmed'))
+        """
+    )
+
+
+def drop_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"ALTER TABLE booking_reservation DROP CONSTRAINT IF EXISTS {CONSTRAINT}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0006_openinghours_specialday"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraint, drop_constraint),
+    ]
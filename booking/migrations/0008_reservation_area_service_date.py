@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # поля добавляются пустыми: заполняет 0009, NOT NULL ставит 0010
+
+    dependencies = [
+        ("booking", "0007_reservation_no_overlap"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="area",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="reservations",
+                to="booking.area",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="service_date",
+            field=models.DateField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, transaction
+from django.utils import timezone
+
+CHUNK = 2000
+
+
+def backfill(apps, schema_editor):
+    # порциями по первичному ключу, каждая в своей транзакции: таблица броней
+    # не блокируется целиком, а прерванный прогон можно просто повторить
+    Reservation = apps.get_model("booking", "Reservation")
+    last = 0
+    while True:
+        rows = list(
+            Reservation.objects.filter(pk__gt=last, area__isnull=True)
+            .order_by("pk")
+            .values_list("pk", "table__area_id", "datetime_start")[:CHUNK]
+        )
+        if not rows:
+            break
+        objs = [
+            Reservation(pk=pk, area_id=area_id, service_date=timezone.localdate(start))
+            for pk, area_id, start in rows
+        ]
+        with transaction.atomic():
+            Reservation.objects.bulk_update(objs, ["area", "service_date"])
+        last = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("booking", "0008_reservation_area_service_date"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
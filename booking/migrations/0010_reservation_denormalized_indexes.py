@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0009_backfill_reservation_area_service_date"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="reservation",
+            name="area",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="reservations",
+                to="booking.area",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="reservation",
+            name="service_date",
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                condition=models.Q(status__in=["pending", "confirmed"]),
+                fields=["table", "datetime_start", "datetime_end"],
+                name="res_active_table_span",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["service_date", "area", "datetime_start"],
+                name="res_day_area_start",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                condition=models.Q(status__in=["pending", "confirmed"]),
+                fields=["area", "service_date"],
+                name="res_active_area_day",
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Area(models.Model):
@@ -18,6 +19,67 @@ class Area(models.Model):
         return self.name
 
 
+class OpeningHours(models.Model):
+    """Часы работы по дням недели: для зала или (area пусто) всего ресторана."""
+
+    class Weekday(models.IntegerChoices):
+        MON = 0, "Понедельник"
+        TUE = 1, "Вторник"
+        WED = 2, "Среда"
+        THU = 3, "Четверг"
+        FRI = 4, "Пятница"
+        SAT = 5, "Суббота"
+        SUN = 6, "Воскресенье"
+
+    area = models.ForeignKey(
+        "booking.Area",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="opening_hours",
+    )
+    weekday = models.PositiveSmallIntegerField(choices=Weekday.choices)
+    open_time = models.TimeField()
+    close_time = models.TimeField(help_text="Раньше открытия — работа после полуночи.")
+
+    class Meta:
+        unique_together = ("area", "weekday")
+        ordering = ["area__order", "weekday"]
+
+    def __str__(self) -> str:
+        where = self.area or "Ресторан"
+        return f"{where}: {self.get_weekday_display()} " \
+               f"{self.open_time:%H:%M}–{self.close_time:%H:%M}"
+
+
+class SpecialDay(models.Model):
+    """Исключение из расписания на дату: праздник, закрытие, особые часы."""
+
+    area = models.ForeignKey(
+        "booking.Area",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="special_days",
+    )
+    date = models.DateField()
+    is_closed = models.BooleanField(default=False)
+    open_time = models.TimeField(null=True, blank=True)
+    close_time = models.TimeField(null=True, blank=True)
+    note = models.CharField(max_length=128, blank=True)
+
+    class Meta:
+        unique_together = ("area", "date")
+        ordering = ["-date"]
+
+    def __str__(self) -> str:
+        where = self.area or "Ресторан"
+        if self.is_closed or not (self.open_time and self.close_time):
+            return f"{where}: {self.date:%Y-%m-%d} закрыто"
+        return f"{where}: {self.date:%Y-%m-%d} " \
+               f"{self.open_time:%H:%M}–{self.close_time:%H:%M}"
+
+
 class Table(models.Model):
     class IconType(models.TextChoices):
         ONE = "1", "1 seat"
@@ -53,6 +115,12 @@ class Table(models.Model):
         return f"{self.area}: {self.name} ({self.capacity})"
 
 
+# поля брони, от которых зависят area и service_date
+DENORMALIZED_FROM = {"table", "table_id", "datetime_start"}
+# поля слота брони: по ним сбрасывается кэш расписаний дня и зала
+SLOT_FIELDS = ("area_id", "datetime_start", "datetime_end")
+
+
 class Reservation(models.Model):
     """Бронь столика на интервал времени."""
 
@@ -64,6 +132,16 @@ class Reservation(models.Model):
         COMPLETED = "completed", "Завершена"
         NO_SHOW = "no_show", "Не пришли"
 
+    # Граф статусов: из какого статуса в какие можно перейти
+    TRANSITIONS = {
+        Status.PENDING: {Status.CONFIRMED, Status.CANCELED, Status.SEATED, Status.NO_SHOW},
+        Status.CONFIRMED: {Status.PENDING, Status.CANCELED, Status.SEATED, Status.NO_SHOW},
+        Status.SEATED: {Status.COMPLETED, Status.CONFIRMED},  # ошибочная посадка
+        Status.COMPLETED: {Status.SEATED},
+        Status.CANCELED: {Status.PENDING},  # восстановить заявку
+        Status.NO_SHOW: {Status.SEATED},  # гость опоздал
+    }
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -91,14 +169,131 @@ class Reservation(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Копии table.area и локальной даты начала: фильтры по залу и дню
+    # идут по индексам, без join через Table и без cast datetime_start.
+    # Заполняются в save(); при bulk_create — вызовите fill_denormalized().
+    area = models.ForeignKey(
+        "booking.Area",
+        on_delete=models.PROTECT,
+        related_name="reservations",
+        editable=False,
+    )
+    service_date = models.DateField(editable=False)
+
     class Meta:
         ordering = ["-datetime_start", "-created_at"]
         indexes = [
             models.Index(fields=["table", "datetime_start"]),
             models.Index(fields=["table", "datetime_end"]),
             models.Index(fields=["status"]),
+            # доступность: активные брони столов в окне
+            models.Index(
+                fields=["table", "datetime_start", "datetime_end"],
+                condition=models.Q(status__in=["pending", "confirmed"]),
+                name="res_active_table_span",
+            ),
+            # список менеджера: день (+ зал), по времени начала
+            models.Index(
+                fields=["service_date", "area", "datetime_start"],
+                name="res_day_area_start",
+            ),
+            # панель менеджера: активные брони зала за дни
+            models.Index(
+                fields=["area", "service_date"],
+                condition=models.Q(status__in=["pending", "confirmed"]),
+                name="res_active_area_day",
+            ),
         ]
 
+    @classmethod
+    def can_transition(cls, source: str, target: str) -> bool:
+        return target in cls.TRANSITIONS.get(source, ())
+
+    @classmethod
+    def transition_sources(cls, target: str) -> list:
+        """Статусы, из которых можно перейти в ``target``."""
+        return sorted(s for s, targets in cls.TRANSITIONS.items() if target in targets)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_slot()
+        return instance
+
+    def remember_slot(self) -> None:
+        """Запомнить слот как в БД: при переносе сигнал сбросит и старый день."""
+        slot = tuple(self.__dict__.get(f) for f in SLOT_FIELDS)
+        # с отложенными полями слот неизвестен — сигнал перечитает его из БД
+        self._db_slot = None if None in slot else slot
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None:
+            self.remember_slot()
+
+    def fill_denormalized(self) -> None:
+        self.area_id = self.table.area_id
+        self.service_date = timezone.localdate(self.datetime_start)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.fill_denormalized()
+        elif not DENORMALIZED_FROM.isdisjoint(update_fields):
+            self.fill_denormalized()
+            kwargs["update_fields"] = {*update_fields, "area", "service_date"}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.table} — {self.datetime_start:%Y-%m-%d %H:%M}→" \
                f"{self.datetime_end:%H:%M} [{self.get_status_display()}]"
+
+
+class ReservationArchive(models.Model):
+    """Завершённые брони старше горизонта архивации (см. ``booking.archive``).
+
+    Те же поля и id, что у ``Reservation``: основная таблица и её индексы
+    остаются маленькими, а история доступна отчётам, админке и кабинету гостя.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_reservations",
+        db_index=False,  # покрыт индексом (user, datetime_start)
+    )
+    table = models.ForeignKey(
+        Table, on_delete=models.PROTECT, related_name="archived_reservations"
+    )
+    area = models.ForeignKey(
+        Area, on_delete=models.PROTECT, related_name="archived_reservations"
+    )
+    service_date = models.DateField()
+
+    datetime_start = models.DateTimeField()
+    datetime_end = models.DateTimeField()
+
+    guests = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=128)
+    phone = models.CharField(max_length=32, blank=True)
+    email = models.EmailField(blank=True)
+
+    status = models.CharField(max_length=16, choices=Reservation.Status.choices)
+    comment = models.TextField(blank=True)
+
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-datetime_start"]
+        indexes = [
+            models.Index(fields=["service_date", "area"], name="res_archive_day_area"),
+            models.Index(fields=["user", "datetime_start"], name="res_archive_user_start"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.table} — {self.datetime_start:%Y-%m-%d %H:%M} " \
+               f"[{self.get_status_display()}, архив]"
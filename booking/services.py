@@ -1,13 +1,19 @@
 from __future__ import annotations
+from bisect import insort
+from contextlib import nullcontext
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, time, timedelta, date
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from django.conf import settings
-from django.db.models import Q, QuerySet
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
 from django.utils import timezone
 
-from booking.models import Table, Reservation
+from booking import archive, holds, hours
+from booking.models import Area, Table, Reservation, ReservationArchive
+from booking.signals import schedule_changed
 
 
 def parse_hhmm(value: str) -> time:
@@ -44,6 +50,11 @@ if add_minutes(OPEN_T, VISIT_MIN) > CLOSE_T:
     )
 
 
+ACTIVE_STATUSES = (Reservation.Status.PENDING, Reservation.Status.CONFIRMED)
+
+Interval = Tuple[datetime, datetime]
+
+
 def generate_slots(visit_min: int = VISIT_MIN) -> List[Tuple[time, time]]:
     slots: List[Tuple[time, time]] = []
     start = OPEN_T
@@ -55,6 +66,10 @@ def generate_slots(visit_min: int = VISIT_MIN) -> List[Tuple[time, time]]:
     return slots
 
 
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    return combine(day, time.min), combine(day + timedelta(days=1), time.min)
+
+
 def reservations_qs_for_table(table: Table, day: date) -> QuerySet[Reservation]:
     start_day = combine(day, time.min)
     end_day = combine(day, time.max)
@@ -62,26 +77,29 @@ def reservations_qs_for_table(table: Table, day: date) -> QuerySet[Reservation]:
         table=table,
         datetime_start__lt=end_day,
         datetime_end__gt=start_day,
-        status__in=[Reservation.Status.PENDING, Reservation.Status.CONFIRMED],
+        status__in=ACTIVE_STATUSES,
     )
 
 
-def table_is_free(table: Table, start_dt: datetime, end_dt: datetime) -> bool:
-    return (
-        not Reservation.objects.filter(
-            table=table,
-            status__in=[Reservation.Status.PENDING, Reservation.Status.CONFIRMED],
-        )
-        .filter(Q(datetime_start__lt=end_dt) & Q(datetime_end__gt=start_dt))
-        .exists()
-    )
+def table_is_free(
+    table: Table, start_dt: datetime, end_dt: datetime, exclude_pk: Optional[int] = None
+) -> bool:
+    qs = Reservation.objects.filter(
+        table=table,
+        status__in=ACTIVE_STATUSES,
+    ).filter(Q(datetime_start__lt=end_dt) & Q(datetime_end__gt=start_dt))
+    if exclude_pk is not None:
+        # при правке брони она сама себе не помеха
+        qs = qs.exclude(pk=exclude_pk)
+    return not qs.exists()
 
 
 def nearest_after(table: Table, start_dt: datetime) -> Optional[datetime]:
+    """Начало ближайшей активной брони стола не раньше start_dt."""
     r = (
         Reservation.objects.filter(
             table=table,
-            status__in=[Reservation.Status.PENDING, Reservation.Status.CONFIRMED],
+            status__in=ACTIVE_STATUSES,
             datetime_start__gte=start_dt,
         )
         .order_by("datetime_start")
@@ -91,6 +109,65 @@ def nearest_after(table: Table, start_dt: datetime) -> Optional[datetime]:
     return r
 
 
+# EXCLUDE-ограничение на пересечение активных броней (миграция 0007, PostgreSQL)
+OVERLAP_CONSTRAINT = "reservation_no_overlap"
+
+
+class TableTaken(Exception):
+    """Стол уже занят на этот интервал."""
+
+
+def overlap_constraint_enabled() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def is_overlap_violation(exc: IntegrityError) -> bool:
+    diag = getattr(exc.__cause__, "diag", None)
+    name = getattr(diag, "constraint_name", None)
+    return name == OVERLAP_CONSTRAINT or OVERLAP_CONSTRAINT in str(exc)
+
+
+def insert_reservation(**fields) -> Reservation:
+    """Создать бронь без гонок за стол.
+
+    На PostgreSQL пересечение отсекает ограничение БД, отдельной проверки
+    нет. На SQLite проверяем внутри транзакции записи (IMMEDIATE), которая
+    сериализует конкурентные вставки. Занятый стол — ``TableTaken``.
+    """
+    try:
+        with transaction.atomic():
+            if not overlap_constraint_enabled() and not table_is_free(
+                fields["table"], fields["datetime_start"], fields["datetime_end"]
+            ):
+                raise TableTaken()
+            return Reservation.objects.create(**fields)
+    except IntegrityError as exc:
+        if is_overlap_violation(exc):
+            raise TableTaken() from exc
+        raise
+
+
+def save_reservation(obj: Reservation) -> None:
+    """Сохранить правку брони (админка) с той же защитой от пересечений.
+
+    Активную бронь на SQLite проверяем внутри транзакции, на PostgreSQL
+    пересечение ловит ограничение БД. Занятый стол — ``TableTaken``.
+    """
+    try:
+        with transaction.atomic():
+            if (
+                not overlap_constraint_enabled()
+                and obj.status in ACTIVE_STATUSES
+                and not table_is_free(obj.table, obj.datetime_start, obj.datetime_end, exclude_pk=obj.pk)
+            ):
+                raise TableTaken()
+            obj.save()
+    except IntegrityError as exc:
+        if is_overlap_violation(exc):
+            raise TableTaken() from exc
+        raise
+
+
 @dataclass
 class AvailabilityInfo:
     table: Table
@@ -98,42 +175,308 @@ class AvailabilityInfo:
     available_until: Optional[datetime]
 
 
-def availability_for_tables(
+def _schedule_rows(
+    table_ids: Sequence[int], window_start: datetime, window_end: datetime
+) -> QuerySet:
+    return (
+        Reservation.objects.filter(
+            table_id__in=list(table_ids),
+            status__in=ACTIVE_STATUSES,
+            datetime_start__lt=window_end,
+            datetime_end__gt=window_start,
+        )
+        .order_by("table_id", "datetime_start")
+        .values_list("table_id", "datetime_start", "datetime_end")
+    )
+
+
+def schedule_for_tables(
+    table_ids: Sequence[int], window_start: datetime, window_end: datetime
+) -> Dict[int, List[Interval]]:
+    """Активные брони столов, пересекающие окно, одним запросом.
+
+    Интервалы каждого стола отсортированы по началу.
+    """
+    out: Dict[int, List[Interval]] = {tid: [] for tid in table_ids}
+    if not out:
+        return out
+    for tid, s, e in _schedule_rows(list(out), window_start, window_end):
+        out[tid].append((s, e))
+    return out
+
+
+async def aschedule_for_tables(
+    table_ids: Sequence[int], window_start: datetime, window_end: datetime
+) -> Dict[int, List[Interval]]:
+    """Асинхронный ``schedule_for_tables``."""
+    out: Dict[int, List[Interval]] = {tid: [] for tid in table_ids}
+    if not out:
+        return out
+    async for tid, s, e in _schedule_rows(list(out), window_start, window_end):
+        out[tid].append((s, e))
+    return out
+
+
+def free_until(
+    intervals: Sequence[Interval],
+    start_dt: datetime,
+    end_dt: datetime,
+    hard_close: datetime,
+) -> Tuple[bool, Optional[datetime]]:
+    """Свободен ли стол на [start_dt, end_dt) и до какого времени.
+
+    Аналог пары ``table_is_free`` + ``nearest_after`` по уже загруженному
+    расписанию стола (интервалы отсортированы по началу).
+    """
+    nxt: Optional[datetime] = None
+    for s, e in intervals:
+        if s < end_dt and start_dt < e:
+            return False, None
+        if s >= start_dt:
+            nxt = s
+            break
+    if nxt:
+        return True, min(nxt - timedelta(minutes=BUFFER_MIN), hard_close)
+    return True, hard_close
+
+
+@dataclass
+class _AvailabilityQuery:
+    start_dt: datetime
+    end_dt: datetime
+    # table_id -> время закрытия его зала; закрытые в этот день залы пропускаем
+    hard_close: Dict[int, datetime]
+
+    @property
+    def window_end(self) -> datetime:
+        # брони, начинающиеся после закрытия + BUFFER_MIN, на available_until
+        # уже не влияют — окно запроса ими и ограничено
+        return max(
+            [self.end_dt]
+            + [c + timedelta(minutes=BUFFER_MIN) for c in self.hard_close.values()]
+        )
+
+
+def _availability_query(
     day: date,
     start_time: time,
     guests: int,
-    tables: Iterable[Table],
-    visit_min: int = VISIT_MIN,
-) -> List[AvailabilityInfo]:
+    tables: Sequence[Table],
+    visit_min: Optional[int],
+    rules: "hours.DayRules",
+) -> _AvailabilityQuery:
     start_dt = combine(day, start_time)
-    end_dt = start_dt + timedelta(minutes=visit_min)
+    hard_close: Dict[int, datetime] = {}
+    for t in tables:
+        day_hours = rules.get(t.area_id)
+        if t.is_active and t.capacity >= guests and day_hours:
+            hard_close[t.pk] = day_hours.close_dt
+    return _AvailabilityQuery(
+        start_dt, start_dt + timedelta(minutes=visit_min or VISIT_MIN), hard_close
+    )
+
 
+def _availability_from(
+    tables: Sequence[Table],
+    q: _AvailabilityQuery,
+    schedule: Dict[int, List[Interval]],
+) -> List[AvailabilityInfo]:
     out: List[AvailabilityInfo] = []
     for table in tables:
-        if table.capacity < guests or not table.is_active:
+        if table.pk not in schedule:
             out.append(AvailabilityInfo(table, False, None))
             continue
+        free, until_dt = free_until(
+            schedule[table.pk], q.start_dt, q.end_dt, q.hard_close[table.pk]
+        )
+        out.append(AvailabilityInfo(table, free, until_dt))
+    return out
 
-        free = table_is_free(table, start_dt, end_dt)
-        if not free:
-            out.append(AvailabilityInfo(table, False, None))
-            continue
 
-        nxt = nearest_after(table, start_dt)
-        until_dt = None
-        hard_close = combine(day, CLOSE_T)
+def availability_for_tables(
+    day: date,
+    start_time: time,
+    guests: int,
+    tables: Iterable[Table],
+    visit_min: Optional[int] = VISIT_MIN,
+    hold_id: Optional[str] = None,
+) -> List[AvailabilityInfo]:
+    """Свободны ли столы на визит; чужие удержания считаются занятостью.
 
-        if nxt:
-            until_candidate = nxt - timedelta(minutes=BUFFER_MIN)
-            until_dt = min(until_candidate, hard_close)
-        else:
-            until_dt = hard_close
+    ``hold_id`` — удержание самого гостя, его стол остаётся свободным.
+    """
+    tables = list(tables)
+    q = _availability_query(
+        day, start_time, guests, tables, visit_min, hours.for_day(day)
+    )
+    schedule = schedule_for_tables(list(q.hard_close), q.start_dt, q.window_end)
+    holds.merge(schedule, [day], exclude=hold_id)
+    return _availability_from(tables, q, schedule)
+
+
+async def aavailability_for_tables(
+    day: date,
+    start_time: time,
+    guests: int,
+    tables: Iterable[Table],
+    visit_min: Optional[int] = VISIT_MIN,
+    hold_id: Optional[str] = None,
+) -> List[AvailabilityInfo]:
+    """Асинхронный ``availability_for_tables``; ``tables`` — уже загруженные."""
+    tables = list(tables)
+    q = _availability_query(
+        day, start_time, guests, tables, visit_min, await hours.afor_day(day)
+    )
+    schedule = await aschedule_for_tables(
+        list(q.hard_close), q.start_dt, q.window_end
+    )
+    await holds.amerge(schedule, [day], exclude=hold_id)
+    return _availability_from(tables, q, schedule)
+
+
+def free_gaps(
+    intervals: Iterable[Interval],
+    window_start: datetime,
+    window_end: datetime,
+    buffer_min: int = BUFFER_MIN,
+) -> List[Interval]:
+    """Свободные промежутки окна между бронями (брони расширены на буфер).
+
+    Интервалы должны быть отсортированы по началу.
+    """
+    buffer = timedelta(minutes=buffer_min)
+    gaps: List[Interval] = []
+    cursor = window_start
+    for s, e in intervals:
+        busy_from, busy_to = s - buffer, e + buffer
+        if busy_to <= cursor:
+            continue
+        if busy_from >= window_end:
+            break
+        if busy_from > cursor:
+            gaps.append((cursor, busy_from))
+        cursor = busy_to
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
 
-        out.append(AvailabilityInfo(table, True, until_dt))
 
+def free_gaps_for_tables(
+    day: date, tables: Iterable[Table], min_minutes: int = 0
+) -> Dict[int, List[Interval]]:
+    """Свободные промежутки дня (часы работы, BUFFER_MIN) для всех столов сразу."""
+    rules = hours.for_day(day)
+    tables = list(tables)
+    open_hours = {
+        t.pk: rules.get(t.area_id)
+        for t in tables
+        if t.is_active and rules.get(t.area_id)
+    }
+    day_start, day_end = day_bounds(day)
+    schedule = schedule_for_tables(
+        list(open_hours),
+        day_start,
+        max([day_end] + [h.close_dt for h in open_hours.values()]),
+    )
+    min_len = timedelta(minutes=min_minutes)
+    out: Dict[int, List[Interval]] = {}
+    for t in tables:
+        h = open_hours.get(t.pk)
+        gaps = free_gaps(schedule[t.pk], h.open_dt, h.close_dt) if h else []
+        out[t.pk] = [(s, e) for s, e in gaps if e - s >= min_len]
     return out
 
 
+GRID_BUCKET_MIN = 5
+
+
+def occupancy_bitmap(
+    intervals: Iterable[Interval],
+    origin: datetime,
+    n_buckets: int,
+    bucket_min: int = GRID_BUCKET_MIN,
+) -> int:
+    """Битовая карта занятости: бит i — интервал [origin + i*bucket, +bucket).
+
+    Частично занятый интервал считается занятым целиком.
+    """
+    step = bucket_min * 60
+    bits = 0
+    for s, e in intervals:
+        lo = max(0, int((s - origin).total_seconds() // step))
+        hi = min(n_buckets, -int(-(e - origin).total_seconds() // step))
+        if lo < hi:
+            bits |= ((1 << (hi - lo)) - 1) << lo
+    return bits
+
+
+@dataclass
+class DayGrid:
+    open_dt: Optional[datetime]  # None — в этот день закрыто
+    bucket_min: int
+    n_buckets: int
+    slots: Sequence[Interval]
+    busy: Dict[int, int]  # table_id -> битовая карта занятости
+    free_slots: Dict[int, int]  # table_id -> бит i = слот i свободен
+
+
+def day_grid(
+    day: date,
+    tables: Iterable[Table],
+    visit_min: Optional[int] = VISIT_MIN,
+    bucket_min: int = GRID_BUCKET_MIN,
+    area_id: Optional[int] = None,
+    hold_id: Optional[str] = None,
+) -> DayGrid:
+    """Доступность всех столов на все слоты дня по одному запросу броней.
+
+    Сетка строится по часам зала ``area_id`` (None — ресторана); время,
+    когда зал стола закрыт, помечается у него занятым.
+    """
+    visit_min = visit_min or VISIT_MIN
+    rules = hours.for_day(day)
+    grid_hours = rules.get(area_id)
+    tables = list(tables)
+    if not grid_hours:
+        return DayGrid(
+            None, bucket_min, 0, (), {t.pk: 0 for t in tables}, {t.pk: 0 for t in tables}
+        )
+
+    open_dt, close_dt = grid_hours.open_dt, grid_hours.close_dt
+    n_buckets = -int(-(close_dt - open_dt).total_seconds() // (bucket_min * 60))
+    schedule = schedule_for_tables(
+        [t.pk for t in tables if t.is_active], open_dt, close_dt
+    )
+    holds.merge(schedule, [day], exclude=hold_id)
+
+    slots = hours.day_slots(day, area_id, visit_min, rules)
+    slot_masks = [
+        occupancy_bitmap([slot], open_dt, n_buckets, bucket_min) for slot in slots
+    ]
+
+    busy: Dict[int, int] = {}
+    free_slots: Dict[int, int] = {}
+    for table in tables:
+        table_hours = rules.get(table.area_id)
+        if table.pk not in schedule or not table_hours:
+            busy[table.pk] = (1 << n_buckets) - 1
+            free_slots[table.pk] = 0
+            continue
+        closed = [
+            (open_dt, table_hours.open_dt),
+            (table_hours.close_dt, close_dt),
+        ]
+        bits = occupancy_bitmap(
+            schedule[table.pk] + closed, open_dt, n_buckets, bucket_min
+        )
+        busy[table.pk] = bits
+        free_slots[table.pk] = sum(
+            1 << i for i, mask in enumerate(slot_masks) if not bits & mask
+        )
+
+    return DayGrid(open_dt, bucket_min, n_buckets, slots, busy, free_slots)
+
+
 @dataclass
 class PickResult:
     table: Optional[Table]
@@ -142,36 +485,574 @@ class PickResult:
     available_until: Optional[datetime]
 
 
+PICK_STRATEGIES = ("first", "best_fit")
+
+
+def _leftover_gaps(
+    intervals: Sequence[Interval],
+    start_dt: datetime,
+    end_dt: datetime,
+    open_dt: datetime,
+    close_dt: datetime,
+) -> timedelta:
+    """Сколько времени останется пустым вокруг брони до соседних (с BUFFER_MIN)."""
+    buffer = timedelta(minutes=BUFFER_MIN)
+    free_from, free_to = open_dt, close_dt
+    for s, e in intervals:
+        if e <= start_dt:
+            free_from = max(free_from, e + buffer)
+        elif s >= end_dt:
+            free_to = min(free_to, s - buffer)
+            break
+    return max(start_dt - free_from, timedelta(0)) + max(
+        free_to - end_dt, timedelta(0)
+    )
+
+
 def pick_table(
     day: date,
     start_time: time,
     guests: int,
     area_id: Optional[int] = None,
-    visit_min: int = VISIT_MIN,
+    visit_min: Optional[int] = VISIT_MIN,
+    strategy: Optional[str] = None,
+    hold_id: Optional[str] = None,
 ) -> PickResult:
+    """Подобрать стол под бронь.
+
+    ``first`` — первый свободный по вместимости; ``best_fit`` — среди
+    свободных столов минимальной вместимости тот, вокруг брони на котором
+    остаются самые короткие «дыры» в расписании. Столы под чужими
+    удержаниями не предлагаются.
+    """
+    strategy = strategy or settings.PICK_TABLE_STRATEGY
+    if strategy not in PICK_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия подбора стола: {strategy}")
+
     qs = Table.objects.filter(is_active=True, capacity__gte=guests)
     if area_id:
         qs = qs.filter(area_id=area_id)
-    qs = qs.order_by("capacity", "id")
+    tables = list(qs.order_by("capacity", "id"))
 
     start_dt = combine(day, start_time)
-    end_dt = start_dt + timedelta(minutes=visit_min)
-
-    for table in qs:
-        if table_is_free(table, start_dt, end_dt):
-            nxt = nearest_after(table, start_dt)
-            hard_close = combine(day, CLOSE_T)
-            if nxt:
-                available_until = min(nxt - timedelta(minutes=BUFFER_MIN), hard_close)
-            else:
-                available_until = hard_close
-            return PickResult(
-                table=table,
-                start_dt=start_dt,
-                end_dt=end_dt,
-                available_until=available_until,
-            )
+    end_dt = start_dt + timedelta(minutes=visit_min or VISIT_MIN)
+    rules = hours.for_day(day)
+    open_hours = {t.pk: rules.get(t.area_id) for t in tables}
+    tables = [t for t in tables if open_hours[t.pk]]
+    day_start, day_end = day_bounds(day)
+
+    schedule = schedule_for_tables(
+        [t.pk for t in tables],
+        min(day_start, start_dt),
+        max(
+            [day_end, end_dt]
+            + [
+                open_hours[t.pk].close_dt + timedelta(minutes=BUFFER_MIN)
+                for t in tables
+            ]
+        ),
+    )
+    holds.merge(schedule, [day], exclude=hold_id)
+
+    best = _choose_table(tables, open_hours, schedule, start_dt, end_dt, strategy)
+    if best:
+        return PickResult(
+            table=best[0],
+            start_dt=start_dt,
+            end_dt=end_dt,
+            available_until=best[1],
+        )
 
     return PickResult(
         table=None, start_dt=start_dt, end_dt=end_dt, available_until=None
     )
+
+
+def _choose_table(
+    tables: Sequence[Table],
+    open_hours: Dict[int, "hours.DayHours"],
+    schedule: Dict[int, List[Interval]],
+    start_dt: datetime,
+    end_dt: datetime,
+    strategy: str,
+) -> Optional[Tuple[Table, Optional[datetime]]]:
+    """Выбор стола по загруженному расписанию; столы отсортированы по вместимости."""
+    best: Optional[Tuple[Tuple[int, timedelta], Table, Optional[datetime]]] = None
+    for table in tables:
+        h = open_hours[table.pk]
+        free, until_dt = free_until(schedule[table.pk], start_dt, end_dt, h.close_dt)
+        if not free:
+            continue
+        if strategy == "first":
+            return table, until_dt
+        score = (
+            table.capacity,
+            _leftover_gaps(schedule[table.pk], start_dt, end_dt, h.open_dt, h.close_dt),
+        )
+        if best is None or score < best[0]:
+            best = (score, table, until_dt)
+    return (best[1], best[2]) if best else None
+
+
+ALT_STEP_MIN = 15
+
+
+@dataclass
+class Alternative:
+    table: Table
+    start_dt: datetime
+    end_dt: datetime
+
+
+def find_alternatives(
+    day: date,
+    start_time: time,
+    guests: int,
+    area_id: Optional[int] = None,
+    visit_min: Optional[int] = VISIT_MIN,
+    window_hours: int = 2,
+    days_ahead: int = 3,
+    limit: int = 5,
+    step_min: int = ALT_STEP_MIN,
+    hold_id: Optional[str] = None,
+) -> Tuple[List[Alternative], List[Alternative]]:
+    """Ближайшие свободные (стол, время) вместо занятого слота.
+
+    Возвращает до ``limit`` вариантов в пределах ±``window_hours`` в тот же
+    день (по одному столу на время, самый маленький подходящий) и по одному
+    варианту, ближайшему к запрошенному времени, на каждый из следующих
+    ``days_ahead`` дней. Расписание всех дней читается одним запросом.
+    Свободным считается то же, что примет ``insert_reservation``: без буфера
+    вокруг броней, но с чужими удержаниями (``hold_id`` — своё), и не в прошлом.
+    """
+    visit = timedelta(minutes=visit_min or VISIT_MIN)
+    step = timedelta(minutes=step_min)
+    window = timedelta(hours=window_hours)
+
+    qs = Table.objects.filter(is_active=True, capacity__gte=guests)
+    if area_id:
+        qs = qs.filter(area_id=area_id)
+    tables = list(qs.order_by("capacity", "id"))
+
+    days = [day + timedelta(days=i) for i in range(days_ahead + 1)]
+    rules = {d: hours.for_day(d) for d in days}
+    # +1 день: зал может работать после полуночи
+    schedule = schedule_for_tables(
+        [t.pk for t in tables],
+        day_bounds(days[0])[0],
+        day_bounds(days[-1] + timedelta(days=1))[1],
+    )
+    holds.merge(schedule, days + [days[-1] + timedelta(days=1)], exclude=hold_id)
+    now = timezone.now()
+
+    # best[d][start_dt] = (стол, конец) — первый подходящий в порядке вместимости
+    best: Dict[date, Dict[datetime, Tuple[Table, datetime]]] = {d: {} for d in days}
+    for table in tables:
+        intervals = schedule[table.pk]
+        for d in days:
+            day_hours = rules[d].get(table.area_id)
+            if not day_hours:
+                continue
+            open_dt, close_dt = day_hours.open_dt, day_hours.close_dt
+            for gap_from, gap_to in free_gaps(intervals, max(open_dt, now), close_dt, buffer_min=0):
+                # первое время сетки внутри промежутка
+                k = -int(-(gap_from - open_dt).total_seconds() // step.total_seconds())
+                cand = open_dt + k * step
+                while cand + visit <= gap_to:
+                    best[d].setdefault(cand, (table, cand + visit))
+                    cand += step
+
+    requested = combine(day, start_time)
+
+    def nearest(d: date) -> List[Alternative]:
+        target = combine(d, start_time)
+        starts = sorted(best[d], key=lambda dt: (abs(dt - target), dt))
+        return [Alternative(best[d][dt][0], dt, best[d][dt][1]) for dt in starts]
+
+    same_day = [
+        alt for alt in nearest(day) if abs(alt.start_dt - requested) <= window
+    ][:limit]
+    next_days = [alts[0] for alts in (nearest(d) for d in days[1:]) if alts]
+    return same_day, next_days
+
+
+BULK_MODES = ("all", "partial")
+
+
+@dataclass
+class BookingSpec:
+    day: date
+    start_time: time
+    guests: int
+    visit_min: int = VISIT_MIN
+    table_id: Optional[int] = None
+    name: str = ""
+    phone: str = ""
+    email: str = ""
+    comment: str = ""
+
+
+@dataclass
+class BulkResult:
+    created: List[Tuple[int, Reservation]]
+    errors: Dict[int, Dict[str, str]]
+
+
+def _plan_bulk(
+    specs: Sequence[BookingSpec], strategy: str
+) -> Tuple[Dict[int, dict], Dict[int, Dict[str, str]]]:
+    """Разложить брони по столам по одному снимку расписания.
+
+    Принятая бронь сразу занимает стол в снимке, так что брони одной пачки
+    между собой тоже не пересекаются. Каждая бронь — и с конкретным столом,
+    и подбором — должна целиком уложиться в часы работы зала стола.
+    """
+    tables = list(
+        Table.objects.filter(is_active=True)
+        .select_related("area")
+        .order_by("capacity", "id")
+    )
+    by_id = {t.pk: t for t in tables}
+    rules = {day: hours.for_day(day) for day in {spec.day for spec in specs}}
+    slots = []
+    for spec in specs:
+        start_dt = combine(spec.day, spec.start_time)
+        slots.append((start_dt, start_dt + timedelta(minutes=spec.visit_min)))
+
+    # окно снимка: все дни пачки целиком плюс работа залов после полуночи
+    closes = [
+        h.close_dt + timedelta(minutes=BUFFER_MIN)
+        for r in rules.values()
+        for h in (r.default, *r.by_area.values())
+        if h
+    ]
+    schedule = schedule_for_tables(
+        list(by_id),
+        min([s for s, _ in slots] + [day_bounds(d)[0] for d in rules]),
+        max([e for _, e in slots] + [day_bounds(d)[1] for d in rules] + closes),
+    )
+    holds.merge(schedule, rules)
+
+    planned: Dict[int, dict] = {}
+    errors: Dict[int, Dict[str, str]] = {}
+    for i, (spec, (start_dt, end_dt)) in enumerate(zip(specs, slots)):
+        day_rules = rules[spec.day]
+        if spec.table_id:
+            table = by_id.get(spec.table_id)
+            if not table:
+                errors[i] = {"table_id": "Table is not found or inactive"}
+                continue
+            if table.capacity < spec.guests:
+                errors[i] = {
+                    "guests": "The number of guests is higher than table capacity"
+                }
+                continue
+            day_hours = day_rules.get(table.area_id)
+            if not day_hours or not day_hours.covers(start_dt, end_dt):
+                errors[i] = {"start": "The area is closed at this time"}
+                continue
+            if not free_until(schedule[table.pk], start_dt, end_dt, end_dt)[0]:
+                errors[i] = {"table_id": "The table is reserved"}
+                continue
+        else:
+            open_hours = {}
+            for t in tables:
+                day_hours = day_rules.get(t.area_id)
+                if t.capacity >= spec.guests and day_hours and day_hours.covers(start_dt, end_dt):
+                    open_hours[t.pk] = day_hours
+            candidates = [t for t in tables if t.pk in open_hours]
+            choice = _choose_table(
+                candidates, open_hours, schedule, start_dt, end_dt, strategy
+            )
+            if not choice:
+                errors[i] = {
+                    "non_field_errors": "No available time slots for this table"
+                }
+                continue
+            table = choice[0]
+
+        insort(schedule[table.pk], (start_dt, end_dt))
+        planned[i] = dict(
+            table=table,
+            datetime_start=start_dt,
+            datetime_end=end_dt,
+            guests=spec.guests,
+            name=spec.name,
+            phone=spec.phone,
+            email=spec.email,
+            comment=spec.comment,
+            status=Reservation.Status.PENDING,
+        )
+    return planned, errors
+
+
+def _unsaved_reservation(fields: dict) -> Reservation:
+    # bulk_create не вызывает save(): денормализованные поля заполняем сами
+    r = Reservation(**fields)
+    r.fill_denormalized()
+    return r
+
+
+def bulk_create_reservations(
+    specs: Sequence[BookingSpec],
+    partial: bool = False,
+    strategy: Optional[str] = None,
+) -> BulkResult:
+    """Создать пачку броней одной транзакцией.
+
+    Без ``partial`` при любой ошибке не создаётся ничего; с ``partial``
+    создаются все брони, прошедшие проверку. Ключи ``errors`` — индексы
+    в ``specs``. Если стол успел занять параллельный запрос (сработало
+    ограничение PostgreSQL), в режиме «всё или ничего» поднимается
+    ``TableTaken``, а в частичном брони вставляются по одной.
+    """
+    strategy = strategy or settings.PICK_TABLE_STRATEGY
+    if strategy not in PICK_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия подбора стола: {strategy}")
+    if not specs:
+        return BulkResult([], {})
+
+    with transaction.atomic():
+        planned, errors = _plan_bulk(specs, strategy)
+        if errors and not partial:
+            return BulkResult([], errors)
+
+        created: Dict[int, Reservation] = {}
+        try:
+            with transaction.atomic():
+                objs = Reservation.objects.bulk_create(
+                    [_unsaved_reservation(fields) for fields in planned.values()]
+                )
+            created = dict(zip(planned, objs))
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            if not partial:
+                raise TableTaken() from exc
+            for i, fields in planned.items():
+                try:
+                    created[i] = insert_reservation(**fields)
+                except TableTaken:
+                    errors[i] = {"table_id": "The table is reserved"}
+        else:
+            # bulk_create не шлёт post_save — сбрасываем кэши расписаний сами
+            schedule_changed(
+                (r.area_id, r.datetime_start, r.datetime_end)
+                for r in created.values()
+            )
+
+    return BulkResult(sorted(created.items()), errors)
+
+
+# Результаты смены статуса брони (одной и пачки)
+TRANSITION_OK = "ok"
+TRANSITION_UNCHANGED = "unchanged"
+TRANSITION_NOT_FOUND = "not_found"
+TRANSITION_FORBIDDEN = "forbidden"  # переход не разрешён графом статусов
+TRANSITION_CONFLICT = "conflict"  # статус успели изменить параллельно
+TRANSITION_TABLE_TAKEN = "table_taken"
+
+
+def _changes_activity(sources: Iterable[str], target: str) -> bool:
+    # занятость стола меняется только при переходе между активными и прочими
+    active = target in ACTIVE_STATUSES
+    return any((s in ACTIVE_STATUSES) != active for s in sources)
+
+
+def transition_status(
+    pk: int, target: str, expected: Optional[str] = None, **filters
+) -> str:
+    """Перевести бронь в ``target`` одним условным UPDATE.
+
+    ``UPDATE ... WHERE id = pk AND status IN (допустимые источники)``: бронь,
+    которую успели изменить параллельно, не перезаписывается. ``expected`` —
+    статус, который видел вызывающий (иначе подходит любой допустимый),
+    ``filters`` — дополнительные условия на строку, например ``user=...``.
+    Возвращает один из ``TRANSITION_*``.
+    """
+    sources = Reservation.transition_sources(target)
+    if expected is not None:
+        sources = [s for s in sources if s == expected]
+    qs = Reservation.objects.filter(pk=pk, **filters)
+    if sources:
+        # точка сохранения нужна только внутри чужой транзакции: одиночный
+        # UPDATE в autocommit при нарушении ограничения ничего не ломает
+        savepoint = transaction.atomic() if connection.in_atomic_block else nullcontext()
+        try:
+            with savepoint:
+                updated = qs.filter(status__in=sources).update(status=target)
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            return TRANSITION_TABLE_TAKEN
+        if updated:
+            if _changes_activity(sources, target):
+                # update() не шлёт post_save — сбрасываем кэши расписаний сами
+                schedule_changed(
+                    qs.values_list("area_id", "datetime_start", "datetime_end")
+                )
+            return TRANSITION_OK
+
+    # ни одна строка не подошла — выясняем почему
+    current = qs.values_list("status", flat=True).first()
+    if current is None:
+        return TRANSITION_NOT_FOUND
+    if current == target:
+        return TRANSITION_UNCHANGED
+    if expected is not None and current != expected:
+        return TRANSITION_CONFLICT
+    if not Reservation.can_transition(current, target):
+        return TRANSITION_FORBIDDEN
+    return TRANSITION_CONFLICT
+
+
+def set_status_batch(ids: Sequence[int], new_status: str) -> Dict[int, str]:
+    """Сменить статус пачки броней: один UPDATE на каждый исходный статус.
+
+    Обновляются только строки, которые под блокировкой всё ещё в исходном
+    статусе: бронь, которую успели изменить после чтения, не перезаписывается
+    и получает ``conflict`` — даже если её перевели в тот же статус.
+    """
+    ids = list(dict.fromkeys(ids))
+    rows = {
+        r[0]: r
+        for r in Reservation.objects.filter(pk__in=ids).values_list(
+            "id", "status", "area_id", "datetime_start", "datetime_end"
+        )
+    }
+    results: Dict[int, str] = {}
+    by_source: Dict[str, List[int]] = defaultdict(list)
+    for pk in ids:
+        row = rows.get(pk)
+        if not row:
+            results[pk] = TRANSITION_NOT_FOUND
+        elif row[1] == new_status:
+            results[pk] = TRANSITION_UNCHANGED
+        elif not Reservation.can_transition(row[1], new_status):
+            results[pk] = TRANSITION_FORBIDDEN
+        else:
+            by_source[row[1]].append(pk)
+
+    with transaction.atomic():
+        for source, pks in by_source.items():
+            try:
+                with transaction.atomic():
+                    # UPDATE меняет ровно заблокированные строки: их статус уже не изменится
+                    locked = list(
+                        Reservation.objects.select_for_update()
+                        .filter(pk__in=pks, status=source)
+                        .values_list("id", flat=True)
+                    )
+                    Reservation.objects.filter(pk__in=locked).update(status=new_status)
+            except IntegrityError as exc:
+                if not is_overlap_violation(exc):
+                    raise
+                # какая-то бронь пересекается с активной — разбираем по одной
+                for pk in pks:
+                    try:
+                        with transaction.atomic():
+                            n = Reservation.objects.filter(
+                                pk=pk, status=source
+                            ).update(status=new_status)
+                        results[pk] = TRANSITION_OK if n else TRANSITION_CONFLICT
+                    except IntegrityError as row_exc:
+                        if not is_overlap_violation(row_exc):
+                            raise
+                        results[pk] = TRANSITION_TABLE_TAKEN
+                continue
+            updated = set(locked)
+            for pk in pks:
+                results[pk] = TRANSITION_OK if pk in updated else TRANSITION_CONFLICT
+
+        # update() не шлёт post_save — сбрасываем кэши расписаний сами
+        schedule_changed(
+            rows[pk][2:] for pk, result in results.items() if result == TRANSITION_OK
+        )
+    return {pk: results[pk] for pk in ids}
+
+
+# статусы, при которых стол был (или будет) занят — для загрузки залов
+OCCUPYING_STATUSES = (
+    Reservation.Status.PENDING,
+    Reservation.Status.CONFIRMED,
+    Reservation.Status.SEATED,
+    Reservation.Status.COMPLETED,
+)
+
+
+def _day_groups(model, first: date, last: date, filters: dict) -> QuerySet:
+    return (
+        model.objects.filter(service_date__range=(first, last), **filters)
+        .values("service_date", "area_id", "status")
+        .annotate(
+            n=Count("id"),
+            guests=Sum("guests"),
+            busy=Sum(F("datetime_end") - F("datetime_start")),
+        )
+        .order_by()
+    )
+
+
+def calendar_summary(first: date, last: date, **filters) -> Dict[str, dict]:
+    """Сводка по дням для календаря менеджера: брони по статусам, гости, загрузка залов.
+
+    Брони (и архив, если в нём есть дни отрезка) считаются одним GROUP BY
+    по (день, зал, статус). Загрузка зала — доля занятых стол-минут от
+    столов зала × часы работы в этот день. ``filters`` — как у списка броней
+    (``area_id``, ``table_id``, ``status__in``).
+    """
+    groups = _day_groups(Reservation, first, last, filters)
+    if archive.reaches(first):
+        groups = groups.union(_day_groups(ReservationArchive, first, last, filters), all=True)
+
+    # залы: название и число активных столов (с учётом фильтров) одним запросом
+    counted = Q(tables__is_active=True)
+    if "table_id" in filters:
+        counted &= Q(tables__pk=filters["table_id"])
+    areas_qs = Area.objects.all()
+    if "area_id" in filters:
+        areas_qs = areas_qs.filter(pk=filters["area_id"])
+    area_info = {
+        pk: (name, n)
+        for pk, name, n in areas_qs.annotate(n=Count("tables", filter=counted))
+        .order_by()
+        .values_list("id", "name", "n")
+    }
+    rules = hours.for_range(first, last)
+
+    days: Dict[str, dict] = {}
+    busy: Dict[Tuple[date, int], timedelta] = defaultdict(timedelta)
+    for row in groups:
+        day = days.setdefault(
+            row["service_date"].isoformat(),
+            {"total": 0, "guests": 0, "by_status": {}, "areas": {}},
+        )
+        day["total"] += row["n"]
+        day["guests"] += row["guests"]
+        day["by_status"][row["status"]] = day["by_status"].get(row["status"], 0) + row["n"]
+        area = day["areas"].setdefault(row["area_id"], {"bookings": 0, "guests": 0})
+        area["bookings"] += row["n"]
+        area["guests"] += row["guests"]
+        if row["status"] in OCCUPYING_STATUSES:
+            busy[row["service_date"], row["area_id"]] += row["busy"]
+
+    for iso, day in days.items():
+        d = date.fromisoformat(iso)
+        areas = []
+        for area_id, area in sorted(day["areas"].items()):
+            open_h = rules[d].get(area_id)
+            name, n_tables = area_info.get(area_id, ("", 0))
+            capacity = n_tables * (
+                (open_h.close_dt - open_h.open_dt) if open_h else timedelta()
+            )
+            occupancy = busy[d, area_id] / capacity if capacity else None
+            areas.append(
+                {
+                    "area_id": area_id,
+                    "area_name": name,
+                    **area,
+                    "occupancy": round(occupancy, 3) if occupancy is not None else None,
+                }
+            )
+        day["areas"] = areas
+    return dict(sorted(days.items()))
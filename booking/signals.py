@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Tuple
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from booking import archive
+from booking.cache import (
+    HOURS_VERSION_KEY,
+    availability_version_keys,
+    bump_layout_on_commit,
+    bump_on_commit,
+)
+from booking.models import SLOT_FIELDS, Area, OpeningHours, Reservation, ReservationArchive, SpecialDay, Table
+
+SCHEDULE_FIELDS = {"table", "datetime_start", "datetime_end", "status"}
+AREA_FIELDS = {"area", "area_id"}
+
+
+def schedule_changed(rows: Iterable[Tuple[int, datetime, datetime]]) -> None:
+    """Сбросить кэши расписаний для броней (area_id, start, end).
+
+    Вызывать и из мест, которые меняют брони через ``QuerySet.update``:
+    сигналы моделей там не срабатывают.
+    """
+    day_areas = set()
+    for area_id, start, end in rows:
+        d = timezone.localdate(start)
+        last = timezone.localdate(end)
+        while d <= last:
+            day_areas.add((d, area_id))
+            d += timedelta(days=1)
+    if day_areas:
+        bump_on_commit(availability_version_keys(day_areas))
+
+
+def _touches_schedule(update_fields) -> bool:
+    return update_fields is None or not SCHEDULE_FIELDS.isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=Reservation)
+def reservation_remember_slot(sender, instance, update_fields=None, **kwargs):
+    # при переносе брони сбросить нужно и старый день; слот из БД запомнил
+    # from_db, перечитываем его только для брони, собранной в памяти с pk
+    instance._schedule_prev = None
+    if not instance.pk or not _touches_schedule(update_fields):
+        return
+    if getattr(instance, "_db_slot", None) is not None:
+        instance._schedule_prev = instance._db_slot
+    else:
+        instance._schedule_prev = (
+            Reservation.objects.filter(pk=instance.pk).values_list(*SLOT_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, update_fields=None, **kwargs):
+    if not _touches_schedule(update_fields):
+        return
+    rows = [(instance.area_id, instance.datetime_start, instance.datetime_end)]
+    prev = getattr(instance, "_schedule_prev", None)
+    if prev and prev != rows[0]:
+        rows.append(prev)
+    schedule_changed(rows)
+    instance.remember_slot()
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):
+    schedule_changed(
+        [(instance.area_id, instance.datetime_start, instance.datetime_end)]
+    )
+
+
+@receiver(pre_save, sender=Table)
+def table_remember_area(sender, instance, update_fields=None, **kwargs):
+    # зал до сохранения: без переноса стола брони не трогаем
+    instance._area_prev = None
+    if instance.pk and (update_fields is None or not AREA_FIELDS.isdisjoint(update_fields)):
+        instance._area_prev = (
+            Table.objects.filter(pk=instance.pk).values_list("area_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Table)
+def table_area_sync(sender, instance, created=False, **kwargs):
+    # стол перенесли в другой зал — переносим и копию area в его бронях и архиве
+    prev = getattr(instance, "_area_prev", None)
+    if created or prev is None or prev == instance.area_id:
+        return
+    ReservationArchive.objects.filter(table=instance).exclude(area_id=instance.area_id).update(
+        area_id=instance.area_id
+    )
+    moved = Reservation.objects.filter(table=instance).exclude(area_id=instance.area_id)
+    rows = list(moved.values_list("area_id", "datetime_start", "datetime_end"))
+    if rows:
+        moved.update(area_id=instance.area_id)
+        schedule_changed(rows + [(instance.area_id, s, e) for _, s, e in rows])
+
+
+@receiver([post_save, post_delete], sender=ReservationArchive)
+def archive_changed(sender, **kwargs):
+    # перенос порциями сбрасывает last_day сам; здесь — правки поштучно
+    transaction.on_commit(archive.forget_last_day)
+
+
+@receiver([post_save, post_delete], sender=Table)
+@receiver([post_save, post_delete], sender=Area)
+def layout_changed(sender, **kwargs):
+    # сериализаторы импортируют services, а services — этот модуль
+    from booking.api import snapshot
+
+    bump_layout_on_commit()
+    # снимок новой версии рендерим сразу, а не на первом запросе гостя
+    transaction.on_commit(snapshot.rebuild)
+
+
+@receiver([post_save, post_delete], sender=OpeningHours)
+@receiver([post_save, post_delete], sender=SpecialDay)
+def hours_changed(sender, **kwargs):
+    bump_on_commit([HOURS_VERSION_KEY])
@@ -18,9 +18,14 @@
   if (!layer || !mapWrap) return;
 
   const API_TABLES = mapWrap.dataset.apiTables;
+  // снимок схемы: залы, столы и типы одним сжатым ответом
+  const API_LAYOUT = mapWrap.dataset.apiLayout;
   const API_ME = mapWrap.dataset.apiMe; // можно не задавать — тогда /me не дергаем
   const API_BOOK = mapWrap.dataset.apiBook;
   const API_AVAIL = mapWrap.dataset.apiAvailability || "/api/availability/";
+  const API_GRID =
+    mapWrap.dataset.apiAvailabilityGrid || "/api/availability/grid/";
+  const API_HOLDS = mapWrap.dataset.apiHolds || "/api/holds/";
   const AUTHED = mapWrap.dataset.authenticated === "1"; // ← серверный флаг
 
   const form = document.getElementById("searchForm");
@@ -144,19 +149,26 @@
     window.addEventListener("resize", fitHitbox);
     requestAnimationFrame(fitHitbox);
 
-    hit.addEventListener("click", () => {
+    hit.addEventListener("click", async () => {
       if (hit.dataset.enabled !== "1") return;
       if (selectedId === table.id) {
         selectedId = null;
         layer
           .querySelectorAll("button[data-hit]")
           .forEach((b) => setHighlight(b, false));
+        releaseHold();
       } else {
         layer
           .querySelectorAll("button[data-hit]")
           .forEach((b) => setHighlight(b, false));
         selectedId = table.id;
         setHighlight(hit, true);
+        if (!(await holdTable(table.id))) {
+          selectedId = null;
+          setHighlight(hit, false);
+          hit.dataset.enabled = "0";
+          alert("Someone is booking this table right now. Please choose another one.");
+        }
       }
       updateReserveState();
     });
@@ -169,11 +181,12 @@
   }
 
   async function fetchTables() {
-    if (!API_TABLES) return getLocalTables();
+    if (!API_LAYOUT && !API_TABLES) return getLocalTables();
     try {
-      const r = await fetch(API_TABLES, { credentials: "include" });
+      const r = await fetch(API_LAYOUT || API_TABLES, { credentials: "include" });
       if (!r.ok) throw new Error("api not ok");
-      const data = await r.json();
+      const payload = await r.json();
+      const data = API_LAYOUT ? payload.tables : payload;
       if (!Array.isArray(data) || !data.length) throw new Error("empty");
       return data.map((t) => {
         const cap = Number(t.capacity || 4);
@@ -198,6 +211,115 @@
     }
   }
 
+  // ---- Удержание выбранного стола на время оформления ----
+  let currentHold = null;
+
+  async function holdTable(tableId) {
+    if (!fDate?.value || !fStart?.value) return true;
+    try {
+      const r = await fetch(API_HOLDS, {
+        method: "POST",
+        credentials: "include",
+        headers: {
+          "Content-Type": "application/json",
+          "X-CSRFToken": getCsrf(),
+        },
+        body: JSON.stringify({
+          date: fDate.value,
+          start: fStart.value,
+          table_id: tableId,
+          guests: Number(fGuests?.value || 1),
+          duration: Number(fDuration?.value || 90),
+          replace: currentHold,
+        }),
+      });
+      if (r.status === 409) {
+        currentHold = null;
+        return false;
+      }
+      if (r.ok) currentHold = (await r.json()).hold_id;
+    } catch (err) {
+      console.warn(err);
+    }
+    // сбой удержания не мешает бронированию — проверит сервер
+    return true;
+  }
+
+  function releaseHold() {
+    if (!currentHold) return;
+    fetch(`${API_HOLDS}${currentHold}/`, {
+      method: "DELETE",
+      credentials: "include",
+      headers: { "X-CSRFToken": getCsrf() },
+    }).catch(() => {});
+    currentHold = null;
+  }
+
+  // ---- Day grid: доступность на весь день, время переключаем без запросов ----
+  const gridCache = new Map();
+
+  async function loadGrid(date, duration) {
+    const key = `${date}|${duration}|${currentHold || ""}`;
+    if (gridCache.has(key)) return gridCache.get(key);
+    const url = new URL(API_GRID, window.location.origin);
+    url.searchParams.set("date", date);
+    url.searchParams.set("duration", String(duration));
+    if (currentHold) url.searchParams.set("hold", currentHold);
+    const r = await fetch(url.toString(), { credentials: "include" });
+    if (!r.ok) throw new Error("Grid failed");
+    const data = await r.json();
+    gridCache.set(key, data);
+    return data;
+  }
+
+  // null — время вне сетки дня, тогда спрашиваем /api/availability/
+  function availabilityFromGrid(grid, start, duration) {
+    if (!grid.open) return null;
+    const [hh, mm] = start.split(":").map(Number);
+    const [oh, om] = grid.open.split(":").map(Number);
+    const from = hh * 60 + mm - (oh * 60 + om);
+    const to = from + duration;
+    const b = grid.bucket_min;
+    if (from < 0 || to > grid.buckets * b) return null;
+    const lo = Math.floor(from / b);
+    const hi = Math.ceil(to / b);
+    const mask = ((1n << BigInt(hi - lo)) - 1n) << BigInt(lo);
+    const out = new Map();
+    grid.tables.forEach((t) =>
+      out.set(t.id, { available: (BigInt("0x" + t.busy) & mask) === 0n })
+    );
+    return out;
+  }
+
+  async function fetchAvailability(date, start, guests, duration) {
+    try {
+      const grid = await loadGrid(date, duration);
+      const fromGrid = availabilityFromGrid(grid, start, duration);
+      if (fromGrid) return fromGrid;
+    } catch (err) {
+      console.warn(err);
+    }
+
+    const url = new URL(API_AVAIL, window.location.origin);
+    url.searchParams.set("date", date);
+    url.searchParams.set("start", start);
+    url.searchParams.set("guests", String(guests));
+    url.searchParams.set("duration", String(duration));
+    if (currentHold) url.searchParams.set("hold", currentHold);
+
+    const r = await fetch(url.toString(), { credentials: "include" });
+    if (!r.ok) throw new Error("Availability failed");
+    const data = await r.json();
+
+    const availMap = new Map();
+    if (Array.isArray(data.tables)) {
+      data.tables.forEach((t) =>
+        availMap.set(t.id, { available: !!t.available })
+      );
+    }
+    return availMap;
+  }
+
   (async function init() {
     tablesCache = await fetchTables();
     clearLayer();
@@ -226,22 +348,7 @@
     }
 
     try {
-      const url = new URL(API_AVAIL, window.location.origin);
-      url.searchParams.set("date", date);
-      url.searchParams.set("start", start);
-      url.searchParams.set("guests", String(guests));
-      url.searchParams.set("duration", String(duration));
-
-      const r = await fetch(url.toString(), { credentials: "include" });
-      if (!r.ok) throw new Error("Availability failed");
-      const data = await r.json();
-
-      const availMap = new Map();
-      if (Array.isArray(data.tables)) {
-        data.tables.forEach((t) =>
-          availMap.set(t.id, { available: !!t.available })
-        );
-      }
+      const availMap = await fetchAvailability(date, start, guests, duration);
 
       nodesById.forEach(({ img, hit, meta }) => {
         const byCapacity = meta.capacity >= guests;
@@ -263,6 +370,7 @@
         if (!canUse && selectedId === meta.id) {
           selectedId = null;
           setHighlight(hit, false);
+          releaseHold();
         }
       });
 
@@ -283,12 +391,25 @@
     }
   }
 
+  // один ключ на одну и ту же заявку: повтор после обрыва сети не создаст дубль
+  const idempotencyKeys = new Map();
+  function idempotencyKey(json) {
+    if (!idempotencyKeys.has(json)) {
+      const key = window.crypto?.randomUUID
+        ? window.crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+      idempotencyKeys.set(json, key);
+    }
+    return idempotencyKeys.get(json);
+  }
+
   async function postBooking(payload) {
     const body = {
       ...payload,
       table_id: payload.table ?? payload.table_id,
       duration_min: payload.duration ?? payload.duration_min,
     };
+    const json = JSON.stringify(body);
 
     const r = await fetch(API_BOOK, {
       method: "POST",
@@ -296,9 +417,12 @@
       headers: {
         "Content-Type": "application/json",
         "X-CSRFToken": getCsrf(),
+        "Idempotency-Key": idempotencyKey(json),
       },
-      body: JSON.stringify(body),
+      body: json,
     });
+    // ответ получен — следующая отправка уже новая заявка
+    idempotencyKeys.delete(json);
     const data = await r.json().catch(() => ({}));
     if (!r.ok) {
       let msg = data.detail || "Booking failed";
@@ -346,7 +470,11 @@
         duration: Number(fDuration.value || 90),
         guests: Number(fGuests.value || 1),
         table: selectedId,
+        hold_id: currentHold || undefined,
       });
+      // удержание снято сервером вместе с созданием брони
+      currentHold = null;
+      gridCache.clear();
       openSuccess(successHTML(res));
       nodesById.forEach(({ hit }) => setHighlight(hit, false));
       selectedId = null;
@@ -365,6 +493,7 @@
     table_id: selectedId,
     duration: Number(fDuration.value || 90),
     table_name: t?.name || ("#" + selectedId),
+    hold_id: currentHold || "",
   };
 
   if (typeof window.openGuestBooking === "function") {
@@ -379,6 +508,7 @@
       form.guests.value = selected.guests;
       form.table_id.value = selected.table_id;
       form.duration.value = selected.duration;
+      if (form.hold_id) form.hold_id.value = selected.hold_id;
       const s = document.getElementById("gbSummary");
       if (s) {
         s.innerHTML = `
@@ -33,6 +33,7 @@ document.addEventListener("DOMContentLoaded", () => {
     form.guests.value = details.guests || "";
     form.table_id.value = details.table_id || "";
     form.duration.value = details.duration || "";
+    if (form.hold_id) form.hold_id.value = details.hold_id || "";
 
     if (summary) {
       summary.innerHTML = `
@@ -71,6 +72,7 @@ document.addEventListener("DOMContentLoaded", () => {
       email: f.email.value.trim(),
       phone: f.phone.value.trim(),
       comment: f.comment.value.trim(),
+      hold_id: f.hold_id ? f.hold_id.value : "",
     };
 
     if (!payload.name) return gbShowError("Please enter your name");
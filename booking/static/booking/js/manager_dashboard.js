@@ -26,7 +26,8 @@
   let current = new Date(); current.setDate(1);
   let daySelected = new Date();
   let activeStatus = "all";
-  let monthData = [];
+  let monthSummary = {};  // "YYYY-MM-DD" -> { total, guests, by_status, areas }
+  let dayData = [];
   let statusChoices = Object.entries(STATUS_LABELS_EN).map(([code, label]) => ({ code, label }));
 
   function getCSRFToken() {
@@ -65,30 +66,40 @@
     return (cfg.STATUS_COLORS && cfg.STATUS_COLORS[status]) || "#EEE";
   }
 
-  async function fetchMonthData() {
-    const { start, end } = monthBounds(current);
-    const params = new URLSearchParams({
-      date_from: isoLocalDate(start),
-      date_to: isoLocalDate(end),
-    });
+  function filterParams(params) {
     if (activeStatus !== "all") params.append("status", activeStatus);
     if (areaFilter && areaFilter.value) params.append("area", areaFilter.value);
     if (tableFilter && tableFilter.value) params.append("table", tableFilter.value);
+    return params;
+  }
 
-    const res = await fetch(`${cfg.API_LIST}?${params.toString()}`, {
+  async function getJSON(url, params) {
+    const res = await fetch(`${url}?${params.toString()}`, {
       credentials: "same-origin",
       headers: { "Accept": "application/json" }
     });
     if (!res.ok) {
-      console.error("Failed to load bookings:", res.status);
-      monthData = [];
-      return;
+      console.error("Failed to load:", url, res.status);
+      return null;
     }
-    const data = await res.json();
-    monthData = (data && data.results) ? data.results : [];
+    return res.json();
   }
 
-  async function setStatus(id, statusCode) {
+  // календарю хватает сводки по дням; строки броней — только за выбранный день
+  async function fetchMonthData() {
+    const month = isoLocalDate(current).slice(0, 7);
+    const data = await getJSON(cfg.API_CALENDAR, filterParams(new URLSearchParams({ month })));
+    monthSummary = (data && data.days) ? data.days : {};
+  }
+
+  async function fetchDayData() {
+    const day = isoLocalDate(daySelected);
+    const data = await getJSON(cfg.API_LIST, filterParams(new URLSearchParams({ date_from: day, date_to: day })));
+    dayData = (data && data.results) ? data.results : [];
+  }
+
+  // expected — статус, который видел менеджер: если его успели сменить, сервер ответит 409
+  async function setStatus(id, statusCode, expected) {
     const res = await fetch(cfg.API_SET_STATUS(id), {
       method: "POST",
       credentials: "same-origin",
@@ -97,12 +108,15 @@
         "Accept": "application/json",
         "X-CSRFToken": getCSRFToken(),
       },
-      body: JSON.stringify({ status: statusCode })
+      body: JSON.stringify({ status: statusCode, expected })
     });
     if (!res.ok) {
       const t = await res.text().catch(() => "");
       console.error("Status change failed:", res.status, t);
-      alert(`Failed to set status (${res.status}).`);
+      alert(res.status === 409
+        ? "The booking was changed by someone else. Reloading."
+        : `Failed to set status (${res.status}).`);
+      if (res.status === 409) await reloadMonth();
       return false;
     }
     return true;
@@ -154,10 +168,10 @@
       const dots = document.createElement("div");
       dots.className = "flex gap-1";
 
-      const items = monthData.filter(x => isSameLocalDay(new Date(x.datetime_start), cellDate));
-      const seen = new Set(items.map(x => x.status));
+      const summary = monthSummary[isoLocalDate(cellDate)];
+      const byStatus = (summary && summary.by_status) || {};
       ["pending","confirmed","seated","completed","no_show","canceled"].forEach(s => {
-        if (seen.has(s)) {
+        if (byStatus[s]) {
           const dot = document.createElement("span");
           dot.className = "inline-block w-2 h-2 rounded-full";
           dot.style.background = statusColor(s);
@@ -170,14 +184,21 @@
 
       const cnt = document.createElement("div");
       cnt.className = "text-[11px] opacity-70 mt-auto";
-      if (items.length) cnt.textContent = `${items.length} bookings`;
+      if (summary && summary.total) {
+        cnt.textContent = `${summary.total} bookings · ${summary.guests} guests`;
+        box.title = (summary.areas || [])
+          .filter(a => a.occupancy !== null)
+          .map(a => `${a.area_name}: ${Math.round(a.occupancy * 100)}% occupied`)
+          .join("\n");
+      }
 
       box.appendChild(head);
       box.appendChild(cnt);
 
-      box.addEventListener("click", () => {
+      box.addEventListener("click", async () => {
         daySelected = cellDate;
         setDayLabel(daySelected);
+        await fetchDayData();
         renderDayList();
       });
 
@@ -187,7 +208,7 @@
 
   function renderDayList() {
     dayList.innerHTML = "";
-    const itemsAll = monthData.filter(x => isSameLocalDay(new Date(x.datetime_start), daySelected));
+    const itemsAll = dayData.filter(x => isSameLocalDay(new Date(x.datetime_start), daySelected));
     const items = (activeStatus === "all") ? itemsAll : itemsAll.filter(x => x.status === activeStatus);
 
     const counts = items.reduce((acc, i) => { acc[i.status] = (acc[i.status] || 0) + 1; return acc; }, {});
@@ -244,7 +265,7 @@
 
       saveBtn.addEventListener("click", async () => {
         const id = it.id ?? it.pk;
-        const ok = await setStatus(id, sel.value);
+        const ok = await setStatus(id, sel.value, it.status);
         if (ok) await reloadMonth(); // refresh calendar + list
       });
 
@@ -275,7 +296,7 @@
   });
 
   async function reloadMonth() {
-    await fetchMonthData();
+    await Promise.all([fetchMonthData(), fetchDayData()]);
     renderCalendar();
     setDayLabel(daySelected);
     renderDayList();
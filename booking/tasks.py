@@ -1,13 +1,15 @@
 from io import BytesIO
-from datetime import timedelta
+from datetime import time, timedelta
 import qrcode
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.timezone import now
-from celery import shared_task
+from celery import group, shared_task
 
+from . import archive
 from .models import Reservation
+from booking.services import combine
 from booking.utils import make_qr_token, make_ics_token, build_reservation_ics
 
 
@@ -15,9 +17,7 @@ def _fmt_dt(dt):
     return dt.astimezone().strftime("%d.%m.%Y %H:%M")
 
 
-@shared_task
-def send_booking_created(reservation_id: int):
-    r = Reservation.objects.get(pk=reservation_id)
+def _created_message(r: Reservation) -> EmailMultiAlternatives:
     ctx = {
         "r": r,
         "datetime_start": _fmt_dt(r.datetime_start),
@@ -25,10 +25,22 @@ def send_booking_created(reservation_id: int):
     }
     subj = f"Заявка на бронирование получена — {ctx['datetime_start']}"
     body_txt = render_to_string("emails/booking_created.txt", ctx)
-    msg = EmailMultiAlternatives(
+    return EmailMultiAlternatives(
         subj, body_txt, settings.DEFAULT_FROM_EMAIL, [r.email or settings.MANAGER_EMAIL]
     )
-    msg.send()
+
+
+@shared_task
+def send_booking_created(reservation_id: int):
+    r = Reservation.objects.get(pk=reservation_id)
+    _created_message(r).send()
+
+
+@shared_task
+def send_bookings_created(reservation_ids: list):
+    """Письма о созданных бронях пачки: один запрос и одно SMTP-соединение."""
+    qs = Reservation.objects.filter(pk__in=reservation_ids).order_by("datetime_start")
+    get_connection().send_messages([_created_message(r) for r in qs])
 
 
 @shared_task
@@ -97,3 +109,28 @@ def schedule_reminder(reservation_id: int, hours_before: int = 2):
     eta = r.datetime_start - timedelta(hours=hours_before)
     if eta > now():
         send_booking_reminder.apply_async((reservation_id,), eta=eta)
+
+
+NOTIFY_CHUNK = 50
+
+
+def notify_confirmed(reservation_ids, hours_before: int = 2):
+    """Письма с QR и напоминания для пачки подтверждённых броней.
+
+    Задачи уходят пачками по NOTIFY_CHUNK id в одной группе, а не
+    2×N отдельными сообщениями.
+    """
+    ids = list(reservation_ids)
+    if not ids:
+        return
+    group(
+        send_booking_confirmed.chunks([(i,) for i in ids], NOTIFY_CHUNK),
+        schedule_reminder.chunks([(i, hours_before) for i in ids], NOTIFY_CHUNK),
+    ).apply_async()
+
+
+@shared_task
+def archive_finished_reservations(chunk: int = archive.CHUNK) -> int:
+    """Ночной перенос завершённых броней в архив (периодическая задача Beat)."""
+    before = combine(archive.horizon(), time.min)
+    return sum(archive.archive_before(before, chunk))
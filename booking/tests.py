@@ -0,0 +1,1340 @@
+"""Бюджеты запросов к БД для API бронирования и формат быстрых списков.
+
+Каждый эндпоинт вызывается на маленьком наборе данных и на наборе в
+несколько раз больше: число запросов не должно превышать бюджет и не должно
+расти вместе с данными (N+1). На PostgreSQL горячие запросы к броням
+дополнительно прогоняются через EXPLAIN: Seq Scan по booking_reservation —
+ошибка (индекс есть, но запрос им не пользуется).
+
+В бюджет входят запросы сессии и пользователя, а также SAVEPOINT: тест
+идёт внутри транзакции. Бюджет уменьшили — поправьте число в тесте.
+
+Запуск: ``USE_SQLITE=1 python manage.py test`` (или на PostgreSQL).
+"""
+import gzip
+import json
+import re
+import threading
+from datetime import date, time, timedelta
+from importlib import import_module
+from itertools import count, product
+from unittest import mock, skipUnless
+
+from celery import group
+from celery.app.task import Task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.timezone import localtime
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from booking import archive, holds, hours
+from booking.api import idempotency, projections, renderers
+from booking.api.views import HoldRateThrottle
+from booking.api.serializers import ManagerBookingListItem, ReservationListSerializer
+from booking.models import Area, Reservation, ReservationArchive, SpecialDay, Table
+from booking.services import (
+    BUFFER_MIN,
+    OVERLAP_CONSTRAINT,
+    TRANSITION_CONFLICT,
+    TRANSITION_FORBIDDEN,
+    TRANSITION_OK,
+    TRANSITION_UNCHANGED,
+    TableTaken,
+    availability_for_tables,
+    combine,
+    day_bounds,
+    find_alternatives,
+    insert_reservation,
+    nearest_after,
+    reservations_qs_for_table,
+    schedule_for_tables,
+    save_reservation,
+    set_status_batch,
+    table_is_free,
+    transition_status,
+)
+from booking.utils import make_ics_token
+from users.models import CustomUser
+
+DAY = date(2031, 3, 14)
+# начала броней на столе за день; последняя заканчивается к 19:00
+BOOKING_STARTS = (time(12, 0), time(14, 30), time(17, 0))
+STATUSES = (
+    Reservation.Status.PENDING,
+    Reservation.Status.CONFIRMED,
+    Reservation.Status.COMPLETED,
+    Reservation.Status.CANCELED,
+)
+HOT_TABLES = ("booking_reservation",)
+
+
+def _add_tables(area: Area, n: int) -> list:
+    first = area.tables.count()
+    return [
+        Table.objects.create(area=area, name=f"{area.name}-{first + i}", capacity=4)
+        for i in range(n)
+    ]
+
+
+def _add_bookings(tables, days: int, per_table: int, user=None) -> None:
+    rows = []
+    for d in range(days):
+        for n, table in enumerate(tables):
+            for i, start_t in enumerate(BOOKING_STARTS[:per_table]):
+                start = combine(DAY + timedelta(days=d), start_t)
+                r = Reservation(
+                    user=user,
+                    table=table,
+                    datetime_start=start,
+                    datetime_end=start + timedelta(hours=2),
+                    guests=2,
+                    name="Test guest",
+                    email="guest@example.com",
+                    status=STATUSES[(n + i + d) % len(STATUSES)],
+                )
+                r.fill_denormalized()
+                rows.append(r)
+    Reservation.objects.bulk_create(rows)
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class ApiQueryBudgetTests(TestCase):
+    """Число запросов на вызов: не больше бюджета и не зависит от объёма данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.areas = [
+            Area.objects.create(name="Main", order=0),
+            Area.objects.create(name="Terrace", order=1),
+        ]
+        cls.guest = CustomUser.objects.create_user(
+            email="guest@example.com", password="x", first_name="Guest", phone="+70000000001"
+        )
+        cls.manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+        for area in cls.areas:
+            _add_bookings(_add_tables(area, 2), days=1, per_table=1, user=cls.guest)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.days = count(30)  # свободные дни для броней и удержаний
+
+    def _grow(self) -> None:
+        # в несколько раз больше столов, броней и истории гостя
+        for area in self.areas:
+            _add_tables(area, 4)
+            _add_bookings(area.tables.all(), days=5, per_table=3, user=self.guest)
+        _add_bookings(Table.objects.all(), days=5, per_table=3)
+
+    def _free_slot(self) -> dict:
+        return {"date": (DAY + timedelta(days=next(self.days))).isoformat(), "start": "19:30"}
+
+    def _booking(self, status=Reservation.Status.PENDING, user=None) -> Reservation:
+        start = combine(DAY + timedelta(days=next(self.days)), time(19, 30))
+        return Reservation.objects.create(
+            user=user,
+            table=Table.objects.first(),
+            datetime_start=start,
+            datetime_end=start + timedelta(hours=2),
+            guests=2,
+            name="Test guest",
+            email="guest@example.com",
+            status=status,
+        )
+
+    def _count(self, prepare) -> int:
+        call = prepare()
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = call()
+        self.assertLess(resp.status_code, 400, getattr(resp, "data", resp))
+        return len(ctx.captured_queries)
+
+    def assertQueryBudget(self, budget: int, prepare, user=None):
+        """``prepare()`` готовит данные и возвращает сам запрос без аргументов."""
+        if user:
+            self.client.force_login(user)
+        small = self._count(prepare)
+        self._grow()
+        large = self._count(prepare)
+        self.assertLessEqual(small, budget, f"запросов: {small}, бюджет {budget}")
+        self.assertEqual(large, small, f"запросов стало {large} вместо {small}")
+
+    def _get(self, url, params=None):
+        return lambda: lambda: self.client.get(url, params or {})
+
+    # --- доступность и схема зала ---
+
+    def test_availability(self, *_):
+        params = {"date": DAY.isoformat(), "start": "19:30", "guests": 2}
+        self.assertQueryBudget(4, self._get("/api/availability/", params))
+
+    def test_availability_grid(self, *_):
+        self.assertQueryBudget(4, self._get("/api/availability/grid/", {"date": DAY.isoformat()}))
+
+    def test_availability_gaps(self, *_):
+        self.assertQueryBudget(4, self._get("/api/availability/gaps/", {"date": DAY.isoformat()}))
+
+    def test_availability_alternatives(self, *_):
+        params = {"date": DAY.isoformat(), "start": "13:00", "guests": 2}
+        self.assertQueryBudget(10, self._get("/api/availability/alternatives/", params))
+
+    def test_layout_tables(self, *_):
+        self.assertQueryBudget(1, self._get("/api/layout/tables/"))
+
+    def test_layout_table_types(self, *_):
+        self.assertQueryBudget(1, self._get("/api/layout/table-types/"))
+
+    def test_layout_areas(self, *_):
+        self.assertQueryBudget(2, self._get("/api/layout/areas/"))
+
+    # --- удержания и создание броней ---
+
+    def test_place_hold(self, *_):
+        def prepare():
+            data = {**self._free_slot(), "table_id": Table.objects.first().pk, "guests": 2}
+            return lambda: self.client.post("/api/holds/", data, format="json")
+
+        self.assertQueryBudget(4, prepare)
+
+    def test_release_hold(self, *_):
+        def prepare():
+            data = {**self._free_slot(), "table_id": Table.objects.first().pk, "guests": 2}
+            hold_id = self.client.post("/api/holds/", data, format="json").data["hold_id"]
+            return lambda: self.client.delete(f"/api/holds/{hold_id}/")
+
+        self.assertQueryBudget(0, prepare)
+
+    def test_create_booking(self, *_):
+        def prepare():
+            data = {
+                **self._free_slot(),
+                "guests": 2,
+                "table_id": Table.objects.first().pk,
+                "name": "Walk-in",
+                "email": "walkin@example.com",
+            }
+            return lambda: self.client.post("/api/bookings/", data, format="json")
+
+        self.assertQueryBudget(6, prepare)
+
+    def test_create_booking_auto_pick(self, *_):
+        def prepare():
+            data = {**self._free_slot(), "guests": 2, "name": "Walk-in", "phone": "+7999"}
+            return lambda: self.client.post("/api/bookings/", data, format="json")
+
+        self.assertQueryBudget(9, prepare)
+
+    def test_create_bookings_bulk(self, *_):
+        def prepare():
+            slot = self._free_slot()
+            items = [
+                {**slot, "guests": 2, "name": f"Group {i}", "phone": "+7999"}
+                for i in range(3)
+            ]
+            data = {"mode": "all", "bookings": items}
+            return lambda: self.client.post("/api/bookings/bulk/", data, format="json")
+
+        self.assertQueryBudget(11, prepare, user=self.manager)
+
+    # --- кабинет гостя ---
+
+    def test_my_bookings_by_status(self, *_):
+        self.assertQueryBudget(4, self._get("/api/me/bookings-by-status/"), user=self.guest)
+
+    def test_my_bookings_status_page(self, *_):
+        def prepare():
+            first = self.client.get("/api/me/bookings-by-status/", {"status": "pending", "limit": 1})
+            params = {"status": "pending", "limit": 1, "cursor": first.data["next"] or ""}
+            return lambda: self.client.get("/api/me/bookings-by-status/", params)
+
+        self.assertQueryBudget(3, prepare, user=self.guest)
+
+    def test_my_booking_cancel(self, *_):
+        def prepare():
+            r = self._booking(user=self.guest)
+            return lambda: self.client.delete(f"/api/me/bookings/{r.pk}/cancel")
+
+        self.assertQueryBudget(6, prepare, user=self.guest)
+
+    def test_my_booking_ical(self, *_):
+        def prepare():
+            r = self._booking(user=self.guest)
+            return lambda: self.client.get(f"/api/me/bookings/{r.pk}/ical")
+
+        self.assertQueryBudget(5, prepare, user=self.guest)
+
+    def test_booking_ical_by_token(self, *_):
+        def prepare():
+            token = make_ics_token(self._booking().pk)
+            return lambda: self.client.get("/api/ical", {"token": token})
+
+        self.assertQueryBudget(3, prepare)
+
+    # --- менеджер ---
+
+    # +1 на холодном кэше: последний день архива (archive.last_day)
+    def test_manager_bookings_list(self, *_):
+        params = {"date_from": DAY.isoformat(), "date_to": (DAY + timedelta(days=2)).isoformat()}
+        self.assertQueryBudget(4, self._get("/api/manager/bookings/", params), user=self.manager)
+
+    def test_manager_bookings_list_by_area(self, *_):
+        def prepare():
+            params = {"date_from": DAY.isoformat(), "area": self.areas[0].pk}
+            return lambda: self.client.get("/api/manager/bookings/", params)
+
+        self.assertQueryBudget(4, prepare, user=self.manager)
+
+    def test_manager_calendar(self, *_):
+        params = {"month": DAY.strftime("%Y-%m")}
+        self.assertQueryBudget(7, self._get("/api/manager/calendar/", params), user=self.manager)
+
+    def test_manager_bookings_list_page(self, *_):
+        def prepare():
+            params = {"date_from": DAY.isoformat(), "limit": 2}
+            first = self.client.get("/api/manager/bookings/", params)
+            params["cursor"] = first.data["next"]
+            return lambda: self.client.get("/api/manager/bookings/", params)
+
+        self.assertQueryBudget(4, prepare, user=self.manager)
+
+    def test_manager_bookings_list_stream(self, *_):
+        def prepare():
+            params = {"date_from": DAY.isoformat(), "stream": "1"}
+
+            def call():
+                resp = self.client.get("/api/manager/bookings/", params)
+                resp.body = b"".join(resp.streaming_content)  # запросы идут при чтении тела
+                return resp
+
+            return call
+
+        self.assertQueryBudget(4, prepare, user=self.manager)
+
+    def test_manager_confirm(self, *_):
+        def prepare():
+            r = self._booking()
+            return lambda: self.client.post(f"/api/manager/bookings/{r.pk}/confirm")
+
+        self.assertQueryBudget(6, prepare, user=self.manager)
+
+    def test_manager_cancel(self, *_):
+        def prepare():
+            r = self._booking()
+            return lambda: self.client.post(f"/api/manager/bookings/{r.pk}/cancel")
+
+        self.assertQueryBudget(6, prepare, user=self.manager)
+
+    def test_manager_set_status(self, *_):
+        def prepare():
+            r = self._booking(Reservation.Status.CONFIRMED)
+            url = f"/api/manager/bookings/{r.pk}/status"
+            return lambda: self.client.post(url, {"status": "seated"}, format="json")
+
+        self.assertQueryBudget(6, prepare, user=self.manager)
+
+    def test_manager_set_status_batch(self, *_):
+        def prepare():
+            # все брони дня: их число растёт вместе с данными
+            ids = list(
+                Reservation.objects.filter(service_date=DAY).values_list("id", flat=True)
+            )
+            data = {"ids": ids, "status": "canceled"}
+            return lambda: self.client.post("/api/manager/bookings/status/", data, format="json")
+
+        self.assertQueryBudget(13, prepare, user=self.manager)
+
+    def test_manager_status_choices(self, *_):
+        self.assertQueryBudget(2, self._get("/api/manager/statuses/"), user=self.manager)
+
+    def test_manager_availability_cache_stats(self, *_):
+        self.assertQueryBudget(2, self._get("/api/manager/availability-cache/"), user=self.manager)
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class StatusTransitionTests(TestCase):
+    """Граф Reservation.TRANSITIONS: разрешённые, запрещённые и устаревшие переходы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.table = _add_tables(Area.objects.create(name="Main"), 1)[0]
+        cls.manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+
+    def setUp(self):
+        self.days = count()
+
+    def _booking(self, status) -> Reservation:
+        start = combine(DAY + timedelta(days=next(self.days)), time(19, 30))
+        return Reservation.objects.create(
+            table=self.table,
+            datetime_start=start,
+            datetime_end=start + timedelta(hours=2),
+            guests=2,
+            name="Test guest",
+            status=status,
+        )
+
+    def test_graph(self, *_):
+        statuses = Reservation.Status.values
+        for source, target in product(statuses, statuses):
+            with self.subTest(source=source, target=target):
+                booking = self._booking(source)
+                result = transition_status(booking.pk, target)
+                booking.refresh_from_db()
+                if source == target:
+                    self.assertEqual(result, TRANSITION_UNCHANGED)
+                elif Reservation.can_transition(source, target):
+                    self.assertEqual(result, TRANSITION_OK)
+                    self.assertEqual(booking.status, target)
+                else:
+                    self.assertEqual(result, TRANSITION_FORBIDDEN)
+                    self.assertEqual(booking.status, source)
+
+    def test_stale_expected_is_conflict(self, *_):
+        booking = self._booking(Reservation.Status.PENDING)
+        result = transition_status(booking.pk, Reservation.Status.SEATED, expected=Reservation.Status.CONFIRMED)
+        self.assertEqual(result, TRANSITION_CONFLICT)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Reservation.Status.PENDING)
+
+    def _set_status(self, pk, **data):
+        self.client.force_login(self.manager)
+        return self.client.post(f"/api/manager/bookings/{pk}/status", data, content_type="application/json")
+
+    def test_api_stale_expected_409(self, *_):
+        booking = self._booking(Reservation.Status.PENDING)
+        resp = self._set_status(booking.pk, status="seated", expected="confirmed")
+        self.assertEqual(resp.status_code, 409)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Reservation.Status.PENDING)
+        self.assertEqual(self._set_status(booking.pk, status="seated", expected="pending").status_code, 200)
+
+    def test_api_forbidden_and_missing(self, *_):
+        booking = self._booking(Reservation.Status.COMPLETED)
+        self.assertEqual(self._set_status(booking.pk, status="canceled").status_code, 400)
+        self.assertEqual(self._set_status(booking.pk + 1000, status="canceled").status_code, 404)
+
+
+class TableAreaSyncTests(TestCase):
+    """Копия area в бронях обновляется только при переносе стола в другой зал."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.main = Area.objects.create(name="Main")
+        cls.terrace = Area.objects.create(name="Terrace")
+        cls.table = _add_tables(cls.main, 1)[0]
+        _add_bookings([cls.table], days=2, per_table=2)
+
+    def _reservation_queries(self, save):
+        with CaptureQueriesContext(connection) as ctx:
+            save()
+        return [q["sql"] for q in ctx.captured_queries if "booking_reservation" in q["sql"]]
+
+    def test_same_area_skips_reservations(self):
+        self.table.capacity = 6
+        self.assertEqual(self._reservation_queries(self.table.save), [])
+        self.assertEqual(self._reservation_queries(lambda: self.table.save(update_fields=["capacity"])), [])
+
+    def test_move_updates_reservations(self):
+        self.table.area = self.terrace
+        self.table.save()
+        self.assertFalse(Reservation.objects.filter(table=self.table).exclude(area=self.terrace).exists())
+        self.table.area = self.main
+        self.table.save(update_fields=["area"])
+        self.assertFalse(Reservation.objects.filter(table=self.table).exclude(area=self.main).exists())
+
+    def test_move_updates_archive(self):
+        Reservation.objects.filter(table=self.table).update(status=Reservation.Status.COMPLETED)
+        list(archive.archive_before(combine(DAY + timedelta(days=1), time(12))))
+        self.assertTrue(ReservationArchive.objects.filter(table=self.table).exists())
+        self.table.area = self.terrace
+        self.table.save()
+        self.assertFalse(ReservationArchive.objects.filter(table=self.table).exclude(area=self.terrace).exists())
+
+
+class ManagerCalendarTests(TestCase):
+    """/api/manager/calendar/: сводка дня с названиями залов и проверка month."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+        cls.area = Area.objects.create(name="Terrace")
+        cls.table = _add_tables(cls.area, 1)[0]
+        start = combine(DAY, time(12))
+        Reservation.objects.create(
+            table=cls.table,
+            datetime_start=start,
+            datetime_end=start + timedelta(hours=5),  # половина дня 12:00–22:00
+            guests=3,
+            name="Test guest",
+            status=Reservation.Status.CONFIRMED,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+
+    def test_area_names(self):
+        resp = self.client.get("/api/manager/calendar/", {"month": DAY.strftime("%Y-%m")})
+        self.assertEqual(resp.status_code, 200)
+        areas = resp.json()["days"][DAY.isoformat()]["areas"]
+        self.assertEqual(
+            areas,
+            [{"area_id": self.area.pk, "area_name": "Terrace", "bookings": 1, "guests": 3, "occupancy": 0.5}],
+        )
+
+    def test_bad_month(self):
+        for month in ("9999-12", "2031-13", "x", ""):
+            with self.subTest(month=month):
+                self.assertEqual(self.client.get("/api/manager/calendar/", {"month": month}).status_code, 400)
+
+
+class ArchiveReadTests(TestCase):
+    """Список и календарь менеджера читают архив по его содержимому, а не по горизонту."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+        table = _add_tables(Area.objects.create(name="Main"), 1)[0]
+        start = combine(DAY, time(12))
+        cls.booking = Reservation.objects.create(
+            table=table,
+            datetime_start=start,
+            datetime_end=start + timedelta(hours=2),
+            guests=2,
+            name="Test guest",
+            status=Reservation.Status.COMPLETED,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            # архивировали при горизонте дальше DAY; текущий горизонт — раньше
+            list(archive.archive_before(combine(DAY + timedelta(days=1), time.min)))
+        self.assertLess(archive.horizon(), DAY)
+
+    def test_last_day(self):
+        self.assertEqual(archive.last_day(), DAY)
+        with self.assertNumQueries(0):
+            self.assertEqual(archive.last_day(), DAY)
+        self.assertFalse(archive.reaches(DAY + timedelta(days=1)))
+
+    def test_manager_list(self):
+        resp = self.client.get("/api/manager/bookings/", {"date_from": DAY.isoformat()})
+        self.assertEqual([r["id"] for r in resp.json()["results"]], [self.booking.pk])
+
+    def test_calendar(self):
+        resp = self.client.get("/api/manager/calendar/", {"month": DAY.strftime("%Y-%m")})
+        self.assertEqual(resp.json()["days"][DAY.isoformat()]["total"], 1)
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+@override_settings(AVAILABILITY_CACHE_TTL=300)
+class AvailabilityCacheTests(TestCase):
+    """Кэш доступности не переживает записи: после коммита брони ответ новый."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name="Main")
+        cls.table = Table.objects.create(area=area, name="1", capacity=4)
+
+    def setUp(self):
+        cache.clear()
+
+    def _available(self, **extra) -> bool:
+        params = {"date": DAY.isoformat(), "start": "19:30", "guests": 2, **extra}
+        resp = self.client.get("/api/availability/", params)
+        return {t["id"]: t["available"] for t in resp.json()["tables"]}[self.table.pk]
+
+    def _book(self):
+        data = {
+            "date": DAY.isoformat(),
+            "start": "19:30",
+            "guests": 2,
+            "table_id": self.table.pk,
+            "name": "Walk-in",
+            "phone": "+7999",
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post("/api/bookings/", data).status_code, 201)
+
+    def test_area_spelling_shares_version(self, *_):
+        # "01", "1 " и "1" — один зал: ключ версии один, запись его поднимает
+        pk = self.table.area_id
+        spellings = (f"0{pk}", f"{pk} ", str(pk))
+        for area in spellings:
+            self.assertTrue(self._available(area=area))
+        self._book()
+        for area in spellings:
+            with self.subTest(area=area):
+                self.assertFalse(self._available(area=area))
+
+    def test_bad_area(self, *_):
+        for url in ("/api/availability/", "/api/availability/grid/", "/api/availability/gaps/"):
+            with self.subTest(url=url):
+                params = {"date": DAY.isoformat(), "start": "19:30", "guests": 2, "area": "x"}
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_booking_invalidates_cached_availability(self, *_):
+        self.assertTrue(self._available())
+        self.assertTrue(self._available())  # второй ответ — из кэша
+        data = {
+            "date": DAY.isoformat(),
+            "start": "19:30",
+            "guests": 2,
+            "table_id": self.table.pk,
+            "name": "Walk-in",
+            "phone": "+7999",
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post("/api/bookings/", data).status_code, 201)
+        self.assertFalse(self._available())
+
+    def test_move_frees_old_day_without_select(self, *_):
+        self._book()
+        self.assertFalse(self._available())
+        booking = Reservation.objects.get()
+        booking.datetime_start += timedelta(days=1)
+        booking.datetime_end += timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            booking.save()
+        # прежний слот известен из from_db: только UPDATE, без SELECT брони
+        sql = [q["sql"].split()[0] for q in ctx.captured_queries if '"booking_reservation"' in q["sql"]]
+        self.assertEqual(sql, ["UPDATE"])
+        self.assertTrue(self._available())
+        self.assertFalse(self._available(date=(DAY + timedelta(days=1)).isoformat()))
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class IdempotencyKeyTests(TestCase):
+    """Повтор POST /api/bookings/ с Idempotency-Key не создаёт вторую бронь."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name="Main")
+        cls.tables = _add_tables(area, 2)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = APIClient()
+
+    def _data(self, table, **extra):
+        return {
+            "date": DAY.isoformat(),
+            "start": "19:30",
+            "guests": 2,
+            "table_id": table.pk,
+            "name": "Walk-in",
+            "phone": "+7999",
+            **extra,
+        }
+
+    def _post(self, client, data, key="key-1", **extra):
+        return client.post("/api/bookings/", data, format="json", HTTP_IDEMPOTENCY_KEY=key, **extra)
+
+    def test_replay(self, *_):
+        first = self._post(self.guest, self._data(self.tables[0]))
+        again = self._post(self.guest, self._data(self.tables[0]))
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(again.json()["id"], first.json()["id"])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_same_key_other_body(self, *_):
+        self._post(self.guest, self._data(self.tables[0]))
+        resp = self._post(self.guest, self._data(self.tables[1]))
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_other_guest_does_not_get_stored_response(self, *_):
+        self._post(self.guest, self._data(self.tables[0]))
+        other = self._post(APIClient(), self._data(self.tables[0]), REMOTE_ADDR="10.0.0.2")
+        self.assertFalse(other.has_header("Idempotent-Replayed"))
+        self.assertEqual(other.status_code, 400)  # стол уже занят — своя, честная обработка
+
+    def _lock_key(self, key="key-1"):
+        request = RequestFactory().post("/api/bookings/")
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        return idempotency.cache_keys(request, "bookings", key)[1]
+
+    @mock.patch.object(idempotency, "WAIT_S", 0.1)
+    def test_retry_while_first_in_flight(self, *_):
+        cache.add(self._lock_key(), 1)
+        resp = self._post(self.guest, self._data(self.tables[0]))
+        self.assertEqual(resp.status_code, 409)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_retry_after_first_failed(self, *_):
+        lock_key = self._lock_key()
+        cache.add(lock_key, 1)
+        # первый запрос упал, не сохранив ответ, и снял блокировку — повтор обрабатывается сам
+        with mock.patch.object(idempotency.time, "sleep", lambda _: cache.delete(lock_key)):
+            resp = self._post(self.guest, self._data(self.tables[0]))
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+class HoldTests(TestCase):
+    """POST /api/holds/: проверки как у брони, лимит удержаний на клиента и throttle."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name="Main")
+        cls.table = _add_tables(cls.area, 1)[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def _hold(self, **extra):
+        data = {"date": DAY.isoformat(), "start": "19:30", "table_id": self.table.pk, "guests": 2, **extra}
+        return self.client.post("/api/holds/", data, format="json")
+
+    def test_rejects_invalid_hold(self):
+        SpecialDay.objects.create(area=self.area, date=DAY + timedelta(days=1), is_closed=True)
+        cases = {
+            "short": {"duration": 10},
+            "long": {"duration": 361},
+            "over capacity": {"guests": 5},
+            "before opening": {"start": "11:00"},
+            "past closing": {"start": "21:00", "duration": 120},
+            "closed day": {"date": (DAY + timedelta(days=1)).isoformat()},
+        }
+        for name, extra in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self._hold(**extra).status_code, 400)
+
+    @override_settings(HOLD_MAX_PER_CLIENT=2)
+    def test_cap_per_client(self):
+        self.assertEqual(self._hold(start="13:00").status_code, 201)
+        second = self._hold(start="16:00").json()["hold_id"]
+        self.assertEqual(self._hold(start="19:00").status_code, 429)
+        # другой адрес — свой лимит; снятое удержание освобождает место
+        other = self.client.post(
+            "/api/holds/",
+            {"date": DAY.isoformat(), "start": "19:00", "table_id": self.table.pk, "guests": 2},
+            format="json",
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(other.status_code, 201)
+        self.client.delete(f"/api/holds/{other.json()['hold_id']}/")
+        self.client.delete(f"/api/holds/{second}/")
+        self.assertEqual(self._hold(start="19:00").status_code, 201)
+
+    @override_settings(HOLD_MAX_PER_CLIENT=1)
+    def test_cap_interleaved(self):
+        # две вкладки клиента ставят удержания одновременно: проходит одна
+        start = combine(DAY, time(13))
+        tables = _add_tables(self.area, 2)
+        slow_active = holds.active
+
+        def active(day):
+            threading.Event().wait(0.05)  # расширяем окно между проверкой лимита и записью
+            return slow_active(day)
+
+        barrier = threading.Barrier(len(tables))
+        results = []
+
+        def place(table):
+            barrier.wait()
+            try:
+                results.append(holds.place(table.pk, start, start + timedelta(hours=2), owner="10.0.0.9"))
+            except holds.TooManyHolds:
+                results.append("cap")
+
+        with mock.patch.object(holds, "active", active):
+            threads = [threading.Thread(target=place, args=(t,)) for t in tables]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(sorted(r == "cap" for r in results), [False, True])
+        self.assertEqual(len(holds._owner_holds("10.0.0.9")), 1)
+
+    @mock.patch.object(HoldRateThrottle, "THROTTLE_RATES", {"holds": "2/min"})
+    def test_throttle(self):
+        for start in ("13:00", "16:00"):
+            self.assertEqual(self._hold(start=start).status_code, 201)
+        resp = self._hold(start="19:00")
+        self.assertEqual(resp.status_code, 429)
+        self.assertTrue(resp.has_header("Retry-After"))
+
+
+class HoursCacheTests(TestCase):
+    """Скомпилированные часы работы кэшируются в процессе только при общем кэше."""
+
+    def setUp(self):
+        cache.clear()
+        hours.clear()
+        self.day = SpecialDay.objects.create(date=DAY, open_time=time(12), close_time=time(22))
+
+    def _close_elsewhere(self):
+        # правка без сигналов — как в другом воркере, чья версия сюда не доходит
+        SpecialDay.objects.filter(pk=self.day.pk).update(is_closed=True)
+
+    @override_settings(HOURS_CACHE_ENABLED=False)
+    def test_disabled_reads_fresh_rules(self):
+        self.assertIsNotNone(hours.day_hours(DAY))
+        self._close_elsewhere()
+        self.assertIsNone(hours.day_hours(DAY))
+        self.assertIsNone(hours.for_range(DAY, DAY)[DAY].get())
+
+    @override_settings(HOURS_CACHE_ENABLED=True)
+    def test_enabled_reuses_compiled_day(self):
+        rules = hours.for_day(DAY)
+        self._close_elsewhere()
+        self.assertIs(hours.for_day(DAY), rules)
+
+
+class AvailabilityDurationTests(TestCase):
+    """duration вне границ брони (30–360) — 400 на всех эндпоинтах доступности."""
+
+    URLS = ("/api/availability/", "/api/availability/grid/", "/api/async/availability/")
+
+    @classmethod
+    def setUpTestData(cls):
+        _add_tables(Area.objects.create(name="Main"), 1)
+
+    def test_rejects_bad_duration(self):
+        for url in self.URLS:
+            for duration in ("-15", "0", "10", "361", "x"):
+                with self.subTest(url=url, duration=duration):
+                    params = {"date": DAY.isoformat(), "start": "19:30", "guests": 2, "duration": duration}
+                    self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_day_slots_rejects_non_positive_step(self):
+        with self.assertRaises(ValueError):
+            hours.day_slots(DAY, visit_min=-settings.BUFFER_MIN)
+
+
+class AlternativesParamsTests(TestCase):
+    """/api/availability/alternatives/: кривые параметры — 400 или прижатие, но не 500."""
+
+    URL = "/api/availability/alternatives/"
+
+    @classmethod
+    def setUpTestData(cls):
+        _add_tables(Area.objects.create(name="Main"), 2)
+
+    def _get(self, **extra):
+        params = {"date": DAY.isoformat(), "start": "19:30", "guests": 2, **extra}
+        return self.client.get(self.URL, params)
+
+    def test_clamps_negative_values(self):
+        resp = self._get(days=-1, window=-3, limit=-5)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["next_days"], [])
+        self.assertEqual(len(resp.json()["same_day"]), 1)
+
+    def test_bad_area(self):
+        self.assertEqual(self._get(area="x").status_code, 400)
+
+    def test_bad_duration(self):
+        for duration in ("-15", "10", "361"):
+            with self.subTest(duration=duration):
+                self.assertEqual(self._get(duration=duration).status_code, 400)
+
+
+class AlternativesTests(TestCase):
+    """find_alternatives предлагает то, что примет insert_reservation, и не раньше «сейчас»."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.table = _add_tables(Area.objects.create(name="Main"), 1)[0]
+        start = combine(DAY, time(18))
+        Reservation.objects.create(
+            table=cls.table,
+            datetime_start=start,
+            datetime_end=start + timedelta(hours=2),
+            guests=2,
+            name="Test guest",
+            status=Reservation.Status.CONFIRMED,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _starts(self, start=time(19), **kwargs):
+        same_day, _ = find_alternatives(DAY, start, 2, visit_min=120, days_ahead=0, limit=20, **kwargs)
+        return {localtime(a.start_dt).time() for a in same_day}
+
+    def test_touching_slot_without_buffer(self):
+        starts = self._starts()
+        self.assertIn(time(20), starts)  # встык с бронью 18:00–20:00
+        self.assertNotIn(time(19, 45), starts)
+        insert_reservation(
+            table=self.table,
+            datetime_start=combine(DAY, time(20)),
+            datetime_end=combine(DAY, time(22)),
+            guests=2,
+            name="Next guest",
+        )
+
+    def test_holds_are_busy(self):
+        hold = holds.place(self.table.pk, combine(DAY, time(20)), combine(DAY, time(22)))
+        self.assertNotIn(time(20), self._starts())
+        self.assertIn(time(20), self._starts(hold_id=hold.id))
+
+    def test_no_past_slots(self):
+        self.assertIn(time(12), self._starts(time(13)))
+        with mock.patch.object(timezone, "now", return_value=combine(DAY, time(13, 5))):
+            starts = self._starts(time(13))
+        self.assertEqual(min(starts), time(13, 15))
+
+
+class AvailabilityParityTests(TestCase):
+    """Доступность одним запросом совпадает с прежним расчётом по каждому столу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        main = Area.objects.create(name="Main")
+        terrace = Area.objects.create(name="Terrace")
+        cls.tables = [
+            Table.objects.create(area=main, name="1", capacity=4),
+            Table.objects.create(area=main, name="2", capacity=4),
+            Table.objects.create(area=main, name="3", capacity=6),
+            Table.objects.create(area=terrace, name="T1", capacity=4),
+        ]
+        cls.first, cls.crossing, cls.canceled, cls.terrace = cls.tables
+        book = [
+            # встык: 18:00–20:00 и 20:00–21:00
+            (cls.first, time(18), 120, Reservation.Status.CONFIRMED),
+            (cls.first, time(20), 60, Reservation.Status.PENDING),
+            # заходит за закрытие (22:00)
+            (cls.crossing, time(21), 120, Reservation.Status.CONFIRMED),
+            (cls.canceled, time(18), 120, Reservation.Status.CANCELED),
+            (cls.terrace, time(13), 60, Reservation.Status.CONFIRMED),
+        ]
+        for table, start, minutes, st in book:
+            start_dt = combine(DAY, start)
+            Reservation.objects.create(
+                table=table,
+                datetime_start=start_dt,
+                datetime_end=start_dt + timedelta(minutes=minutes),
+                guests=2,
+                name="Test guest",
+                status=st,
+            )
+        # терраса закрыта в DAY, весь ресторан — на следующий день
+        SpecialDay.objects.create(area=terrace, date=DAY, is_closed=True)
+        SpecialDay.objects.create(date=DAY + timedelta(days=1), is_closed=True)
+
+    def setUp(self):
+        cache.clear()
+        hours.clear()
+
+    @staticmethod
+    def _per_table(day, start, guests, tables, visit_min):
+        # прежний расчёт: по запросу table_is_free и nearest_after на каждый стол
+        start_dt = combine(day, start)
+        end_dt = start_dt + timedelta(minutes=visit_min)
+        out = []
+        for t in tables:
+            day_hours = hours.day_hours(day, t.area_id)
+            if t.capacity < guests or not day_hours or not table_is_free(t, start_dt, end_dt):
+                out.append((t.pk, False, None))
+                continue
+            nxt = nearest_after(t, start_dt)
+            close = day_hours.close_dt
+            out.append((t.pk, True, min(nxt - timedelta(minutes=BUFFER_MIN), close) if nxt else close))
+        return out
+
+    def test_matches_per_table(self):
+        starts = [time(h, m) for h in range(12, 22) for m in (0, 30)]
+        for day, start, guests, visit_min in product((DAY, DAY + timedelta(days=1)), starts, (2, 5), (60, 120)):
+            with self.subTest(day=day, start=start, guests=guests, visit=visit_min):
+                got = [
+                    (i.table.pk, i.available, i.available_until)
+                    for i in availability_for_tables(day, start, guests, self.tables, visit_min)
+                ]
+                self.assertEqual(got, self._per_table(day, start, guests, self.tables, visit_min))
+
+    def test_edge_cases(self):
+        def info(start, visit_min=60, day=DAY):
+            found = availability_for_tables(day, start, 2, self.tables, visit_min)
+            return {i.table.pk: (i.available, i.available_until) for i in found}
+
+        # конец чужой брони совпадает с началом визита — не пересечение
+        self.assertEqual(info(time(21))[self.first.pk], (True, combine(DAY, time(22))))
+        # визит кончается ровно к началу брони; свободен до неё минус буфер
+        self.assertEqual(
+            info(time(17))[self.first.pk],
+            (True, combine(DAY, time(18)) - timedelta(minutes=BUFFER_MIN)),
+        )
+        # бронь, заходящая за закрытие, занимает стол до самого закрытия
+        self.assertEqual(info(time(21), 30)[self.crossing.pk], (False, None))
+        self.assertEqual(info(time(19), 60)[self.crossing.pk][0], True)
+        # закрытый зал и закрытый день
+        self.assertEqual(info(time(15))[self.terrace.pk], (False, None))
+        self.assertFalse(any(a for a, _ in info(time(15), day=DAY + timedelta(days=1)).values()))
+
+    def test_schedule_matches_per_table_queries(self):
+        schedule = schedule_for_tables([t.pk for t in self.tables], *day_bounds(DAY))
+        for t in self.tables:
+            rows = reservations_qs_for_table(t, DAY).order_by("datetime_start")
+            self.assertEqual(schedule[t.pk], [(r.datetime_start, r.datetime_end) for r in rows])
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class OverlapTests(TestCase):
+    """Двойная бронь стола: TableTaken при записи и проверка перед миграцией 0007."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.table = _add_tables(Area.objects.create(name="Main"), 1)[0]
+
+    def _fields(self, start: time) -> dict:
+        start_dt = combine(DAY, start)
+        return {
+            "table": self.table,
+            "datetime_start": start_dt,
+            "datetime_end": start_dt + timedelta(hours=2),
+            "guests": 2,
+            "name": "Test guest",
+            "status": Reservation.Status.CONFIRMED,
+        }
+
+    def test_overlapping_insert_raises_table_taken(self, *_):
+        insert_reservation(**self._fields(time(18)))
+        with self.assertRaises(TableTaken):
+            insert_reservation(**self._fields(time(19)))
+        insert_reservation(**self._fields(time(20)))  # встык — не пересечение
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_admin_edit_cannot_overlap(self, *_):
+        manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+        insert_reservation(**self._fields(time(18)))
+        later = insert_reservation(**self._fields(time(20)))
+        self.client.force_login(manager)
+        start = localtime(combine(DAY, time(19)))
+        resp = self.client.post(f"/admin/booking/reservation/{later.pk}/change/", {
+            "table": self.table.pk,
+            "datetime_start_0": start.date().isoformat(),
+            "datetime_start_1": start.strftime("%H:%M:%S"),
+            "datetime_end_0": start.date().isoformat(),
+            "datetime_end_1": (start + timedelta(hours=2)).strftime("%H:%M:%S"),
+            "guests": 2,
+            "name": "Test guest",
+            "status": Reservation.Status.CONFIRMED,
+        })
+        self.assertEqual(resp.status_code, 200)  # форма с ошибкой, не 500 и не редирект
+        self.assertContains(resp, "Стол уже занят на это время")
+        later.refresh_from_db()
+        self.assertEqual(localtime(later.datetime_start).time(), time(20))
+
+    def test_save_reservation_raises_table_taken(self, *_):
+        insert_reservation(**self._fields(time(18)))
+        later = insert_reservation(**self._fields(time(20)))
+        later.datetime_start -= timedelta(hours=1)
+        with self.assertRaises(TableTaken):
+            save_reservation(later)
+        later.datetime_start += timedelta(hours=1)
+        later.guests = 3
+        save_reservation(later)  # правка без сдвига не конфликтует сама с собой
+
+    @skipUnless(connection.vendor != "postgresql", "на PostgreSQL пересечение не записать")
+    def test_migration_lists_existing_overlaps(self, *_):
+        migration = import_module("booking.migrations.0007_reservation_no_overlap")
+        first = Reservation.objects.create(**self._fields(time(18)))
+        second = Reservation.objects.create(**self._fields(time(19)))
+        Reservation.objects.create(**self._fields(time(21)))  # встык со второй
+        Reservation.objects.create(**{**self._fields(time(18)), "status": Reservation.Status.CANCELED})
+        found = migration.find_overlaps(connection)
+        self.assertEqual([(r[0], r[1], r[2]) for r in found], [(self.table.pk, first.pk, second.pk)])
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class BulkHoursTests(TestCase):
+    """Пачка броней: часы работы зала проверяются у каждой брони, и со столом, и подбором."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+        cls.area = Area.objects.create(name="Main")
+        cls.table = _add_tables(cls.area, 1)[0]
+        SpecialDay.objects.create(area=cls.area, date=DAY + timedelta(days=1), is_closed=True)
+
+    def test_every_item_within_hours(self, *_):
+        self.client.force_login(self.manager)
+        cases = [
+            {"start": "11:00"},  # до открытия
+            {"start": "21:00"},  # 21:00 + 2 ч — после закрытия
+            {"date": (DAY + timedelta(days=1)).isoformat()},  # зал закрыт весь день
+            {"start": "13:00"},
+        ]
+        items = []
+        for extra in cases:
+            base = {"date": DAY.isoformat(), "guests": 2, "name": "Group", "phone": "+7999"}
+            items.append({**base, "table_id": self.table.pk, **extra})
+            items.append({**base, **extra})  # тот же слот подбором стола
+        resp = self.client.post(
+            "/api/bookings/bulk/", {"mode": "partial", "bookings": items}, content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        data = resp.json()
+        self.assertEqual([e["index"] for e in data["errors"]], [0, 1, 2, 3, 4, 5, 7])
+        self.assertEqual([c["index"] for c in data["created"]], [6])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class StatusBatchTests(TestCase):
+    """set_status_batch: ok — только брони, которые изменил этот вызов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tables = _add_tables(Area.objects.create(name="Main"), 2)
+
+    def _booking(self, table) -> Reservation:
+        start = combine(DAY, time(19, 30))
+        return Reservation.objects.create(
+            table=table,
+            datetime_start=start,
+            datetime_end=start + timedelta(hours=2),
+            guests=2,
+            name="Test guest",
+            status=Reservation.Status.PENDING,
+        )
+
+    def test_row_changed_after_read_is_conflict(self, *_):
+        first, second = self._booking(self.tables[0]), self._booking(self.tables[1])
+        can_transition = Reservation.can_transition
+
+        def confirm_second_meanwhile(source, target):
+            # другой менеджер подтвердил бронь между чтением и UPDATE
+            Reservation.objects.filter(pk=second.pk).update(status=Reservation.Status.CONFIRMED)
+            return can_transition(source, target)
+
+        with mock.patch.object(Reservation, "can_transition", side_effect=confirm_second_meanwhile):
+            results = set_status_batch([first.pk, second.pk], Reservation.Status.CONFIRMED)
+        self.assertEqual(results, {first.pk: TRANSITION_OK, second.pk: TRANSITION_CONFLICT})
+
+    def test_other_integrity_error_is_raised(self, *_):
+        booking = self._booking(self.tables[0])
+        errors = [IntegrityError(OVERLAP_CONSTRAINT), IntegrityError("NOT NULL constraint failed")]
+        with mock.patch.object(QuerySet, "update", side_effect=errors):
+            with self.assertRaisesMessage(IntegrityError, "NOT NULL"):
+                set_status_batch([booking.pk], Reservation.Status.CONFIRMED)
+
+
+@override_settings(CACHE_URL="redis://cache:6379/0")  # версия схемы в общем кэше
+class LayoutConditionalGetTests(TestCase):
+    """Схема зала: повторный запрос с ETag — 304 без запросов к БД."""
+
+    URLS = (
+        "/api/layout/tables/",
+        "/api/layout/table-types/",
+        "/api/layout/areas/",
+        "/api/layout/snapshot/",
+        "/api/async/layout/tables/",
+        "/api/async/layout/table-types/",
+        "/api/async/layout/areas/",
+        "/api/async/layout/snapshot/",
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name="Main")
+        cls.table = Table.objects.create(area=cls.area, name="1", capacity=4)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertIn("max-age", first["Cache-Control"])
+                self.assertTrue(first.has_header("Last-Modified"))
+                with self.assertNumQueries(0):
+                    again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+                self.assertEqual(again.status_code, 304)
+
+    def test_layout_change_invalidates_etag(self):
+        etags = {url: self.client.get(url)["ETag"] for url in self.URLS}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.table.capacity = 6
+            self.table.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(CACHE_URL="")
+    def test_no_validators_without_shared_cache(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                resp = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+                self.assertEqual(resp.status_code, 200)
+                self.assertIn("max-age", resp["Cache-Control"])
+                self.assertFalse(resp.has_header("ETag"))
+                self.assertFalse(resp.has_header("Last-Modified"))
+
+    def test_async_matches_sync(self):
+        for url in self.URLS[:4]:
+            with self.subTest(url=url):
+                sync = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_ACCEPT_ENCODING="gzip")
+                other = self.client.get(
+                    url.replace("/api/", "/api/async/"),
+                    HTTP_ACCEPT="application/json",
+                    HTTP_ACCEPT_ENCODING="gzip",
+                )
+                self.assertEqual(other.status_code, 200)
+                if other.has_header("Content-Encoding"):  # снимок — те же байты
+                    self.assertEqual(other.content, sync.content)
+                else:
+                    self.assertEqual(json.loads(other.content), json.loads(sync.content))
+                self.assertEqual(other["ETag"], sync["ETag"])
+
+    def test_snapshot_precompressed(self):
+        plain = self.client.get("/api/layout/snapshot/", HTTP_ACCEPT_ENCODING="identity")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        with self.assertNumQueries(0):
+            packed = self.client.get("/api/layout/snapshot/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(packed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", packed["Vary"])
+        self.assertNotEqual(packed["ETag"], plain["ETag"])
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+        data = json.loads(plain.content)
+        self.assertEqual([t["id"] for t in data["tables"]], [self.table.pk])
+        self.assertEqual([a["id"] for a in data["areas"]], [self.area.pk])
+        self.assertEqual(data["types"], [{"code": "4", "name": Table.IconType("4").label}])
+
+
+class ProjectionParityTests(TestCase):
+    """Быстрые списки отдают ровно то же, что DRF-сериализаторы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name="Терраса")
+        _add_bookings(_add_tables(area, 2), days=2, per_table=3)
+        Reservation.objects.filter(pk=Reservation.objects.order_by("pk")[0].pk).update(
+            comment="у окна", datetime_end=combine(DAY, time(13, 0, 0, 500))
+        )
+
+    def assertSameJson(self, serializer, fields):
+        qs = Reservation.objects.order_by("datetime_start", "id")
+        expected = JSONRenderer().render(serializer(qs, many=True).data)
+        actual = renderers.dumps(list(projections.build(projections.select(qs, fields), fields)))
+        self.assertEqual(actual, expected)
+
+    def test_reservation_list(self):
+        self.assertSameJson(ReservationListSerializer, projections.RESERVATION_LIST)
+
+    def test_manager_list(self):
+        self.assertSameJson(ManagerBookingListItem, projections.MANAGER_LIST)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN проверяется только на PostgreSQL")
+@mock.patch.object(group, "apply_async")
+@mock.patch.object(Task, "apply_async")
+class HotQueryPlanTests(TestCase):
+    """Горячие запросы к броням идут по индексам, а не полным сканом таблицы.
+
+    На маленькой тестовой базе планировщику выгоднее Seq Scan, поэтому он
+    отключается (``enable_seqscan = off``): Seq Scan остаётся в плане,
+    только если подходящего индекса нет вовсе.
+    """
+
+    SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name="Main")
+        cls.guest = CustomUser.objects.create_user(
+            email="guest@example.com", password="x", first_name="Guest", phone="+70000000001"
+        )
+        cls.manager = CustomUser.objects.create_superuser(
+            email="manager@example.com", password="x", first_name="Boss", phone="+70000000002"
+        )
+        _add_bookings(_add_tables(area, 6), days=5, per_table=3, user=cls.guest)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertIndexedPlans(self, call):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = call()
+        self.assertLess(resp.status_code, 400)
+        hot = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].lstrip().upper().startswith(("SELECT", "UPDATE"))
+            and any(t in q["sql"] for t in HOT_TABLES)
+        ]
+        self.assertTrue(hot, "нет запросов к броням")
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            for sql in hot:
+                cur.execute("EXPLAIN " + sql)
+                plan = "\n".join(row[0] for row in cur.fetchall())
+                scanned = set(self.SEQ_SCAN.findall(plan)) & set(HOT_TABLES)
+                self.assertFalse(scanned, f"{sql}\n{plan}")
+
+    def test_availability(self, *_):
+        params = {"date": DAY.isoformat(), "start": "19:30", "guests": 2}
+        self.assertIndexedPlans(lambda: self.client.get("/api/availability/", params))
+
+    def test_availability_grid(self, *_):
+        self.assertIndexedPlans(
+            lambda: self.client.get("/api/availability/grid/", {"date": DAY.isoformat()})
+        )
+
+    def test_availability_alternatives(self, *_):
+        params = {"date": DAY.isoformat(), "start": "13:00", "guests": 2}
+        self.assertIndexedPlans(lambda: self.client.get("/api/availability/alternatives/", params))
+
+    def test_create_booking(self, *_):
+        data = {
+            "date": (DAY + timedelta(days=30)).isoformat(),
+            "start": "19:30",
+            "guests": 2,
+            "name": "Walk-in",
+            "phone": "+7999",
+        }
+        self.assertIndexedPlans(lambda: self.client.post("/api/bookings/", data, format="json"))
+
+    def test_my_bookings_by_status(self, *_):
+        self.client.force_login(self.guest)
+        self.assertIndexedPlans(lambda: self.client.get("/api/me/bookings-by-status/"))
+
+    def test_manager_bookings_list(self, *_):
+        self.client.force_login(self.manager)
+        params = {"date_from": DAY.isoformat(), "date_to": DAY.isoformat()}
+        self.assertIndexedPlans(lambda: self.client.get("/api/manager/bookings/", params))
+
+    def test_manager_calendar(self, *_):
+        self.client.force_login(self.manager)
+        params = {"month": DAY.strftime("%Y-%m")}
+        self.assertIndexedPlans(lambda: self.client.get("/api/manager/calendar/", params))
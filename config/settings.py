@@ -67,6 +67,9 @@ if USE_SQLITE:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # запись берёт блокировку сразу: проверка пересечения и вставка
+            # брони не перемешиваются между запросами
+            "OPTIONS": {"transaction_mode": "IMMEDIATE"},
         }
     }
 else:
@@ -130,6 +133,8 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 5,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # частота удержаний столов с одного адреса (HoldRateThrottle)
+    "DEFAULT_THROTTLE_RATES": {"holds": os.getenv("HOLD_THROTTLE_RATE", "30/min")},
 }
 
 SPECTACULAR_SETTINGS = {
@@ -138,6 +143,22 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "1.0.0",
 }
 
+# Общий кэш (Redis). Без CACHE_URL — локальный кэш процесса.
+CACHE_URL = os.getenv("CACHE_URL", "")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
 CELERY_TIMEZONE = TIME_ZONE
@@ -178,6 +199,28 @@ OPEN_TIME = _get_time("OPEN_TIME", "12:00")
 CLOSE_TIME = _get_time("CLOSE_TIME", "22:00")
 VISIT_LENGTH_MIN = int(os.getenv("VISIT_LENGTH_MIN", "120"))
 BUFFER_MIN = int(os.getenv("BUFFER_MIN", "15"))
+# Подбор стола без table_id: first | best_fit (см. booking.services.pick_table)
+PICK_TABLE_STRATEGY = os.getenv("PICK_TABLE_STRATEGY", "first")
+
+# Часы работы, скомпилированные по дням, в памяти процесса; сверяются с
+# версией в общем кэше, поэтому по умолчанию включены только при CACHE_URL.
+HOURS_CACHE_ENABLED = os.getenv("HOURS_CACHE_ENABLED", "1" if CACHE_URL else "0") == "1"
+# TTL ответов /api/availability/ в общем кэше, 0 — без кэша. Версии дней
+# после записи поднимаются в кэше; без CACHE_URL он свой у каждого воркера и
+# остальные отдавали бы старую доступность до TTL, поэтому кэш выключен.
+AVAILABILITY_CACHE_TTL = int(os.getenv("AVAILABILITY_CACHE_TTL", "300" if CACHE_URL else "0"))
+# Сколько секунд браузер берёт схему зала (/api/layout/...) из своего кэша,
+# дальше — перепроверка по ETag (304 без обращения к БД)
+LAYOUT_MAX_AGE = int(os.getenv("LAYOUT_MAX_AGE", "60"))
+# Сколько секунд держится удержание стола на время оформления брони
+HOLD_TTL = int(os.getenv("HOLD_TTL", "300"))
+# Сколько удержаний может одновременно держать один клиент (по адресу)
+HOLD_MAX_PER_CLIENT = int(os.getenv("HOLD_MAX_PER_CLIENT", "3"))
+# Брони в финальных статусах старше стольких дней переносит в архив
+# manage.py archive_reservations
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# Сколько хранится ответ POST /api/bookings/ по заголовку Idempotency-Key
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 60 * 60)))
 
 
 CSRF_TRUSTED_ORIGINS = ["http://127.0.0.1:8000", "http://localhost:8000"]
@@ -16,7 +16,14 @@ if [ "${SEED_ON_START:-false}" = "true" ]; then
   fi
 fi
 
+if [ "${SERVER:-wsgi}" = "asgi" ]; then
+  exec uvicorn config.asgi:application \
+    --host 0.0.0.0 \
+    --port 8000 \
+    --workers "${WEB_WORKERS:-3}"
+fi
+
 exec gunicorn config.wsgi:application \
   --bind 0.0.0.0:8000 \
-  --workers 3 \
+  --workers "${WEB_WORKERS:-3}" \
   --timeout 60
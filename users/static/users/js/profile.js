@@ -104,7 +104,16 @@ function renderTabsNav(counts) {
   }).join("");
 }
 
-function renderTabsPanes(byStatus) {
+function loadMoreButton(key, cursor) {
+  if (!cursor) return "";
+  return `
+    <button type="button" data-more="${key}" data-cursor="${cursor}"
+            class="mt-3 px-4 py-2 rounded-xl border border-[#295E70]/20 text-[#295E70] hover:bg-white/70">
+      Load more
+    </button>`;
+}
+
+function renderTabsPanes(byStatus, next) {
   const panes = $("#resTabsPanes");
   panes.innerHTML = STATUS_META.map(({ key, label }) => {
     const list = byStatus?.[key] || [];
@@ -114,11 +123,35 @@ function renderTabsPanes(byStatus) {
     return `
       <div role="tabpanel" data-pane="${key}" class="hidden">
         <h4 class="text-[#295E70] font-bold mb-2">${label}</h4>
-        <div class="grid gap-3">${content}</div>
+        <div class="grid gap-3" data-list="${key}">${content}</div>
+        ${loadMoreButton(key, next?.[key])}
       </div>`;
   }).join("");
 }
 
+// следующая страница вкладки: сервер отдаёт её по курсору
+document.addEventListener("click", async (e) => {
+  const btn = e.target.closest("[data-more]");
+  if (!btn) return;
+  const key = btn.dataset.more;
+  btn.disabled = true;
+  const params = new URLSearchParams({ status: key, cursor: btn.dataset.cursor });
+  const r = await fetch(`/api/me/bookings-by-status/?${params}`, { credentials: "same-origin" });
+  if (!r.ok) {
+    btn.disabled = false;
+    return;
+  }
+  const data = await r.json().catch(() => ({}));
+  document.querySelector(`[data-list="${key}"]`)
+    ?.insertAdjacentHTML("beforeend", (data.results || []).map(bookingCard).join(""));
+  if (data.next) {
+    btn.dataset.cursor = data.next;
+    btn.disabled = false;
+  } else {
+    btn.remove();
+  }
+});
+
 function activateTab(key) {
   // buttons
   document.querySelectorAll('#resTabsNav [data-tab]').forEach(btn => {
@@ -206,7 +239,7 @@ async function loadBookings() {
   const by = data.by_status || {};
 
   renderTabsNav(counts);
-  renderTabsPanes(by);
+  renderTabsPanes(by, data.next || {});
 
   // активируем первую вкладку с данными, если пусто — pending
   const firstWithData = STATUS_META.find(({ key }) => (by[key] || []).length > 0)?.key || "pending";
@@ -1,3 +1,118 @@
-from django.test import TestCase
+"""Бюджеты запросов к БД для API авторизации и профиля.
 
-# Create your tests here.
+Как и в ``booking.tests``: число запросов на вызов не больше бюджета и не
+растёт, когда пользователей и их броней становится больше.
+"""
+from datetime import date, time, timedelta
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from booking.models import Area, Reservation, Table
+from booking.services import combine
+from users.models import CustomUser
+
+PASSWORD = "secret-pass-1"
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class AuthApiQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="guest@example.com", password=PASSWORD, first_name="Guest", phone="+70000000001"
+        )
+        area = Area.objects.create(name="Main")
+        cls.table = Table.objects.create(area=area, name="1", capacity=4)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.phones = count(70000001000)
+
+    def _grow(self) -> None:
+        CustomUser.objects.bulk_create(
+            [
+                CustomUser(email=f"user{i}@example.com", first_name="U", phone=f"+{next(self.phones)}")
+                for i in range(50)
+            ]
+        )
+        rows = []
+        for d in range(50):
+            start = combine(date(2031, 3, 1) + timedelta(days=d), time(19, 0))
+            r = Reservation(
+                user=self.user,
+                table=self.table,
+                datetime_start=start,
+                datetime_end=start + timedelta(hours=2),
+                guests=2,
+                name="Guest",
+            )
+            r.fill_denormalized()
+            rows.append(r)
+        Reservation.objects.bulk_create(rows)
+
+    def _count(self, prepare) -> int:
+        call = prepare()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = call()
+        self.assertLess(resp.status_code, 400, getattr(resp, "data", resp))
+        return len(ctx.captured_queries)
+
+    def assertQueryBudget(self, budget: int, prepare):
+        """``prepare()`` готовит данные и возвращает сам запрос без аргументов."""
+        small = self._count(prepare)
+        self._grow()
+        large = self._count(prepare)
+        self.assertLessEqual(small, budget, f"запросов: {small}, бюджет {budget}")
+        self.assertEqual(large, small, f"запросов стало {large} вместо {small}")
+
+    def test_register(self):
+        def prepare():
+            self.client.logout()  # каждый замер — с анонимной сессией
+            n = next(self.phones)
+            data = {
+                "email": f"new{n}@example.com",
+                "password": PASSWORD,
+                "first_name": "New",
+                "phone": f"+{n}",
+            }
+            return lambda: self.client.post("/api/auth/register/", data, format="json")
+
+        self.assertQueryBudget(11, prepare)
+
+    def test_login(self):
+        def prepare():
+            self.client.logout()
+            data = {"email": self.user.email, "password": PASSWORD}
+            return lambda: self.client.post("/api/auth/login/", data, format="json")
+
+        self.assertQueryBudget(9, prepare)
+
+    def test_logout(self):
+        def prepare():
+            self.client.force_login(self.user)
+            return lambda: self.client.post("/api/auth/logout/")
+
+        self.assertQueryBudget(4, prepare)
+
+    def test_me_anonymous(self):
+        self.assertQueryBudget(0, lambda: lambda: self.client.get("/api/auth/me/"))
+
+    def test_me(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget(2, lambda: lambda: self.client.get("/api/auth/me/"))
+
+    def test_me_update(self):
+        self.client.force_login(self.user)
+        names = count()
+
+        def prepare():
+            data = {"first_name": f"Guest {next(names)}"}
+            return lambda: self.client.patch("/api/auth/me/update", data, format="json")
+
+        self.assertQueryBudget(5, prepare)